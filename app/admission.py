@@ -0,0 +1,138 @@
+"""
+Admission control: in-flight caps per route class and per-user token
+buckets, enforced by AdmissionMiddleware before a request reaches the
+routers.
+
+Past capacity, queueing more requests only makes every request slower. Each
+route class (auth, read, write) therefore gets at most a fixed number of
+requests in flight; the rest wait in FIFO order for up to a latency budget
+and are then shed with a 503, so the requests that do run keep a bounded
+latency. A queue that has not drained for a whole budget is a standing
+queue, not a burst (the CoDel observation): new arrivals then only wait a
+fraction of the budget, so served requests do not all sit out the full
+budget first. The caps also keep sync mode from starving itself: with no more
+requests in flight than pooled connections, no threadpool thread sits
+waiting for a connection that only another thread can return.
+
+Everything here runs on the event loop and never awaits while it reads
+and updates its state, so no locks are needed.
+"""
+import asyncio
+import time
+from collections import deque
+
+READ_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+# bcrypt-bound: login, token refresh and registration
+AUTH_PREFIX = "/auth"
+REGISTER_PATH = "/users/"
+# share of the queue budget a request may wait while the queue is standing
+OVERLOAD_WAIT = 0.1
+# forget buckets idle long enough to be full again, at most this often
+PRUNE_INTERVAL = 60
+
+
+def route_class(method: str, path: str) -> str:
+    if path.startswith(AUTH_PREFIX) or (method == "POST" and path == REGISTER_PATH):
+        return "auth"
+    return "read" if method in READ_METHODS else "write"
+
+
+class AdmissionGate:
+    """
+    At most `limit` holders; acquire() waits its turn for up to `timeout`
+    seconds and returns False if it did not get in.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._waiters = deque()
+        # last time a request got in without waiting, or the queue drained
+        self._idle_at = time.monotonic()
+
+    async def acquire(self, timeout: float) -> bool:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self._idle_at = time.monotonic()
+            return True
+        if time.monotonic() - self._idle_at > timeout:
+            timeout *= OVERLOAD_WAIT
+        if timeout <= 0:
+            return False
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        timer = loop.call_later(timeout, self._expire, waiter)
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            # the slot may have been handed over just before the cancel
+            if waiter.done() and not waiter.cancelled() and waiter.result():
+                self.release()
+            else:
+                self._discard(waiter)
+            raise
+        finally:
+            timer.cancel()
+
+    def release(self) -> None:
+        # hand the slot straight to the oldest waiter, so a newcomer cannot
+        # take it first
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self.active -= 1
+        self._idle_at = time.monotonic()
+
+    def _expire(self, waiter) -> None:
+        if not waiter.done():
+            waiter.set_result(False)
+            self._discard(waiter)
+
+    def _discard(self, waiter) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+
+class TokenBuckets:
+    """
+    A token bucket per key: `rate` requests per second on average, bursts of
+    up to `burst`.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        # key -> [tokens, last update]
+        self._buckets = {}
+        self._next_prune = 0.0
+
+    def take(self, key, now: float) -> float:
+        """
+        Spend a token: 0 if there was one, else the seconds until there is.
+        """
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if now >= self._next_prune:
+                self._prune(now)
+            self._buckets[key] = [self.burst - 1, now]
+            return 0.0
+
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return 0.0
+        bucket[0] = tokens
+        return (1 - tokens) / self.rate
+
+    def _prune(self, now: float) -> None:
+        self._next_prune = now + PRUNE_INTERVAL
+        refilled = now - self.burst / self.rate
+        for key in [key for key, (_, last) in self._buckets.items() if last < refilled]:
+            del self._buckets[key]
@@ -0,0 +1,254 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import delete, func, insert, select
+
+from app.models.cache_invalidation import CacheInvalidation
+
+_MISSING = object()
+
+
+class _Call:
+    """A load in progress that concurrent misses for the same key wait on."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+        self.stale = False
+
+
+class _AsyncCall:
+    """Same as _Call for coroutines running on the event loop."""
+
+    def __init__(self):
+        self.future = asyncio.get_running_loop().create_future()
+        self.stale = False
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with a TTL per entry and hit/miss counters.
+
+    get_or_load() coalesces concurrent misses: only the first caller runs
+    the loader, the others wait for its result.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, name: str = "cache"):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._async_inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # (hit, miss, eviction) Prometheus counters, see app.metrics.instrument_cache
+        self.counters = None
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    if self.counters is not None:
+                        self.counters[0].inc()
+                    return value
+                del self._data[key]
+            self.misses += 1
+            if self.counters is not None:
+                self.counters[1].inc()
+            return default
+
+    def set(self, key, value, ttl: float = None, expires_at: float = None):
+        """
+        Store a value. `expires_at` is an absolute time.monotonic() deadline
+        and wins over `ttl`.
+        """
+        if expires_at is None:
+            expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._store(key, value, expires_at)
+
+    def _store(self, key, value, expires_at: float):
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+            if self.counters is not None:
+                self.counters[2].inc()
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+                # a load racing with this invalidation may have read old data
+                call = self._inflight.get(key)
+                if call is not None:
+                    call.stale = True
+                call = self._async_inflight.get(key)
+                if call is not None:
+                    call.stale = True
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            for call in self._inflight.values():
+                call.stale = True
+            for call in self._async_inflight.values():
+                call.stale = True
+
+    def get_or_load(self, key, loader):
+        """
+        Return the cached value for `key`, calling `loader()` on a miss.
+        Exceptions from the loader propagate to every waiting caller and
+        nothing is cached.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = loader()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                if call.error is None and not call.stale:
+                    self._store(key, call.value, time.monotonic() + self.ttl)
+            call.event.set()
+        return call.value
+
+    async def get_or_load_async(self, key, loader):
+        """
+        Async variant of get_or_load(); `loader` is a coroutine function.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        call = self._async_inflight.get(key)
+        if call is not None:
+            return await asyncio.shield(call.future)
+
+        call = self._async_inflight[key] = _AsyncCall()
+        try:
+            value = await loader()
+        except BaseException as exc:
+            call.future.set_exception(exc)
+            # mark retrieved so a failure nobody waited for is not logged
+            call.future.exception()
+            raise
+        else:
+            with self._lock:
+                if not call.stale:
+                    self._store(key, value, time.monotonic() + self.ttl)
+            call.future.set_result(value)
+            return value
+        finally:
+            self._async_inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._data)
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": size,
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class DBInvalidationChannel:
+    """
+    Cross-worker cache invalidation through the shared database.
+
+    publish() appends the invalidated keys to the cache_invalidations table;
+    every worker calls poll() on its read path, at most once per `interval`
+    seconds, and drops the keys other workers published since its last poll.
+    A worker therefore never serves an entry for more than `interval`
+    seconds after another worker changed it.
+    """
+
+    def __init__(self, engine, cache: TTLCache, interval: float, key_type=str, retention: float = 300):
+        self.engine = engine
+        self.cache = cache
+        self.key_type = key_type
+        self.interval = interval
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._last_id = None
+        self._next_poll = 0.0
+        self._next_prune = 0.0
+
+    def publish(self, keys):
+        keys = [str(key) for key in keys]
+        if not keys:
+            return
+        now = time.time()
+        with self.engine.begin() as conn:
+            conn.execute(
+                insert(CacheInvalidation),
+                [{"cache": self.cache.name, "key": key, "created_at": now} for key in keys]
+            )
+            if now >= self._next_prune:
+                self._next_prune = now + self.retention
+                conn.execute(
+                    delete(CacheInvalidation)
+                    .where(CacheInvalidation.created_at < now - self.retention)
+                )
+
+    def poll_due(self) -> bool:
+        return time.monotonic() >= self._next_poll
+
+    def poll(self):
+        if not self._lock.acquire(blocking=False):
+            return  # another thread is already polling
+        try:
+            self._next_poll = time.monotonic() + self.interval
+            with self.engine.connect() as conn:
+                if self._last_id is None:
+                    # first poll: the local cache is empty, start from the tail
+                    self._last_id = conn.execute(
+                        select(func.coalesce(func.max(CacheInvalidation.id), 0))
+                    ).scalar_one()
+                    return
+                rows = conn.execute(
+                    select(CacheInvalidation.id, CacheInvalidation.key)
+                    .where(
+                        CacheInvalidation.id > self._last_id,
+                        CacheInvalidation.cache == self.cache.name
+                    )
+                    .order_by(CacheInvalidation.id)
+                ).all()
+            if rows:
+                self._last_id = rows[-1].id
+                self.cache.invalidate(*(self.key_type(row.key) for row in rows))
+        finally:
+            self._lock.release()
@@ -0,0 +1,149 @@
+import os
+from dotenv import load_dotenv
+
+
+# Load environment variables from .env. This is the only module that reads
+# the environment; everything else imports its settings from here.
+load_dotenv()
+
+
+def _get_bool(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Server (python -m app.main)
+API_UVICORN_WORKER = int(os.getenv("API_UVICORN_WORKER", 1))
+API_HOST = os.getenv("API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("API_PORT", 8000))
+
+# JWT
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+JWT_ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+
+# Database
+# "sync" serves every router from the threadpool with a sync Session,
+# "async" uses async routers backed by an AsyncSession.
+DB_MODE = os.getenv("DB_MODE", "sync").lower()
+DATABASE_URL = os.getenv("DATABASE_URL")
+# Optional explicit async URL; derived from DATABASE_URL when unset
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+# Read engines (see app.db.routing): read-only endpoints, listings and
+# exports query one of these, picked round robin; writes stay on the primary.
+# DATABASE_READ_URLS is a comma-separated list of replicas; SQLITE_READ_ENGINES
+# adds that many read-only engines on the primary's own SQLite file, a local
+# stand-in for replicas. A client that committed a write in the last
+# DB_READ_YOUR_WRITES_SECONDS (per worker, 0 disables) reads from the primary
+DATABASE_READ_URLS = [url.strip() for url in os.getenv("DATABASE_READ_URLS", "").split(",") if url.strip()]
+SQLITE_READ_ENGINES = int(os.getenv("SQLITE_READ_ENGINES", 0))
+DB_READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", 5))
+
+# Connection pool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+# seconds after which a pooled connection is replaced (-1 never)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", -1))
+# statements running longer than this are aborted (0 disables); it applies
+# to every statement, schema upgrades at startup included
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0))
+# connections each worker opens at startup, before taking traffic
+DB_POOL_PREWARM = int(os.getenv("DB_POOL_PREWARM", DB_POOL_SIZE))
+
+# SQLite connection settings, applied to every new connection
+SQLITE_PRAGMAS_ENABLED = _get_bool("SQLITE_PRAGMAS_ENABLED", True)
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+# negative values are KiB, positive values are pages
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", -65536))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 268435456))
+SQLITE_FOREIGN_KEYS = _get_bool("SQLITE_FOREIGN_KEYS", True)
+
+# Serialize write transactions in-process instead of contending for the SQLite file lock
+DB_SERIALIZE_WRITES = _get_bool("DB_SERIALIZE_WRITES", False)
+DB_WRITE_LOCK_TIMEOUT = float(os.getenv("DB_WRITE_LOCK_TIMEOUT", 30))
+
+# Product read cache
+PRODUCT_CACHE_ENABLED = _get_bool("PRODUCT_CACHE_ENABLED", True)
+PRODUCT_CACHE_SIZE = int(os.getenv("PRODUCT_CACHE_SIZE", 10000))
+PRODUCT_CACHE_TTL = float(os.getenv("PRODUCT_CACHE_TTL", 30))
+# "local" only invalidates this worker, "db" also tells the other workers
+# through the cache_invalidations table, polled every PRODUCT_CACHE_POLL_INTERVAL seconds
+PRODUCT_CACHE_INVALIDATION = os.getenv("PRODUCT_CACHE_INVALIDATION", "local").lower()
+PRODUCT_CACHE_POLL_INTERVAL = float(os.getenv("PRODUCT_CACHE_POLL_INTERVAL", 1))
+
+# Cache of verified JWT payloads
+JWT_CACHE_ENABLED = _get_bool("JWT_CACHE_ENABLED", True)
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", 10000))
+# only used for tokens without an `exp` claim
+JWT_CACHE_TTL = float(os.getenv("JWT_CACHE_TTL", 300))
+
+# Idempotency keys (POST /orders/)
+# how long a stored response is replayed for retries with the same key
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", 86400))
+# how long duplicates wait for the first request; after that its claim is
+# considered abandoned (e.g. the worker died) and the next retry runs
+IDEMPOTENCY_LOCK_TIMEOUT = float(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", 30))
+
+# Admission control
+# at most ADMISSION_*_LIMIT requests of each route class in flight per worker;
+# a request still waiting for a slot after ADMISSION_QUEUE_BUDGET_MS gets a
+# 503. GET / and /metrics are never held back. In sync mode keep the sum of
+# the limits within DB_POOL_SIZE + DB_MAX_OVERFLOW, so no threadpool thread
+# waits for a connection
+ADMISSION_ENABLED = _get_bool("ADMISSION_ENABLED", False)
+ADMISSION_AUTH_LIMIT = int(os.getenv("ADMISSION_AUTH_LIMIT", 4))
+ADMISSION_READ_LIMIT = int(os.getenv("ADMISSION_READ_LIMIT", 8))
+ADMISSION_WRITE_LIMIT = int(os.getenv("ADMISSION_WRITE_LIMIT", 3))
+ADMISSION_QUEUE_BUDGET_MS = float(os.getenv("ADMISSION_QUEUE_BUDGET_MS", 200))
+# per-user token bucket on the JWT `sub` (client address without a token):
+# ADMISSION_USER_RATE requests per second per worker, bursts of
+# ADMISSION_USER_BURST, then 429 (0 disables)
+ADMISSION_USER_RATE = float(os.getenv("ADMISSION_USER_RATE", 20))
+ADMISSION_USER_BURST = int(os.getenv("ADMISSION_USER_BURST", 40))
+
+# Analytics (/analytics/*)
+# summaries are cached per time window for ANALYTICS_CACHE_TTL seconds;
+# orders are read in columnar chunks of ANALYTICS_CHUNK_SIZE rows
+ANALYTICS_CACHE_TTL = float(os.getenv("ANALYTICS_CACHE_TTL", 60))
+ANALYTICS_CHUNK_SIZE = int(os.getenv("ANALYTICS_CHUNK_SIZE", 100000))
+
+# Stock allocation
+# the location an order is taken from: nearest (to the order's ship_to),
+# most_stock or fewest_splits; with ALLOCATION_ALLOW_SPLIT an order no single
+# location can fill is split across several
+ALLOCATION_POLICY = os.getenv("ALLOCATION_POLICY", "nearest").lower()
+ALLOCATION_ALLOW_SPLIT = _get_bool("ALLOCATION_ALLOW_SPLIT", True)
+
+# Password hashing
+# bcrypt cost factor; hashes with another cost are upgraded on the next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+# bcrypt runs in its own thread pool of BCRYPT_POOL_SIZE workers; once
+# BCRYPT_QUEUE_LIMIT more jobs are waiting, new ones get a 503
+BCRYPT_POOL_SIZE = int(os.getenv("BCRYPT_POOL_SIZE", min(4, os.cpu_count() or 1)))
+BCRYPT_QUEUE_LIMIT = int(os.getenv("BCRYPT_QUEUE_LIMIT", 16))
+
+# Responses
+# orjson for every JSON response, and list endpoints serialize through
+# prebuilt serializers instead of per-request response_model validation
+FAST_SERIALIZATION = _get_bool("FAST_SERIALIZATION", False)
+
+# Metrics
+# GET /metrics in Prometheus text format; with several workers also set
+# PROMETHEUS_MULTIPROC_DIR (python -m app.main does when API_UVICORN_WORKER > 1)
+METRICS_ENABLED = _get_bool("METRICS_ENABLED", True)
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Query profiler
+# per-request statement count and DB time in a Server-Timing header
+PROFILER_ENABLED = _get_bool("PROFILER_ENABLED", True)
+# statements at least this slow are logged with their route (0 disables)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 100))
+# cProfile one request in PROFILE_SAMPLE_RATE into PROFILE_DIR (0 disables)
+PROFILE_SAMPLE_RATE = int(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
@@ -0,0 +1,103 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url, URL
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app import config
+from app.db.routing import RoutingSession
+from app.db.session import (
+    DATABASE_URL,
+    READ_DATABASE_URLS,
+    apply_sqlite_pragmas,
+    engine_options,
+    limit_statement_time
+)
+from app.metrics import TimedAsyncAdaptedQueuePool, instrument_engine
+from app.profiling import profile_engine
+
+# Async driver used for each backend when DATABASE_URL names a sync one
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+    "mysql": "aiomysql",
+}
+
+
+def to_async_url(url: str) -> URL:
+    """
+    Turn a sync database URL into its async equivalent,
+    e.g. sqlite:///app.db -> sqlite+aiosqlite:///app.db.
+    URLs that already name an async driver are returned unchanged.
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    driver = parsed.get_driver_name()
+    if driver in ASYNC_DRIVERS.values():
+        return parsed
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver configured for database backend '{backend}'")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+ASYNC_DATABASE_URL = to_async_url(config.ASYNC_DATABASE_URL or DATABASE_URL)
+
+
+def create_async_db_engine(url):
+    options = engine_options(url)
+    if options and config.METRICS_ENABLED:
+        options["poolclass"] = TimedAsyncAdaptedQueuePool
+    engine = create_async_engine(
+        url,
+        echo=False,           # True for debugging
+        **options
+    )
+    if config.SQLITE_PRAGMAS_ENABLED and engine.dialect.name == "sqlite":
+        event.listen(engine.sync_engine, "connect", apply_sqlite_pragmas)
+    limit_statement_time(engine.sync_engine)
+    instrument_engine(engine.sync_engine)
+    profile_engine(engine.sync_engine)
+    return engine
+
+
+async_engine = create_async_db_engine(ASYNC_DATABASE_URL)
+async_read_engines = [create_async_db_engine(to_async_url(url)) for url in READ_DATABASE_URLS]
+
+# the sync session behind each AsyncSession does the routing, so it is
+# given the read engines' sync facades
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    sync_session_class=RoutingSession,
+    read_engines=[engine.sync_engine for engine in async_read_engines],
+    autoflush=False,
+    expire_on_commit=False
+)
+
+
+async def prewarm_async_pool(connections: int = config.DB_POOL_PREWARM, engine=None) -> None:
+    """
+    Async counterpart of prewarm_pool(), for async_engine by default.
+    """
+    engine = engine or async_engine
+    if not hasattr(engine.pool, "size"):
+        return
+    opened = [await engine.connect() for _ in range(min(connections, engine.pool.size()))]
+    for conn in opened:
+        await conn.close()
+
+
+#Method to access the database from async services
+async def get_async_db():
+    """
+    Yields an async database session and ensures it is closed after use.
+    Usage in FastAPI endpoints:
+        async def endpoint(db: AsyncSession = Depends(get_async_db)):
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    """
+    Async counterpart of get_read_db().
+    """
+    async with AsyncSessionLocal(for_reading=True) as db:
+        yield db
@@ -0,0 +1,183 @@
+import hashlib
+
+from sqlalchemy import delete, insert, inspect, select
+from sqlalchemy.schema import CreateColumn, CreateIndex, CreateTable
+
+import app.models  # noqa: F401  register every model on Base.metadata
+from app.db.base import Base
+from app.models import ProductStats, SchemaVersion
+from app.models.product_stats import STATS_COLUMNS, product_stats_aggregate
+
+
+# External-content FTS5 table over products.name plus the triggers that
+# keep it in sync. Stock updates do not touch it.
+PRODUCTS_FTS_TABLE = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts
+    USING fts5(name, content='products', content_rowid='id')
+"""
+# While a transaction holds a row in products_fts_paused the insert trigger
+# is skipped; bulk loads index their rows in one statement instead
+# (see app/services/product_import.py).
+PRODUCTS_FTS_PAUSED_TABLE = """
+    CREATE TABLE IF NOT EXISTS products_fts_paused (id INTEGER PRIMARY KEY)
+"""
+PRODUCTS_FTS_INSERT_TRIGGER = """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products
+    WHEN NOT EXISTS (SELECT 1 FROM products_fts_paused) BEGIN
+        INSERT INTO products_fts(rowid, name) VALUES (new.id, new.name);
+    END
+"""
+PRODUCTS_FTS_DDL = [
+    PRODUCTS_FTS_TABLE,
+    PRODUCTS_FTS_PAUSED_TABLE,
+    PRODUCTS_FTS_INSERT_TRIGGER,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name) VALUES ('delete', old.id, old.name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO products_fts(rowid, name) VALUES (new.id, new.name);
+    END
+    """,
+]
+
+
+
+def _product_stats_upsert(row: str, sign: str) -> str:
+    # add (sign "") or take back (sign "-") one order row's counts
+    columns = [column.key for _, orders, units in STATS_COLUMNS for column in (orders, units)]
+    values = [
+        f"{sign}({row}.status = '{status}'){extra}"
+        for status, _, _ in STATS_COLUMNS
+        for extra in ("", f" * {row}.quantity")
+    ]
+    return f"""
+        INSERT INTO product_stats (product_id, {", ".join(columns)})
+        SELECT {row}.product_id, {", ".join(values)} WHERE {row}.product_id IS NOT NULL
+        ON CONFLICT(product_id) DO UPDATE SET
+            {", ".join(f"{column} = {column} + excluded.{column}" for column in columns)};
+    """
+
+
+# Triggers that keep product_stats in step with orders, in the writing
+# transaction, whichever code path writes the orders
+PRODUCT_STATS_DDL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS orders_stats_ai AFTER INSERT ON orders BEGIN
+        {_product_stats_upsert("new", "")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS orders_stats_ad AFTER DELETE ON orders BEGIN
+        {_product_stats_upsert("old", "-")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS orders_stats_au AFTER UPDATE OF status, quantity, product_id ON orders
+    WHEN old.status IS NOT new.status OR old.quantity IS NOT new.quantity
+        OR old.product_id IS NOT new.product_id BEGIN
+        {_product_stats_upsert("old", "-")}
+        {_product_stats_upsert("new", "")}
+    END
+    """,
+]
+
+
+# products.stock of a product kept per location used to follow its
+# stock_locations through triggers, dropped from databases that still have
+# them: the location and order services keep it now, on every dialect
+# (see app/services/location.py and app/services/allocation.py)
+STOCK_LOCATIONS_DDL = [
+    f"DROP TRIGGER IF EXISTS {name}"
+    for name in ("stock_locations_ai", "stock_locations_ad", "stock_locations_au", "products_stock_au")
+]
+
+
+def schema_version(dialect) -> str:
+    """
+    Hash of the DDL init_db() runs on this dialect, so any change to a
+    model, an index or the FTS setup is a new version without a manual bump.
+    """
+    digest = hashlib.sha256()
+    for table in Base.metadata.sorted_tables:
+        digest.update(str(CreateTable(table).compile(dialect=dialect)).encode())
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            digest.update(str(CreateIndex(index).compile(dialect=dialect)).encode())
+    if dialect.name == "sqlite":
+        for ddl in PRODUCTS_FTS_DDL + PRODUCT_STATS_DDL + STOCK_LOCATIONS_DDL:
+            digest.update(ddl.encode())
+    return digest.hexdigest()
+
+
+def _add_missing_columns(conn) -> None:
+    # create_all leaves existing tables alone; new (nullable) columns are
+    # added in place and stay NULL on the existing rows
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+
+
+def _create_schema(conn) -> None:
+    stats_exist = inspect(conn).has_table(ProductStats.__tablename__)
+    Base.metadata.create_all(bind=conn)
+    _add_missing_columns(conn)
+    # create_all skips indexes added to tables that already exist
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+    if conn.dialect.name == "sqlite":
+        fts_exists = inspect(conn).has_table("products_fts")
+        for ddl in PRODUCTS_FTS_DDL:
+            conn.exec_driver_sql(ddl)
+        if not fts_exists:
+            # index the rows that predate the FTS table
+            conn.exec_driver_sql("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+        for ddl in PRODUCT_STATS_DDL:
+            conn.exec_driver_sql(ddl)
+        if not stats_exist:
+            # count the orders that predate the triggers
+            aggregate = product_stats_aggregate()
+            conn.execute(insert(ProductStats).from_select(list(aggregate.selected_columns.keys()), aggregate))
+        for ddl in STOCK_LOCATIONS_DDL:
+            conn.exec_driver_sql(ddl)
+
+    conn.execute(delete(SchemaVersion))
+    conn.execute(SchemaVersion.__table__.insert().values(id=1, version=schema_version(conn.dialect)))
+
+
+def init_db(engine) -> None:
+    """
+    Create missing tables and indexes, and on SQLite the product full-text
+    index and the product_stats triggers. Safe to run on every start.
+    """
+    with engine.begin() as conn:
+        _create_schema(conn)
+
+
+def ensure_schema(engine) -> bool:
+    """
+    Run init_db() only if the stored schema version differs from the
+    models', instead of reflecting every table on each start. Returns
+    whether the schema was (re)created.
+    """
+    version = schema_version(engine.dialect)
+    with engine.connect() as conn:
+        if conn.dialect.name == "sqlite":
+            # take the write lock up front: workers starting together on a
+            # new database wait for the first one instead of racing its DDL
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        if inspect(conn).has_table(SchemaVersion.__tablename__):
+            stored = conn.scalar(select(SchemaVersion.version).where(SchemaVersion.id == 1))
+            if stored == version:
+                return False
+        _create_schema(conn)
+        conn.commit()
+    return True
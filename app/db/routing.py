@@ -0,0 +1,112 @@
+"""
+Read/write routing between the primary and the read engines.
+
+Sessions opened for reading (SessionLocal(for_reading=True), get_read_db)
+run their statements on one read engine, picked round robin when the
+session is opened, so one call sees one consistent replica. Flushes and
+INSERT/UPDATE/DELETE always go to the primary, and so does everything a
+session runs after it committed a write. Sessions opened without the flag
+use the primary only.
+
+Read your writes: once a request's write commits, its client reads from
+the primary for DB_READ_YOUR_WRITES_SECONDS however far the replicas lag.
+Clients are the verified token's `sub`, or the client address on routes
+without a token. The window is kept per worker, so with several workers
+it only covers requests the same worker serves.
+"""
+import itertools
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+from app import config
+
+# Key in Session.info marking that the session's transaction wrote
+_WROTE = "wrote"
+# prune the write times once this many clients are tracked
+MAX_TRACKED_WRITERS = 10000
+
+_client = ContextVar("db_client", default=None)
+_turn = itertools.count()
+_last_write = {}
+
+
+def bind_client(scope):
+    """
+    Make the request's client current for read-your-writes; pass the
+    returned token to reset_client().
+    """
+    user = scope.get("state", {}).get("user")
+    return _client.set(user.get("sub") if user else (scope.get("client") or ("",))[0])
+
+
+def reset_client(token) -> None:
+    _client.reset(token)
+
+
+def _note_write(client, now: float) -> None:
+    if len(_last_write) >= MAX_TRACKED_WRITERS:
+        cutoff = now - config.DB_READ_YOUR_WRITES_SECONDS
+        for key, wrote_at in list(_last_write.items()):
+            if wrote_at < cutoff:
+                _last_write.pop(key, None)
+    _last_write[client] = now
+
+
+def wrote_recently(client, now: float) -> bool:
+    wrote_at = _last_write.get(client)
+    return wrote_at is not None and now - wrote_at < config.DB_READ_YOUR_WRITES_SECONDS
+
+
+class RoutingSession(Session):
+    """
+    Session that sends its reads to `read_bind` when opened with
+    for_reading=True and there are `read_engines`; see the module docstring.
+    """
+
+    def __init__(self, *args, read_engines=(), for_reading=False, **kw):
+        super().__init__(*args, **kw)
+        self.read_bind = None
+        if for_reading and read_engines and not wrote_recently(_client.get(), time.monotonic()):
+            self.read_bind = read_engines[next(_turn) % len(read_engines)]
+
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        if self.read_bind is not None and not self._flushing and not isinstance(clause, UpdateBase):
+            return self.read_bind
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+def _after_flush(session, flush_context):
+    session.info[_WROTE] = True
+
+
+def _do_orm_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[_WROTE] = True
+
+
+def _after_commit(session):
+    if session.info.pop(_WROTE, False):
+        session.read_bind = None
+        client = _client.get()
+        if client is not None:
+            _note_write(client, time.monotonic())
+
+
+def _after_rollback(session):
+    session.info.pop(_WROTE, None)
+
+
+def track_writes(session_class=RoutingSession):
+    """
+    Record committed writes for read your writes, on every session of
+    `session_class` (for AsyncSessions, their sync_session_class).
+    """
+    event.listen(session_class, "after_flush", _after_flush)
+    event.listen(session_class, "do_orm_execute", _do_orm_execute)
+    event.listen(session_class, "after_commit", _after_commit)
+    event.listen(session_class, "after_rollback", _after_rollback)
+    return session_class
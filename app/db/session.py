@@ -1,24 +1,187 @@
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 from pathlib import Path
 from app.db.base import Base
+from app.db.routing import RoutingSession, track_writes
+from app.db.writer import serialize_writes
+from app.metrics import TimedQueuePool, instrument_engine
+from app.profiling import profile_engine
+from app import config
 
 BASE_DIR = Path(__file__).resolve().parent
 DATABASE_PATH = BASE_DIR / "app.db"
-DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
+DATABASE_URL = config.DATABASE_URL or f"sqlite:///{DATABASE_PATH}"
+# every progress handler call checks the statement's deadline
+SQLITE_PROGRESS_STEPS = 10000
 
-engine = create_engine(
-    DATABASE_URL,
-    echo=False,           # True for debugging
-    future=True
+
+def read_only_url(url: str) -> str:
+    """
+    The same SQLite file opened read-only, e.g. sqlite:///app.db ->
+    sqlite:///file:app.db?mode=ro&uri=true.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite" or parsed.database in (None, "", ":memory:"):
+        raise RuntimeError("SQLITE_READ_ENGINES needs DATABASE_URL to be a SQLite file")
+    return parsed.set(
+        database=f"file:{parsed.database}",
+        query={**parsed.query, "mode": "ro", "uri": "true"}
+    ).render_as_string(hide_password=False)
+
+
+READ_DATABASE_URLS = config.DATABASE_READ_URLS + (
+    [read_only_url(DATABASE_URL)] * config.SQLITE_READ_ENGINES if config.SQLITE_READ_ENGINES else []
 )
 
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None):
+    """
+    Connection settings for SQLite. Runs on every new DBAPI connection,
+    since most of these pragmas are per-connection.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={config.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={int(config.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA cache_size={int(config.SQLITE_CACHE_SIZE)}")
+        cursor.execute(f"PRAGMA mmap_size={int(config.SQLITE_MMAP_SIZE)}")
+        cursor.execute(f"PRAGMA foreign_keys={'ON' if config.SQLITE_FOREIGN_KEYS else 'OFF'}")
+    finally:
+        cursor.close()
+
+
+def statement_timeout_args(url) -> dict:
+    """
+    connect_args that make the server abort statements running longer than
+    DB_STATEMENT_TIMEOUT_MS. SQLite has no such setting; see
+    limit_statement_time().
+    """
+    timeout_ms = config.DB_STATEMENT_TIMEOUT_MS
+    parsed = make_url(url)
+    if timeout_ms <= 0:
+        return {}
+    if parsed.get_backend_name() == "postgresql":
+        if parsed.get_driver_name() == "asyncpg":
+            return {"server_settings": {"statement_timeout": str(timeout_ms)}}
+        return {"options": f"-c statement_timeout={timeout_ms}"}
+    if parsed.get_backend_name() == "mysql":
+        return {"init_command": f"SET SESSION max_execution_time={timeout_ms}"}
+    return {}
+
+
+def engine_options(url: str) -> dict:
+    """
+    Pool and connection settings from config. In-memory SQLite uses a
+    single-connection pool that does not accept sizing arguments.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    options = {
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+    }
+    connect_args = statement_timeout_args(parsed)
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+def _start_statement_clock(conn, cursor, statement, parameters, context, executemany):
+    conn.connection.info["statement_deadline"][0] = time.monotonic() + config.DB_STATEMENT_TIMEOUT_MS / 1000
+
+
+def _stop_statement_clock(conn, *args):
+    conn.connection.info["statement_deadline"][0] = None
+
+
+def _statement_failed(exception_context):
+    conn = exception_context.connection
+    if conn is not None and not conn.invalidated:
+        _stop_statement_clock(conn)
+
+
+def _install_progress_handler(dbapi_connection, connection_record):
+    deadline = connection_record.info["statement_deadline"] = [None]
+
+    def past_deadline():
+        # a non-zero return interrupts the statement ("interrupted" OperationalError)
+        return deadline[0] is not None and time.monotonic() > deadline[0]
+
+    driver_connection = getattr(dbapi_connection, "driver_connection", None)
+    if driver_connection is not None:  # aiosqlite: its thread owns the connection
+        dbapi_connection.await_(driver_connection.set_progress_handler(past_deadline, SQLITE_PROGRESS_STEPS))
+    else:
+        dbapi_connection.set_progress_handler(past_deadline, SQLITE_PROGRESS_STEPS)
+
+
+def limit_statement_time(engine) -> None:
+    """
+    DB_STATEMENT_TIMEOUT_MS for SQLite (a sync Engine; for an AsyncEngine
+    pass its .sync_engine): a progress handler interrupts a statement once
+    it has run that long. The clock stops when execute() returns, so a
+    streamed result is not cut off while it is being fetched.
+    """
+    if config.DB_STATEMENT_TIMEOUT_MS <= 0 or engine.dialect.name != "sqlite":
+        return
+    event.listen(engine, "connect", _install_progress_handler)
+    event.listen(engine, "before_cursor_execute", _start_statement_clock)
+    event.listen(engine, "after_cursor_execute", _stop_statement_clock)
+    event.listen(engine, "handle_error", _statement_failed)
+
+
+def create_db_engine(url: str, sqlite_pragmas: bool = config.SQLITE_PRAGMAS_ENABLED):
+    options = engine_options(url)
+    if options and config.METRICS_ENABLED:
+        options["poolclass"] = TimedQueuePool
+    engine = create_engine(
+        url,
+        echo=False,           # True for debugging
+        future=True,
+        **options
+    )
+    if sqlite_pragmas and engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", apply_sqlite_pragmas)
+    limit_statement_time(engine)
+    instrument_engine(engine)
+    profile_engine(engine)
+    return engine
+
+
+engine = create_db_engine(DATABASE_URL)
+read_engines = [create_db_engine(url) for url in READ_DATABASE_URLS]
+
 SessionLocal = sessionmaker(
     bind=engine,
+    class_=RoutingSession,
+    read_engines=read_engines,
     autoflush=False,
     autocommit=False
 )
 
+if config.DB_SERIALIZE_WRITES:
+    serialize_writes(SessionLocal)
+
+if read_engines and config.DB_READ_YOUR_WRITES_SECONDS > 0:
+    track_writes(RoutingSession)
+
+
+def prewarm_pool(engine, connections: int = config.DB_POOL_PREWARM) -> None:
+    """
+    Open up to `connections` pooled connections (at most the pool size) so
+    the first requests do not pay for connecting and the pragmas.
+    """
+    if not hasattr(engine.pool, "size"):
+        return  # in-memory SQLite: single connection, nothing to warm
+    opened = [engine.connect() for _ in range(min(connections, engine.pool.size()))]
+    for conn in opened:
+        conn.close()
+
 
 #Method to access the database from services
 def get_db():
@@ -31,4 +194,16 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def get_read_db():
+    """
+    Like get_db, for endpoints that only read: the session queries a read
+    engine when there are any (see app.db.routing).
+    """
+    db = SessionLocal(for_reading=True)
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,65 @@
+import threading
+
+from sqlalchemy import event
+
+from app import config
+
+# Key in Session.info marking that the session currently holds the write lock
+_HOLDS_WRITE_LOCK = "holds_write_lock"
+
+_write_lock = threading.Lock()
+
+
+def _acquire(session):
+    if session.info.get(_HOLDS_WRITE_LOCK):
+        return
+    if not _write_lock.acquire(timeout=config.DB_WRITE_LOCK_TIMEOUT):
+        raise TimeoutError("Timed out waiting for the database write lock")
+    session.info[_HOLDS_WRITE_LOCK] = True
+
+
+def _release(session):
+    if session.info.pop(_HOLDS_WRITE_LOCK, False):
+        _write_lock.release()
+
+
+def _before_flush(session, flush_context, instances):
+    if session.new or session.dirty or session.deleted:
+        _acquire(session)
+
+
+def _do_orm_execute(orm_execute_state):
+    if (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+        # text()/DDL statements that write opt in explicitly
+        or orm_execute_state.execution_options.get("db_write", False)
+    ):
+        _acquire(orm_execute_state.session)
+
+
+def _after_transaction_end(session, transaction):
+    if transaction.parent is None:
+        _release(session)
+
+
+def serialize_writes(session_factory):
+    """
+    Serialize write transactions from every session made by `session_factory`
+    through one in-process lock.
+
+    A session takes the lock the first time it flushes changes or runs an
+    INSERT/UPDATE/DELETE (or a statement with execution_options(db_write=True)),
+    and gives it back when its transaction commits or
+    rolls back. Writers then queue up in the process instead of retrying
+    against SQLite's file lock; readers are not affected (use WAL mode so
+    they do not block the writer either).
+
+    Only for sync sessions: the lock is blocking, so it must not be used
+    from the event loop.
+    """
+    event.listen(session_factory, "before_flush", _before_flush)
+    event.listen(session_factory, "do_orm_execute", _do_orm_execute)
+    event.listen(session_factory, "after_transaction_end", _after_transaction_end)
+    return session_factory
@@ -1,110 +1,152 @@
 import os
-from fastapi import FastAPI, Request, HTTPException, status
+import shutil
+import tempfile
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import JSONResponse
-from dotenv import load_dotenv
-
-from app.db.base import Base
-from app.db.session import engine
-from app.utils import verify_jwt_token
-
-
-# routers
-from app.routers.auth_router import router as auth_router
-from app.routers.user_router import router as user_router
-from app.routers.product_router import router as product_router
-from app.routers.order_router import router as order_router
-
-# Load environment variables
-load_dotenv()
-
-# Create DB tables
-Base.metadata.create_all(bind=engine)
-
-# FastAPI App
-app = FastAPI(
-    title="Warehouse Management System (WMS)",
-    version="1.0.0",
-    description="FastAPI backend with JWT authentication"
-)
-
-class JWTAuthMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        # Define protected paths
-        protected_paths = ["/orders", "/products"]
-
-        try:
-            # Only protect certain paths
-            if any(request.url.path.startswith(path) for path in protected_paths):
-                auth_header = request.headers.get("Authorization")
-                
-                if not auth_header or not auth_header.startswith("Bearer "):
-                    return JSONResponse(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        content={"detail": "Authorization header missing or invalid"}
-                    )
-
-                token = auth_header.split(" ")[1]
-                print(1)
-                try:
-                    payload = verify_jwt_token(token)
-                    request.state.user = payload  # store payload for route access
-                    print(payload)
-                except Exception:
-                    print(3)
-                    return JSONResponse(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        content={"detail": "Invalid or expired token"}
-                    )
-                print(2)
-            # Proceed to the next middleware / route
-            response = await call_next(request)
-            return response
-
-        except Exception as exc:
-            # Catch any unexpected errors in middleware
-            return JSONResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                content={"detail": "Internal server error in authentication middleware"}
-            )
-
-app.add_middleware(JWTAuthMiddleware)
-
-# CORS Middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"], 
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Routers
-app.include_router(auth_router)
-app.include_router(user_router)
-app.include_router(product_router)
-app.include_router(order_router)
-
-# Health Check
-@app.get("/", tags=["Health"])
-def health_check():
-    return {"status": "OK", "message": "WMS backend is running"}
+
+from app import config
+from app.db.init_db import ensure_schema
+from app.db.session import engine, prewarm_pool, read_engines
+from app.metrics import CONTENT_TYPE_LATEST, mark_process_dead, metrics_payload
+from app.middleware import AdmissionMiddleware, JWTAuthMiddleware, MetricsMiddleware
+from app.routing import InstrumentedAPIRoute
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # once per worker, before it accepts connections: create or upgrade the
+    # schema only if its stored version is outdated, and open the pool
+    ensure_schema(engine)
+    if config.DB_MODE == "async":
+        from app.db.async_session import async_engine, async_read_engines, prewarm_async_pool
+        for pool_engine in (async_engine, *async_read_engines):
+            await prewarm_async_pool(engine=pool_engine)
+    else:
+        for pool_engine in (engine, *read_engines):
+            prewarm_pool(pool_engine)
+    yield
+    # this worker's in-flight gauges no longer count in /metrics
+    mark_process_dead()
+    if config.DB_MODE == "async":
+        for pool_engine in (async_engine, *async_read_engines):
+            await pool_engine.dispose()
+    for pool_engine in (engine, *read_engines):
+        pool_engine.dispose()
+
+
+def create_app() -> FastAPI:
+    """
+    Build the application. Importing this module does no work; the
+    database is prepared by the lifespan hook when a server starts the app.
+    """
+    # routers (DB_MODE=async serves the same API from async routers and services)
+    if config.DB_MODE == "async":
+        from app.routers.aio.auth_router import router as auth_router
+        from app.routers.aio.user_router import router as user_router
+        from app.routers.aio.product_router import router as product_router
+        from app.routers.aio.order_router import router as order_router
+        from app.routers.aio.analytics_router import router as analytics_router
+        from app.routers.aio.location_router import router as location_router
+    else:
+        from app.routers.auth_router import router as auth_router
+        from app.routers.user_router import router as user_router
+        from app.routers.product_router import router as product_router
+        from app.routers.order_router import router as order_router
+        from app.routers.analytics_router import router as analytics_router
+        from app.routers.location_router import router as location_router
+
+    # FastAPI App
+    app = FastAPI(
+        title="Warehouse Management System (WMS)",
+        version="1.0.0",
+        description="FastAPI backend with JWT authentication",
+        default_response_class=ORJSONResponse if config.FAST_SERIALIZATION else JSONResponse,
+        lifespan=lifespan
+    )
+    app.router.route_class = InstrumentedAPIRoute
+
+    # Inside the JWT middleware, so per-user limits see the token's subject
+    if config.ADMISSION_ENABLED:
+        app.add_middleware(AdmissionMiddleware)
+
+    app.add_middleware(JWTAuthMiddleware)
+
+    # CORS Middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "Server-Timing", "Idempotent-Replayed", "Retry-After"],
+    )
+
+    # Outermost, so it times the whole stack and sees every response
+    if config.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+
+    # Routers
+    app.include_router(auth_router)
+    app.include_router(user_router)
+    app.include_router(product_router)
+    app.include_router(order_router)
+    app.include_router(analytics_router)
+    app.include_router(location_router)
+
+    # Health Check
+    @app.get("/", tags=["Health"])
+    def health_check():
+        return {"status": "OK", "message": "WMS backend is running"}
+
+    if config.METRICS_ENABLED:
+        @app.get("/metrics", include_in_schema=False)
+        def metrics():
+            """
+            Prometheus text format; covers every worker in multiprocess mode.
+            """
+            return Response(metrics_payload(), media_type=CONTENT_TYPE_LATEST)
+
+    return app
+
+
+_app = None
+
+
+def __getattr__(name: str):
+    # `app.main:app` (uvicorn, tests, benchmarks) builds the app on first use
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
     import uvicorn
 
-    workers = int(os.getenv("API_UVICORN_WORKER", 1))
-    host = os.getenv("API_HOST", "0.0.0.0")
-    port = int(os.getenv("API_PORT", 8000))
+    workers = config.API_UVICORN_WORKER
+    host = config.API_HOST
+    port = config.API_PORT
+
+    if workers > 1 and config.METRICS_ENABLED and not config.PROMETHEUS_MULTIPROC_DIR:
+        # one shared, empty directory so /metrics aggregates every worker;
+        # must be set before the workers import prometheus_client
+        metrics_dir = os.path.join(tempfile.gettempdir(), f"wms-metrics-{port}")
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir)
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
 
     print(
         f"Starting WMS server with {workers} workers on {host}:{port}"
     )
 
     uvicorn.run(
-        "app.main:app",
+        "app.main:create_app",
+        factory=True,
         host=host,
         port=port,
         workers=workers,
@@ -0,0 +1,180 @@
+"""
+Prometheus metrics: HTTP requests per route, SQLAlchemy engine/pool
+timings and in-process cache lookups, served in text format by GET /metrics.
+A cache's hit rate is rate(cache_lookups_total{result="hit"}) over
+rate(cache_lookups_total), per cache.
+
+With several uvicorn workers, point PROMETHEUS_MULTIPROC_DIR at an empty
+directory before the workers start; every worker then writes its values
+there and /metrics aggregates all of them, whichever worker answers.
+"""
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app import config
+
+MULTIPROCESS_DIR = config.PROMETHEUS_MULTIPROC_DIR
+UNMATCHED_ROUTE = "<unmatched>"
+# database work is mostly sub-millisecond, the HTTP defaults start at 5ms
+DB_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route template and status", ["method", "route", "status"]
+)
+HTTP_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ["method", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests being handled by route template", ["method", "route"],
+    multiprocess_mode="livesum"
+)
+HTTP_REJECTED = Counter(
+    "http_requests_rejected_total", "Requests turned away by admission control",
+    ["route_class", "reason"]
+)
+DB_QUERIES = Counter("db_queries_total", "SQL statements executed", ["operation"])
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "SQL statement execution time", ["operation"], buckets=DB_BUCKETS
+)
+DB_POOL_CHECKOUTS = Counter("db_pool_checkouts_total", "Connections checked out of the pool")
+DB_POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use", "Connections currently checked out", multiprocess_mode="livesum"
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent getting a connection from the pool", buckets=DB_BUCKETS
+)
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Cache lookups by cache and result (hit/miss)", ["cache", "result"])
+CACHE_EVICTIONS = Counter("cache_evictions_total", "Entries evicted to keep a cache within its size", ["cache"])
+
+_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+# bound label children, so the hot path skips the labels() lookup
+_request_children = {}
+
+
+def observe_request(method: str, route: str, status_code: int, seconds: float) -> None:
+    key = (method, route, status_code)
+    children = _request_children.get(key)
+    if children is None:
+        children = _request_children[key] = (
+            HTTP_REQUESTS.labels(method, route, str(status_code)),
+            HTTP_DURATION.labels(method, route),
+        )
+    children[0].inc()
+    children[1].observe(seconds)
+
+
+def observe_rejected(route_class: str, reason: str) -> None:
+    HTTP_REJECTED.labels(route_class, reason).inc()
+
+
+def in_progress(method: str, route: str):
+    return HTTP_IN_PROGRESS.labels(method, route)
+
+
+def instrument_cache(cache) -> None:
+    """
+    Count a TTLCache's hits, misses and evictions under its name.
+    """
+    if not config.METRICS_ENABLED:
+        return
+    cache.counters = (
+        CACHE_LOOKUPS.labels(cache.name, "hit"),
+        CACHE_LOOKUPS.labels(cache.name, "miss"),
+        CACHE_EVICTIONS.labels(cache.name),
+    )
+
+
+def _operation(statement: str) -> str:
+    verb = statement.lstrip()[:6].upper()
+    return verb if verb in _OPERATIONS else "OTHER"
+
+
+_query_children = {
+    operation: (DB_QUERIES.labels(operation), DB_QUERY_DURATION.labels(operation))
+    for operation in (*_OPERATIONS, "OTHER")
+}
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("query_started", None)
+    if started is None:
+        return
+    count, duration = _query_children[_operation(statement)]
+    count.inc()
+    duration.observe(time.perf_counter() - started)
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    DB_POOL_CHECKOUTS.inc()
+    DB_POOL_IN_USE.inc()
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    DB_POOL_IN_USE.dec()
+
+
+def instrument_engine(engine) -> None:
+    """
+    Time every statement and count pool checkouts on a (sync) Engine;
+    for an AsyncEngine pass its .sync_engine.
+    """
+    if not config.METRICS_ENABLED:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "checkout", _on_checkout)
+    event.listen(engine, "checkin", _on_checkin)
+
+
+class _TimedCheckout:
+    # the pools have no event before a checkout starts, so time _do_get,
+    # which is where a checkout waits for a free connection
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - started)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def metrics_payload() -> bytes:
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead(pid: int = None) -> None:
+    """
+    Drop a finished worker's live gauges (multiprocess mode only).
+    """
+    if MULTIPROCESS_DIR:
+        multiprocess.mark_process_dead(pid or os.getpid())
+
@@ -0,0 +1,169 @@
+import math
+import re
+import time
+
+from fastapi import status
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+from app import config
+from app.admission import AdmissionGate, TokenBuckets, route_class
+from app.metrics import UNMATCHED_ROUTE, observe_rejected, observe_request
+from app.utils import verify_jwt_token
+
+
+class JWTAuthMiddleware:
+    """
+    Pure ASGI JWT authentication for the protected path prefixes. A
+    `{name}` segment in a prefix matches any single path segment.
+
+    Verified claims are stored in scope["state"]["user"] (request.state.user
+    in the routes). The request and response are passed through untouched,
+    so streaming responses are never buffered and no extra task is spawned.
+    """
+
+    def __init__(
+        self,
+        app,
+        protected_paths=("/orders", "/products", "/analytics", "/locations", "/users/export", "/users/{user_id}/orders")
+    ):
+        self.app = app
+        self.protected = re.compile(
+            "|".join(re.sub(r"\\\{\w+\\\}", "[^/]+", re.escape(path)) for path in protected_paths)
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.protected.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            auth_header = Headers(scope=scope).get("Authorization")
+            if not auth_header or not auth_header.startswith("Bearer "):
+                response = JSONResponse(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    content={"detail": "Authorization header missing or invalid"}
+                )
+                await response(scope, receive, send)
+                return
+
+            token = auth_header.split(" ")[1]
+            try:
+                payload = verify_jwt_token(token)
+            except Exception:
+                response = JSONResponse(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    content={"detail": "Invalid or expired token"}
+                )
+                await response(scope, receive, send)
+                return
+
+            scope.setdefault("state", {})["user"] = payload  # store payload for route access
+
+        except Exception:
+            # Catch any unexpected errors in authentication
+            response = JSONResponse(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                content={"detail": "Internal server error in authentication middleware"}
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI request count and latency per route template. Add it last so
+    it is the outermost middleware and also sees requests answered by the
+    other middlewares (e.g. a 401 from JWTAuthMiddleware, counted under
+    "<unmatched>" since no route was matched).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # the router stores the matched route in the (shared) scope
+            route = scope.get("route")
+            observe_request(
+                scope["method"],
+                route.path if route is not None else UNMATCHED_ROUTE,
+                status_code,
+                time.perf_counter() - started
+            )
+
+
+class AdmissionMiddleware:
+    """
+    Pure ASGI admission control (see app.admission). Add it before
+    JWTAuthMiddleware so it runs inside it: per-user buckets are keyed on
+    the verified token's `sub`, or the client address on routes without a
+    token. A user over their rate gets a 429, a request that waited longer
+    than the queue budget for its route class a 503; both carry Retry-After.
+    """
+
+    def __init__(self, app, exempt_paths=("/", "/metrics")):
+        self.app = app
+        self.exempt = frozenset(exempt_paths)
+        self.gates = {
+            "auth": AdmissionGate(config.ADMISSION_AUTH_LIMIT),
+            "read": AdmissionGate(config.ADMISSION_READ_LIMIT),
+            "write": AdmissionGate(config.ADMISSION_WRITE_LIMIT),
+        }
+        self.budget = config.ADMISSION_QUEUE_BUDGET_MS / 1000
+        self.buckets = None
+        if config.ADMISSION_USER_RATE > 0:
+            self.buckets = TokenBuckets(config.ADMISSION_USER_RATE, config.ADMISSION_USER_BURST)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt:
+            await self.app(scope, receive, send)
+            return
+
+        kind = route_class(scope["method"], scope["path"])
+        if self.buckets is not None:
+            user = scope.get("state", {}).get("user")
+            key = user.get("sub") if user else (scope.get("client") or ("",))[0]
+            wait = self.buckets.take(key, time.monotonic())
+            if wait:
+                await self._reject(scope, receive, send, kind, "rate_limited",
+                                   status.HTTP_429_TOO_MANY_REQUESTS, "Too many requests", wait)
+                return
+
+        gate = self.gates[kind]
+        if not await gate.acquire(self.budget):
+            await self._reject(scope, receive, send, kind, "overloaded",
+                               status.HTTP_503_SERVICE_UNAVAILABLE, "Server is busy, retry shortly", 1)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
+
+    @staticmethod
+    async def _reject(scope, receive, send, kind, reason, status_code, detail, retry_after):
+        if config.METRICS_ENABLED:
+            observe_rejected(kind, reason)
+        response = JSONResponse(
+            status_code=status_code,
+            content={"detail": detail},
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+        await response(scope, receive, send)
@@ -1,3 +1,10 @@
 from .user import User
 from .product import Product
 from .order import Order
+from .product_stats import ProductStats
+from .location import Location
+from .stock_location import StockLocation
+from .order_allocation import OrderAllocation
+from .cache_invalidation import CacheInvalidation
+from .idempotency_key import IdempotencyKey
+from .schema_version import SchemaVersion
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, Float
+
+from app.db.base import Base
+
+
+class CacheInvalidation(Base):
+    """
+    Append-only log of invalidated cache keys, polled by every worker.
+    """
+    __tablename__ = "cache_invalidations"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    cache = Column(String(50), nullable=False)
+    key = Column(String(100), nullable=False)
+    created_at = Column(Float, nullable=False, index=True)
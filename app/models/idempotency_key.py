@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Float, Integer, String, Text
+
+from app.db.base import Base
+
+
+class IdempotencyKey(Base):
+    """
+    Response of the first request sent with an Idempotency-Key header.
+    status_code and body stay NULL while that request is still running.
+    """
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(320), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer)
+    body = Column(Text)
+    created_at = Column(Float, nullable=False, index=True)
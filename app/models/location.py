@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Float, Integer, String
+
+from app.db.base import Base
+
+
+class Location(Base):
+    """
+    A warehouse. Coordinates (degrees) are optional; the nearest allocation
+    policy ranks locations without them last.
+    """
+    __tablename__ = "locations"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), nullable=False, unique=True)
+    latitude = Column(Float)
+    longitude = Column(Float)
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, ForeignKey,Enum as SQLEnum
+import time
+
+from sqlalchemy import Column, Float, Integer, String, ForeignKey, Index,Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from enum import Enum
 from app.db.base import Base
@@ -13,10 +15,20 @@ class OrderStatusEnum(str, Enum):
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # listings filter on user/product and status, then page by id
+        Index("ix_orders_user_status_id", "user_id", "status", "id"),
+        Index("ix_orders_product_status_id", "product_id", "status", "id"),
+        Index("ix_orders_status_id", "status", "id"),
+        # covers the analytics scan of a time window (app/services/analytics.py)
+        Index("ix_orders_created_at", "created_at", "product_id", "quantity", "status"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     quantity = Column(Integer, nullable=False)
     status = Column(SQLEnum(OrderStatusEnum), default=OrderStatusEnum.CREATED)
+    # epoch seconds; NULL for orders that predate the column
+    created_at = Column(Float, default=time.time)
 
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     product_id = Column(Integer, ForeignKey("products.id"))
@@ -24,3 +36,5 @@ class Order(Base):
     # Relationships
     user = relationship("User", back_populates="orders")
     product = relationship("Product", back_populates="orders")
+    # rows go with the order through the foreign key's ON DELETE CASCADE
+    allocations = relationship("OrderAllocation", passive_deletes=True)
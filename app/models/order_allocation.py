@@ -0,0 +1,15 @@
+from sqlalchemy import Column, ForeignKey, Integer
+
+from app.db.base import Base
+
+
+class OrderAllocation(Base):
+    """
+    Units of an order taken from one location; a split shipment has a row
+    per location. Cancelling or deleting the order gives them back there.
+    """
+    __tablename__ = "order_allocations"
+
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), primary_key=True)
+    location_id = Column(Integer, ForeignKey("locations.id"), primary_key=True)
+    quantity = Column(Integer, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float
+from sqlalchemy import Column, Integer, String, Float, column, table
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base
@@ -9,7 +9,7 @@ class Product(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False, index=True)
-    price = Column(Float, nullable=False)
+    price = Column(Float, nullable=False, index=True)
     stock = Column(Integer, nullable=False, default=0)
 
     # Relationships
@@ -17,3 +17,8 @@ class Product(Base):
         "Order",
         back_populates="product"
     )
+
+
+# SQLite FTS5 index over products.name (rowid = products.id), created and
+# kept in sync by triggers in app/db/init_db.py
+products_fts = table("products_fts", column("rowid"), column("name"))
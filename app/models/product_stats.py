@@ -0,0 +1,62 @@
+from sqlalchemy import Column, ForeignKey, Integer, func, select
+
+from app.db.base import Base
+from app.models.order import Order, OrderStatusEnum
+
+ORDER_STATUSES = [status.value for status in OrderStatusEnum]
+
+
+class ProductStats(Base):
+    """
+    Order count and units per status for each product, kept up to date by
+    triggers on orders in the same transaction as every order write (see
+    app/db/init_db.py). Products without orders may have no row. The
+    triggers exist on SQLite only; read it through product_stats_source().
+    """
+    __tablename__ = "product_stats"
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    created_orders = Column(Integer, nullable=False, server_default="0")
+    created_units = Column(Integer, nullable=False, server_default="0")
+    shipped_orders = Column(Integer, nullable=False, server_default="0")
+    shipped_units = Column(Integer, nullable=False, server_default="0")
+    delivered_orders = Column(Integer, nullable=False, server_default="0")
+    delivered_units = Column(Integer, nullable=False, server_default="0")
+    cancelled_orders = Column(Integer, nullable=False, server_default="0")
+    cancelled_units = Column(Integer, nullable=False, server_default="0")
+
+
+# (status, orders column, units column)
+STATS_COLUMNS = [
+    (status, getattr(ProductStats, f"{status.lower()}_orders"), getattr(ProductStats, f"{status.lower()}_units"))
+    for status in ORDER_STATUSES
+]
+
+
+def product_stats_aggregate(after: int = None, until: int = None):
+    """
+    product_stats rows computed from scratch from orders, for the products
+    with after < id <= until. Columns are named like ProductStats'.
+    """
+    columns = [Order.product_id.label("product_id")]
+    for status, orders, units in STATS_COLUMNS:
+        matches = (Order.status == status).cast(Integer)
+        columns.append(func.coalesce(func.sum(matches), 0).label(orders.key))
+        columns.append(func.coalesce(func.sum(matches * Order.quantity), 0).label(units.key))
+    stmt = select(*columns).where(Order.product_id.is_not(None)).group_by(Order.product_id)
+    if after is not None:
+        stmt = stmt.where(Order.product_id > after)
+    if until is not None:
+        stmt = stmt.where(Order.product_id <= until)
+    return stmt
+
+
+def product_stats_source(dialect: str, after: int = None, until: int = None):
+    """
+    Where to read product_stats rows from: the table where the triggers
+    keep it up to date (SQLite), the same rows aggregated from orders on
+    other dialects. Columns are named like ProductStats' either way.
+    """
+    if dialect == "sqlite":
+        return ProductStats.__table__
+    return product_stats_aggregate(after, until).subquery("product_stats")
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String
+
+from app.db.base import Base
+
+
+class SchemaVersion(Base):
+    """
+    Single row with the version of the schema init_db() last created.
+    """
+    __tablename__ = "schema_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(String(64), nullable=False)
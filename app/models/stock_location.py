@@ -0,0 +1,20 @@
+from sqlalchemy import CheckConstraint, Column, ForeignKey, Integer
+
+from app.db.base import Base
+
+
+class StockLocation(Base):
+    """
+    Units of a product held at one location. Once a product has rows here,
+    products.stock is their sum, kept so by the services that change them
+    (see app/services/location.py).
+    The primary key makes a product's locations one index range.
+    """
+    __tablename__ = "stock_locations"
+    __table_args__ = (
+        CheckConstraint("quantity >= 0", name="ck_stock_locations_quantity"),
+    )
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    location_id = Column(Integer, ForeignKey("locations.id", ondelete="CASCADE"), primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,61 @@
+import base64
+import json
+
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+
+
+def encode_cursor(*key) -> str:
+    """
+    Opaque cursor pointing just after the row whose sort key is `key`.
+    """
+    raw = json.dumps({"after": list(key)}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, size: int = 1) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(raw)["after"]
+    except Exception:
+        key = None
+    if (
+        not isinstance(key, list)
+        or len(key) != size
+        or not all(type(value) in (int, float, str) for value in key)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return key
+
+
+def keyset(stmt, columns, cursor: str = None, limit: int = 10, descending: bool = False):
+    """
+    Restrict a select()/Query to the page after `cursor`, ordered by
+    `columns` (the last one must be unique, usually the primary key).
+    One extra row is fetched to detect the next page.
+    """
+    columns = list(columns)
+    if cursor:
+        after = decode_cursor(cursor, len(columns))
+        if len(columns) == 1:
+            key, after = columns[0], after[0]
+        else:
+            key, after = tuple_(*columns), tuple_(*after)
+        stmt = stmt.where(key < after if descending else key > after)
+    order_by = [column.desc() if descending else column for column in columns]
+    return stmt.order_by(*order_by).limit(limit + 1)
+
+
+def split_page(rows, limit: int, key=lambda row: (row.id,)):
+    """
+    Return (page, next_cursor) for rows fetched with keyset(); next_cursor
+    is None on the last page. `key` gives the sort key of a row.
+    """
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(*key(page[-1]))
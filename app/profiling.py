@@ -0,0 +1,189 @@
+"""
+Per-request query profiling.
+
+Every request routed through InstrumentedAPIRoute gets a RequestProfile in
+a context variable. The engine hooks below add each statement's count and
+time to it, for all sessions the request uses: get_db's, and the ones
+services open themselves. The totals go out in a Server-Timing header.
+
+Statements slower than SLOW_QUERY_MS are logged in normalized form, with
+the route that ran them.
+
+With PROFILE_SAMPLE_RATE=N, one request in N also runs its endpoint
+under cProfile. Its stats are written to PROFILE_DIR; open them with
+`python -m pstats` or snakeviz. The profiler runs in the thread that runs
+the endpoint: the threadpool thread of a sync endpoint, the event loop of
+an async one, where other requests' tasks interleaving with it show up in
+the trace too. Only one request per process is profiled at a time (a
+second profiler cannot be enabled on Python 3.12+, and on older versions
+they would replace each other); a sample due while one runs is skipped.
+"""
+import cProfile
+import functools
+import inspect
+import itertools
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from app import config
+
+logger = logging.getLogger(__name__)
+
+NO_ROUTE = "-"
+
+_current = ContextVar("request_profile", default=None)
+_sample_counter = itertools.count()
+# held by the sampled request being profiled
+_sampling = threading.Lock()
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAMETER = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<!:):\w+\b")
+# IN (?, ?, ?) from expanding parameters, or VALUES (...), (...) from insertmanyvalues
+_PARAMETER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class RequestProfile:
+    __slots__ = ("method", "route", "started", "queries", "db_seconds", "sampled", "profiler", "number")
+
+    def __init__(self, method: str, route: str, number: int = 0, sampled: bool = False):
+        self.method = method
+        self.route = route
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.sampled = sampled
+        # set by profile_endpoint once the endpoint runs
+        self.profiler = None
+        self.number = number
+
+    def server_timing(self) -> bytes:
+        app_ms = (time.perf_counter() - self.started) * 1000
+        return (
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries", app;dur={app_ms:.2f}'
+        ).encode("latin-1")
+
+
+def normalize_sql(statement: str) -> str:
+    """
+    Statement with literals and parameters replaced by ?, parameter lists
+    collapsed and whitespace squeezed, so one query shape is one log line.
+    """
+    sql = _STRING_LITERAL.sub("?", statement)
+    sql = _PARAMETER.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _PARAMETER_LIST.sub("(...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def start_request(method: str, route: str):
+    """
+    Make a RequestProfile current for this request; pass the returned token
+    to finish_request().
+    """
+    number = next(_sample_counter)
+    sampled = (
+        config.PROFILE_SAMPLE_RATE > 0
+        and number % config.PROFILE_SAMPLE_RATE == 0
+        and _sampling.acquire(blocking=False)
+    )
+    profile = RequestProfile(method, route, number, sampled)
+    return profile, _current.set(profile)
+
+
+def finish_request(profile: RequestProfile, token) -> None:
+    _current.reset(token)
+    if profile.sampled:
+        try:
+            if profile.profiler is not None:
+                _write_trace(profile)
+        finally:
+            _sampling.release()
+
+
+def _write_trace(profile: RequestProfile) -> None:
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", profile.route).strip("_") or "root"
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{profile.number}-{profile.method}-{slug}.prof"
+    try:
+        os.makedirs(config.PROFILE_DIR, exist_ok=True)
+        pstats.Stats(profile.profiler).dump_stats(os.path.join(config.PROFILE_DIR, name))
+    except Exception:
+        logger.exception("Failed to write request profile %s", name)
+
+
+def _sampled_profile():
+    profile = _current.get()
+    if profile is None or not profile.sampled:
+        return None
+    return profile
+
+
+def profile_endpoint(endpoint):
+    """
+    Wrap an endpoint so a sampled request runs it under cProfile, in the
+    thread that runs it (cProfile only sees its own thread).
+    """
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            profile = _sampled_profile()
+            if profile is None:
+                return await endpoint(*args, **kwargs)
+            profile.profiler = cProfile.Profile()
+            profile.profiler.enable()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                profile.profiler.disable()
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        profile = _sampled_profile()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        profile.profiler = cProfile.Profile()
+        return profile.profiler.runcall(endpoint, *args, **kwargs)
+    return wrapper
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["profile_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("profile_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    profile = _current.get()
+    if profile is not None:
+        profile.queries += 1
+        profile.db_seconds += elapsed
+    if config.SLOW_QUERY_MS > 0 and elapsed * 1000 >= config.SLOW_QUERY_MS:
+        logger.warning(
+            "Slow query %.1fms %s %s: %s",
+            elapsed * 1000,
+            profile.method if profile is not None else NO_ROUTE,
+            profile.route if profile is not None else NO_ROUTE,
+            normalize_sql(statement)
+        )
+
+
+def profile_engine(engine) -> None:
+    """
+    Count and time statements per request on a (sync) Engine; for an
+    AsyncEngine pass its .sync_engine.
+    """
+    if not config.PROFILER_ENABLED:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
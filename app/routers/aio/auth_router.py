@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException, status,Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.routing import InstrumentedAPIRoute
+from app.db.async_session import get_async_db
+from app.schemas.auth import LoginRequest, TokenResponse
+
+from app.services.aio.auth import login_user_service
+
+router = APIRouter(prefix="/auth", tags=["Auth"], route_class=InstrumentedAPIRoute)
+
+
+@router.post("/login", response_model=TokenResponse)
+async def login(
+    login_in: LoginRequest,
+    response: Response,  # Inject FastAPI response object
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Authenticate user, return JWT token, and set Authorization header.
+    """
+    try:
+        token_response = await login_user_service(login_in, db)
+
+        # Set the Authorization header
+        response.headers["Authorization"] = f"Bearer {token_response.access_token}"
+
+        return token_response
+
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unexpected error during login"
+        )
+
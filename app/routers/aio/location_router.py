@@ -0,0 +1,73 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.routing import InstrumentedAPIRoute
+from app.db.async_session import get_async_db, get_async_read_db
+from app.schemas.location import (
+    LocationCreate,
+    LocationResponse,
+    LocationStockUpdate,
+    LocationStockResponse
+)
+from app.services.aio.location import (
+    create_location_service,
+    list_locations_service,
+    set_location_stock_service
+)
+
+router = APIRouter(
+    prefix="/locations",
+    tags=["Locations"],
+    route_class=InstrumentedAPIRoute
+)
+
+
+@router.post("/", response_model=LocationResponse, status_code=201)
+async def create_location(location_in: LocationCreate, db: AsyncSession = Depends(get_async_db)):
+    try:
+        return await create_location_service(location_in, db)
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unexpected error while creating location"
+        )
+
+
+@router.get("/", response_model=List[LocationResponse])
+async def list_locations(db: AsyncSession = Depends(get_async_read_db)):
+    try:
+        return await list_locations_service(db)
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unexpected error while listing locations"
+        )
+
+
+@router.put("/{location_id}/stock/{product_id}", response_model=LocationStockResponse)
+async def set_location_stock(
+    location_id: int,
+    product_id: int,
+    stock_in: LocationStockUpdate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Set the units of a product held at a location to exactly `quantity`.
+    Once a product has locations its stock is their sum, and orders are
+    allocated to them; its first location replaces the stock it had until
+    then.
+    """
+    try:
+        return await set_location_stock_service(location_id, product_id, stock_in, db)
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unexpected error while setting stock"
+        )
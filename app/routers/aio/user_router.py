@@ -0,0 +1,165 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status,Query,Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal
+from app.routing import InstrumentedAPIRoute
+from app.db.async_session import get_async_db, get_async_read_db
+from app.models import User
+from app.config import FAST_SERIALIZATION
+from app.schemas.user import (
+    user_list_serializer,
+    UserCreate,
+    UserUpdate,
+    UserResponse
+)
+from app.schemas.order import OrderWithProductResponse, order_list_serializer
+from app.services.aio.order import list_user_orders_service
+from app.services.aio.user import create_user_service,get_user_details_service,update_user_service,delete_user_service,get_all_users_service,export_users_service
+
+router = APIRouter(prefix="/users", tags=["Users"], route_class=InstrumentedAPIRoute)
+
+
+@router.post("/", response_model=UserResponse, status_code=201)
+async def register_user(user_in: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    """
+    Register a new user.
+    Delegates DB insertion and password hashing to the service layer.
+    """
+    # Call the service function
+    user = await create_user_service(user_in, db)
+    return user
+
+@router.get("/export")
+async def export_users(chunk_size: int = Query(1000, ge=1, le=10000)):
+    """
+    Stream all users as NDJSON (one JSON object per line).
+    Declared before /{user_id} so "export" is not parsed as an id.
+    """
+    return StreamingResponse(
+        export_users_service(chunk_size),
+        media_type="application/x-ndjson"
+    )
+
+@router.get("/{user_id}", response_model=UserResponse, status_code=200)
+async def get_user(user_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Get details of a user by user_id.
+    """
+    user_details = await get_user_details_service(user_id,db)  
+    if not user_details:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user_details
+
+
+@router.get("/{user_id}/orders", response_model=List[OrderWithProductResponse])
+async def get_user_orders(
+    user_id: int,
+    request: Request,
+    response: Response,
+    order_status: Literal["CREATED", "SHIPPED", "DELIVERED", "CANCELLED"] = Query(None, alias="status"),
+    sort: Literal["id", "-id"] = Query("-id"),
+    cursor: str = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: int = Query(10, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    List a user's orders with their product, newest first by default.
+    Only the user themselves may list them.
+    """
+    if request.state.user.get("sub") != str(user_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not allowed to list another user's orders"
+        )
+    try:
+        orders, next_cursor = await list_user_orders_service(
+            user_id,
+            db,
+            limit=limit,
+            order_status=order_status,
+            sort=sort,
+            cursor=cursor
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        if FAST_SERIALIZATION:
+            return order_list_serializer.objects_response(orders, response)
+        return orders
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=500,
+            detail="Unexpected error while fetching user orders"
+        )
+
+
+@router.get("/", response_model=List[UserResponse])
+async def get_all_users(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=1000),
+    cursor: str = Query(None, description="X-Next-Cursor of the previous page"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Get all users with pagination.
+    The cursor of the next page is returned in the X-Next-Cursor header.
+    """
+    try:
+        users, next_cursor = await get_all_users_service(
+            db, skip, limit, cursor,
+            columns=user_list_serializer.columns(User) if FAST_SERIALIZATION else None
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        if FAST_SERIALIZATION:
+            return user_list_serializer.rows_response(users, response)
+        return users
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=500,
+            detail="Unexpected error while fetching users"
+        )
+
+@router.put("/{user_id}", response_model=UserResponse)
+async def update_user(
+    user_id: int,
+    user_in: UserUpdate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Update user details by user ID.
+    """
+    try:
+        return await update_user_service(user_id, user_in, db)
+    except HTTPException:
+        # pass through service-level HTTP errors
+        raise
+    except Exception:
+        # safeguard (rarely hit)
+        raise HTTPException(
+            status_code=500,
+            detail="Unexpected error while updating user"
+        )
+
+@router.delete("/{user_id}", status_code=status.HTTP_200_OK)
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Delete user by user ID.
+    """
+    try:
+        await delete_user_service(user_id, db)
+        return {"detail": "User deleted successfully"}
+    except HTTPException:
+        # pass through service-level HTTP errors
+        raise
+    except Exception:
+        # safeguard
+        raise HTTPException(
+            status_code=500,
+            detail="Unexpected error while deleting user"
+        )
+
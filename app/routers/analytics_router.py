@@ -0,0 +1,80 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import List, Optional
+from sqlalchemy.orm import Session
+
+from app.routing import InstrumentedAPIRoute
+from app.db.session import get_read_db
+from app.schemas.analytics import DailyVolume, StatusShare, TopProduct
+from app.services.analytics import (
+    top_products_service,
+    daily_volume_service,
+    status_mix_service
+)
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["Analytics"],
+    route_class=InstrumentedAPIRoute
+)
+
+# Results are computed per time window (whole UTC days up to today) and
+# cached for ANALYTICS_CACHE_TTL seconds, so they may lag that much.
+MAX_DAYS = 366
+
+
+@router.get("/top-products", response_model=List[TopProduct])
+def top_products(
+    limit: int = Query(10, ge=1, le=100),
+    days: Optional[int] = Query(None, ge=1, le=MAX_DAYS, description="Window in days; all time when omitted"),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Products with the highest revenue, highest first.
+    """
+    try:
+        return top_products_service(db, limit=limit, days=days)
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unexpected error while computing top products"
+        )
+
+
+@router.get("/daily-volume", response_model=List[DailyVolume])
+def daily_volume(
+    days: int = Query(30, ge=1, le=MAX_DAYS),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Orders, units and revenue per UTC day, oldest first, empty days included.
+    """
+    try:
+        return daily_volume_service(db, days=days)
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unexpected error while computing daily volume"
+        )
+
+
+@router.get("/status-mix", response_model=List[StatusShare])
+def status_mix(
+    days: Optional[int] = Query(None, ge=1, le=MAX_DAYS, description="Window in days; all time when omitted"),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Orders and units per status, with each status' share of the orders.
+    """
+    try:
+        return status_mix_service(db, days=days)
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unexpected error while computing the status mix"
+        )
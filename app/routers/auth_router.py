@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status,Response
 from sqlalchemy.orm import Session
 
+from app.routing import InstrumentedAPIRoute
 from app.db.session import get_db
 from app.models import User
 from app.utils import verify_password, create_access_token
@@ -8,11 +9,11 @@ from app.schemas.auth import LoginRequest, TokenResponse
 
 from app.services.auth import login_user_service
 
-router = APIRouter(prefix="/auth", tags=["Auth"])
+router = APIRouter(prefix="/auth", tags=["Auth"], route_class=InstrumentedAPIRoute)
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(
+async def login(
     login_in: LoginRequest,
     response: Response,  # Inject FastAPI response object
     db: Session = Depends(get_db)
@@ -21,7 +22,7 @@ def login(
     Authenticate user, return JWT token, and set Authorization header.
     """
     try:
-        token_response = login_user_service(login_in, db)
+        token_response = await login_user_service(login_in, db)
 
         # Set the Authorization header
         response.headers["Authorization"] = f"Bearer {token_response.access_token}"
@@ -0,0 +1,73 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List
+from sqlalchemy.orm import Session
+
+from app.routing import InstrumentedAPIRoute
+from app.db.session import get_db, get_read_db
+from app.schemas.location import (
+    LocationCreate,
+    LocationResponse,
+    LocationStockUpdate,
+    LocationStockResponse
+)
+from app.services.location import (
+    create_location_service,
+    list_locations_service,
+    set_location_stock_service
+)
+
+router = APIRouter(
+    prefix="/locations",
+    tags=["Locations"],
+    route_class=InstrumentedAPIRoute
+)
+
+
+@router.post("/", response_model=LocationResponse, status_code=201)
+def create_location(location_in: LocationCreate, db: Session = Depends(get_db)):
+    try:
+        return create_location_service(location_in, db)
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unexpected error while creating location"
+        )
+
+
+@router.get("/", response_model=List[LocationResponse])
+def list_locations(db: Session = Depends(get_read_db)):
+    try:
+        return list_locations_service(db)
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unexpected error while listing locations"
+        )
+
+
+@router.put("/{location_id}/stock/{product_id}", response_model=LocationStockResponse)
+def set_location_stock(
+    location_id: int,
+    product_id: int,
+    stock_in: LocationStockUpdate,
+    db: Session = Depends(get_db)
+):
+    """
+    Set the units of a product held at a location to exactly `quantity`.
+    Once a product has locations its stock is their sum, and orders are
+    allocated to them; its first location replaces the stock it had until
+    then.
+    """
+    try:
+        return set_location_stock_service(location_id, product_id, stock_in, db)
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unexpected error while setting stock"
+        )
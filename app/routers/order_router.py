@@ -1,32 +1,59 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
+from app.routing import InstrumentedAPIRoute
+from app.db.session import get_db, get_read_db
 from app.models import Order
 from app.models import Product
+from app.config import FAST_SERIALIZATION
 from app.schemas.order import (
+    order_list_serializer,
     OrderCreate,
     OrderUpdate,
-    OrderResponse
+    OrderResponse,
+    OrderCreatedResponse,
+    OrderBatchCreate,
+    OrderBatchResponse,
+    OrderBulkStatusUpdate,
+    OrderBulkStatusResponse,
+    OrderWithProductResponse
 )
 from app.models import User
+from app.services.idempotency import scoped_key
 
 from app.services.order import (
     create_order_service,
+    create_orders_batch_service,
+    bulk_update_order_status_service,
     get_order_service,
+    list_orders_service,
+    export_orders_service,
     update_order_service,
     delete_order_service
 )
 
 router = APIRouter(
     prefix="/orders",
-    tags=["Orders"]
+    tags=["Orders"],
+    route_class=InstrumentedAPIRoute
 )
 
-@router.post("/", response_model=OrderResponse, status_code=201)
-def create_order(order_in: OrderCreate, db: Session = Depends(get_db)):
+@router.post("/", response_model=OrderCreatedResponse, status_code=201)
+def create_order(
+    order_in: OrderCreate,
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    db: Session = Depends(get_db)
+):
+    """
+    Retries that repeat the Idempotency-Key header of an earlier request
+    get its response back (marked Idempotent-Replayed) without creating
+    another order.
+    """
     try:
-        return create_order_service(order_in, db)
+        return create_order_service(order_in, db, scoped_key(request, idempotency_key))
     except HTTPException:
         raise
     except Exception:
@@ -36,9 +63,96 @@ def create_order(order_in: OrderCreate, db: Session = Depends(get_db)):
         )
 
 
+@router.post("/batch", response_model=OrderBatchResponse, status_code=201)
+def create_orders_batch(batch_in: OrderBatchCreate, db: Session = Depends(get_db)):
+    try:
+        return create_orders_batch_service(batch_in, db)
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unexpected error while creating orders"
+        )
+
+
+
+@router.post("/batch/status", response_model=OrderBulkStatusResponse)
+def bulk_update_order_status(bulk_in: OrderBulkStatusUpdate, db: Session = Depends(get_db)):
+    """
+    Move many orders (by ids or by filter) to one status in one transaction.
+    """
+    try:
+        return bulk_update_order_status_service(bulk_in, db)
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unexpected error while updating orders"
+        )
+
+
+@router.get("/", response_model=List[OrderWithProductResponse])
+def list_orders(
+    response: Response,
+    user_id: int = Query(None),
+    product_id: int = Query(None),
+    order_status: Literal["CREATED", "SHIPPED", "DELIVERED", "CANCELLED"] = Query(None, alias="status"),
+    sort: Literal["id", "-id"] = Query("-id"),
+    cursor: str = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: int = Query(10, ge=1, le=1000),
+    db: Session = Depends(get_read_db)
+):
+    """
+    List orders with their product, newest first by default. The next
+    page's cursor is in the X-Next-Cursor header.
+    """
+    try:
+        orders, next_cursor = list_orders_service(
+            db,
+            limit=limit,
+            user_id=user_id,
+            product_id=product_id,
+            order_status=order_status,
+            sort=sort,
+            cursor=cursor
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        if FAST_SERIALIZATION:
+            return order_list_serializer.objects_response(orders, response)
+        return orders
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unexpected error while listing orders"
+        )
+
+
+@router.get("/export")
+def export_orders(
+    fmt: Literal["csv", "ndjson"] = Query("ndjson", alias="format"),
+    order_status: Literal["CREATED", "SHIPPED", "DELIVERED", "CANCELLED"] = Query(None, alias="status"),
+    after_id: int = Query(None, ge=0, description="Resume after this order id"),
+    until_id: int = Query(None, ge=1, description="Last order id to include"),
+    chunk_size: int = Query(1000, ge=1, le=10000)
+):
+    """
+    Stream orders in id order as CSV or NDJSON with the product's price and
+    the extended value of each line.
+    Declared before /{order_id} so "export" is not parsed as an id.
+    """
+    return StreamingResponse(
+        export_orders_service(fmt, order_status, after_id, until_id, chunk_size),
+        media_type="text/csv" if fmt == "csv" else "application/x-ndjson"
+    )
+
 
 @router.get("/{order_id}", response_model=OrderResponse)
-def get_order(order_id: int, db: Session = Depends(get_db)):
+def get_order(order_id: int, db: Session = Depends(get_read_db)):
     try:
         return get_order_service(order_id, db)
     except HTTPException:
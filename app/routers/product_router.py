@@ -1,24 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from typing import List, Literal
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
+from app.routing import InstrumentedAPIRoute
+from app.db.session import get_db, get_read_db
 from app.models import Product
+from app.config import FAST_SERIALIZATION
 from app.schemas.product import (
+    product_list_serializer,
     ProductCreate,
     ProductUpdate,
-    ProductResponse
+    ProductResponse,
+    ProductImportResponse,
+    ProductStatsResponse
 )
+from app.schemas.location import LocationStockResponse
 
 from app.services.product import (
     create_product_service,
     get_product_service,
+    list_products_service,
     update_product_service,
     delete_product_service
 )
+from app.services.product_stats import get_product_stats_service
+from app.services.location import list_product_locations_service
+from app.services.product_import import import_format, import_products_service
 
 router = APIRouter(
     prefix="/products",
     tags=["Products"],
+    route_class=InstrumentedAPIRoute
 )
 
 
@@ -35,8 +47,81 @@ def create_product(product_in: ProductCreate, db: Session = Depends(get_db)):
         )
 
 
+@router.post("/import", response_model=ProductImportResponse)
+async def import_products(
+    request: Request,
+    fmt: Literal["csv", "ndjson"] = Query(None, alias="format", description="Defaults to the Content-Type"),
+    chunk_size: int = Query(20000, ge=1, le=50000),
+    db: Session = Depends(get_db)
+):
+    """
+    Bulk create/update products from a CSV (header: name,price,stock and
+    optionally id) or NDJSON body, streamed and written chunk_size rows per
+    transaction. Rows with an id upsert that product. Invalid rows are
+    reported per line and do not stop the import.
+    """
+    try:
+        return await import_products_service(
+            request.stream(),
+            import_format(fmt, request.headers.get("content-type")),
+            db,
+            chunk_size
+        )
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unexpected error while importing products"
+        )
+
+
+@router.get("/", response_model=List[ProductResponse])
+def list_products(
+    response: Response,
+    name_prefix: str = Query(None, min_length=1, description="Case-sensitive name prefix"),
+    q: str = Query(None, description="Full-text match on the name, all terms must match"),
+    min_price: float = Query(None, ge=0),
+    max_price: float = Query(None, ge=0),
+    in_stock: bool = Query(False),
+    sort: str = Query("id", pattern="^-?(id|name|price)$"),
+    cursor: str = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: int = Query(10, ge=1, le=1000),
+    db: Session = Depends(get_read_db)
+):
+    """
+    List products with filters, sorting (prefix with - for descending) and
+    keyset pagination. The next page's cursor is in the X-Next-Cursor header.
+    """
+    try:
+        products, next_cursor = list_products_service(
+            db,
+            limit=limit,
+            name_prefix=name_prefix,
+            q=q,
+            min_price=min_price,
+            max_price=max_price,
+            in_stock=in_stock,
+            sort=sort,
+            cursor=cursor,
+            columns=product_list_serializer.columns(Product) if FAST_SERIALIZATION else None
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        if FAST_SERIALIZATION:
+            return product_list_serializer.rows_response(products, response)
+        return products
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unexpected error while listing products"
+        )
+
+
 @router.get("/{product_id}", response_model=ProductResponse)
-def get_product(product_id: int, db: Session = Depends(get_db)):
+def get_product(product_id: int, db: Session = Depends(get_read_db)):
     try:
         return get_product_service(product_id, db)
     except HTTPException:
@@ -47,6 +132,42 @@ def get_product(product_id: int, db: Session = Depends(get_db)):
             detail="Unexpected error while fetching product"
         )
 
+
+@router.get("/{product_id}/stats", response_model=ProductStatsResponse)
+def get_product_stats(product_id: int, db: Session = Depends(get_read_db)):
+    """
+    Orders and units per status, and revenue, for one product. Read from
+    the product_stats summary, so it costs the same however many orders
+    the product has.
+    """
+    try:
+        return get_product_stats_service(product_id, db)
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unexpected error while fetching product stats"
+        )
+
+
+@router.get("/{product_id}/locations", response_model=List[LocationStockResponse])
+def list_product_locations(product_id: int, db: Session = Depends(get_read_db)):
+    """
+    Units of the product held at each location; empty while its stock is
+    not kept per location.
+    """
+    try:
+        return list_product_locations_service(product_id, db)
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unexpected error while listing product locations"
+        )
+
+
 @router.put("/{product_id}", response_model=ProductResponse)
 def update_product(product_id: int, product_in: ProductUpdate, db: Session = Depends(get_db)):
     try:
@@ -0,0 +1,52 @@
+from fastapi.routing import APIRoute
+
+from app import config
+from app.db.routing import bind_client, reset_client
+from app.metrics import in_progress
+from app.profiling import finish_request, profile_endpoint, start_request
+
+
+class InstrumentedAPIRoute(APIRoute):
+    """
+    APIRoute that keeps the per-route in-flight gauge and the request's
+    query profile (Server-Timing header, slow query log, sampled traces),
+    and makes the request's client current for read your writes.
+    The route template is only known once the router has matched, so this
+    cannot live in the metrics middleware; counts and latency are recorded
+    there.
+    """
+
+    def __init__(self, path, endpoint, **kwargs):
+        if config.PROFILER_ENABLED and config.PROFILE_SAMPLE_RATE > 0:
+            endpoint = profile_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    async def handle(self, scope, receive, send):
+        if config.PROFILER_ENABLED:
+            profile, token = start_request(scope["method"], self.path)
+
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start":
+                    message["headers"] = [*message.get("headers", ()), (b"server-timing", profile.server_timing())]
+                await send(message)
+        else:
+            send_with_timing = send
+
+        # read your writes needs the client of the sessions' commits and reads
+        client_token = None
+        if config.DB_READ_YOUR_WRITES_SECONDS > 0 and (config.DATABASE_READ_URLS or config.SQLITE_READ_ENGINES):
+            client_token = bind_client(scope)
+
+        gauge = None
+        if config.METRICS_ENABLED:
+            gauge = in_progress(scope["method"], self.path)
+            gauge.inc()
+        try:
+            await super().handle(scope, receive, send_with_timing)
+        finally:
+            if gauge is not None:
+                gauge.dec()
+            if config.PROFILER_ENABLED:
+                finish_request(profile, token)
+            if client_token is not None:
+                reset_client(client_token)
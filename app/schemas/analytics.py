@@ -0,0 +1,25 @@
+from datetime import date
+
+from pydantic import BaseModel
+
+
+# Revenue is at each product's current price and leaves cancelled orders out
+class TopProduct(BaseModel):
+    product_id: int
+    name: str
+    units: int
+    revenue: float
+
+
+class DailyVolume(BaseModel):
+    date: date  # UTC
+    orders: int
+    units: int
+    revenue: float
+
+
+class StatusShare(BaseModel):
+    status: str
+    orders: int
+    units: int
+    share: float  # of the orders
@@ -0,0 +1,30 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+
+# Request Schemas
+class LocationCreate(BaseModel):
+    name: str
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
+
+
+class LocationStockUpdate(BaseModel):
+    quantity: int = Field(..., ge=0)
+
+
+# Response Schemas
+class LocationResponse(LocationCreate):
+    id: int
+
+    class Config:
+        from_attributes = True
+
+
+class LocationStockResponse(BaseModel):
+    product_id: int
+    location_id: int
+    quantity: int
+
+    class Config:
+        from_attributes = True
@@ -1,13 +1,22 @@
-from pydantic import BaseModel
-from typing import Optional,Literal
+from pydantic import BaseModel, Field
+from typing import List, Optional, Literal
+
+from app.serialization import ListSerializer
 
 
 
 # Request Schemas
+class ShipTo(BaseModel):
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+
+
 class OrderCreate(BaseModel):
     user_id:int
     product_id: int
-    quantity: int
+    quantity: int = Field(..., gt=0)
+    # where the order goes; the nearest allocation policy ranks locations by it
+    ship_to: Optional[ShipTo] = None
 
 
 class OrderUpdate(BaseModel):
@@ -25,3 +34,81 @@ class OrderResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class OrderAllocationResponse(BaseModel):
+    location_id: int
+    quantity: int
+
+    class Config:
+        from_attributes = True
+
+
+class OrderCreatedResponse(OrderResponse):
+    # the locations the units are taken from, more than one for a split
+    # shipment; empty for products whose stock is not kept per location
+    allocations: List[OrderAllocationResponse] = []
+
+
+class OrderProductSummary(BaseModel):
+    id: int
+    name: str
+    price: float
+
+    class Config:
+        from_attributes = True
+
+
+class OrderWithProductResponse(OrderResponse):
+    product: Optional[OrderProductSummary] = None
+
+
+# Prebuilt list serializer (FAST_SERIALIZATION)
+order_list_serializer = ListSerializer(OrderWithProductResponse)
+
+
+# Batch Schemas
+class OrderBatchCreate(BaseModel):
+    orders: List[OrderCreate] = Field(..., min_length=1, max_length=1000)
+    # all_or_nothing: any bad line rejects the whole batch
+    # best_effort: valid lines are created, bad lines are reported
+    mode: Literal["all_or_nothing", "best_effort"] = "all_or_nothing"
+
+
+class OrderBatchLineResult(BaseModel):
+    index: int
+    ok: bool
+    order: Optional[OrderCreatedResponse] = None
+    detail: Optional[str] = None
+
+
+class OrderBatchResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[OrderBatchLineResult]
+
+
+# Bulk status transition Schemas
+class OrderStatusFilter(BaseModel):
+    user_id: Optional[int] = None
+    product_id: Optional[int] = None
+    status: Optional[Literal["CREATED", "SHIPPED", "DELIVERED", "CANCELLED"]] = None
+
+
+class OrderBulkStatusUpdate(BaseModel):
+    status: Literal["CREATED", "SHIPPED", "DELIVERED", "CANCELLED"]
+    # exactly one of ids / filter
+    ids: Optional[List[int]] = Field(None, min_length=1, max_length=50000)
+    filter: Optional[OrderStatusFilter] = None
+
+
+class OrderBulkStatusRejection(BaseModel):
+    id: int
+    detail: str
+
+
+class OrderBulkStatusResponse(BaseModel):
+    updated: List[int]
+    # already in the target status
+    unchanged: List[int]
+    rejected: List[OrderBulkStatusRejection]
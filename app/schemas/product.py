@@ -1,5 +1,7 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, List, Optional
+
+from app.serialization import ListSerializer
 
 
 
@@ -28,3 +30,38 @@ class ProductResponse(ProductBase):
 
     class Config:
         from_attributes = True
+
+
+# Prebuilt list serializer (FAST_SERIALIZATION)
+product_list_serializer = ListSerializer(ProductResponse)
+
+
+# Import Schemas
+class ProductImportError(BaseModel):
+    line: int
+    detail: str
+
+
+class ProductImportResponse(BaseModel):
+    received: int
+    imported: int
+    failed: int
+    errors: List[ProductImportError]
+    # only the first IMPORT_MAX_ERRORS errors are listed
+    errors_truncated: bool = False
+
+
+# Sales aggregates (GET /products/{id}/stats)
+class OrderStatusStats(BaseModel):
+    orders: int
+    units: int
+
+
+class ProductStatsResponse(BaseModel):
+    product_id: int
+    orders: int
+    units_ordered: int
+    by_status: Dict[str, OrderStatusStats]
+    # at the product's current price; orders keep no price of their own
+    revenue: float  # every order that is not cancelled
+    delivered_revenue: float
@@ -1,6 +1,8 @@
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 
+from app.serialization import ListSerializer
+
 
 # Shared Base Schema
 class UserBase(BaseModel):
@@ -24,3 +26,7 @@ class UserResponse(UserBase):
 
     class Config:
         from_attributes = True   # SQLAlchemy → Pydantic
+
+
+# Prebuilt list serializer (FAST_SERIALIZATION)
+user_list_serializer = ListSerializer(UserResponse)
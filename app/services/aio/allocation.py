@@ -0,0 +1,63 @@
+from collections import defaultdict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.allocation import (
+    ALLOCATION_ATTEMPTS,
+    take_stmt,
+    batch_groups,
+    give_back_params,
+    give_back_stmt,
+    plan_allocation,
+    plan_units,
+    product_locations_stmt,
+    product_stock_delta_params,
+    product_stock_delta_stmt,
+    split_plan
+)
+
+
+async def give_back(db: AsyncSession, units: dict) -> None:
+    await db.execute(give_back_stmt, give_back_params(units))
+    await db.execute(product_stock_delta_stmt, product_stock_delta_params(units))
+
+
+async def allocate(db: AsyncSession, product_id: int, quantity: int, ship_to=None, locations=None):
+    """
+    Async version of app.services.allocation.allocate.
+    """
+    for _ in range(ALLOCATION_ATTEMPTS):
+        if locations is None:
+            locations = (await db.execute(product_locations_stmt(product_id))).all()
+        if not locations:
+            return None
+        plan = plan_allocation(locations, quantity, ship_to)
+        if not plan:
+            return []
+        taken = []
+        for location_id, units in plan:
+            if (await db.execute(take_stmt(product_id, location_id, units))).rowcount != 1:
+                break
+            taken.append((location_id, units))
+        else:
+            await db.execute(product_stock_delta_stmt, {"delta_product_id": product_id, "delta_quantity": -quantity})
+            return plan
+        if taken:
+            await db.execute(give_back_stmt, give_back_params(plan_units(product_id, taken)))
+        locations = None
+    return []
+
+
+async def allocate_lines(db: AsyncSession, product_id: int, lines, indexes: list, locations) -> dict:
+    plans, taken = {}, defaultdict(int)
+    for ship_to, group in batch_groups(lines, indexes).items():
+        plan = await allocate(db, product_id, sum(lines[i].quantity for i in group), ship_to, locations)
+        locations = None
+        if not plan:
+            if taken:
+                await give_back(db, taken)
+            return None
+        for key, units in plan_units(product_id, plan).items():
+            taken[key] += units
+        plans.update(zip(group, split_plan(plan, [lines[i].quantity for i in group])))
+    return plans
@@ -0,0 +1,28 @@
+from starlette.concurrency import run_in_threadpool
+
+from app.db.session import SessionLocal
+from app.services import analytics
+
+
+async def _in_threadpool(service, **kwargs) -> list:
+    """
+    The aggregation is CPU-bound NumPy work on a sync connection, so it
+    runs in the threadpool instead of on the event loop.
+    """
+    def run():
+        with SessionLocal(for_reading=True) as db:
+            return service(db, **kwargs)
+
+    return await run_in_threadpool(run)
+
+
+async def top_products_service(limit: int = 10, days: int = None) -> list:
+    return await _in_threadpool(analytics.top_products_service, limit=limit, days=days)
+
+
+async def daily_volume_service(days: int = 30) -> list:
+    return await _in_threadpool(analytics.daily_volume_service, days=days)
+
+
+async def status_mix_service(days: int = None) -> list:
+    return await _in_threadpool(analytics.status_mix_service, days=days)
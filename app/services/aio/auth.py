@@ -0,0 +1,29 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.auth import LoginRequest, TokenResponse
+from app.services.auth import authenticate, login_user_stmt, store_rehash_stmt
+
+
+async def login_user_service(
+    login_in: LoginRequest,
+    db: AsyncSession
+) -> TokenResponse:
+    """
+    Verify user credentials and return JWT token.
+    """
+    async def find_user(email):
+        user = (await db.execute(login_user_stmt(email))).first()
+        # end the read transaction so the connection goes back to the pool
+        # while bcrypt runs
+        await db.rollback()
+        return user
+
+    async def store_rehash(user_id, old_hash, new_hash):
+        try:
+            await db.execute(store_rehash_stmt(user_id, old_hash, new_hash))
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+    return await authenticate(login_in, find_user, store_rehash)
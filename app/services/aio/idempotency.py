@@ -0,0 +1,99 @@
+import asyncio
+import time
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import config
+from app.services.idempotency import (
+    POLL_MAX,
+    POLL_MIN,
+    RUNNING,
+    Claim,
+    claim_stmts,
+    complete_stmt,
+    end_claim,
+    inflight,
+    is_stale,
+    local_replay,
+    lookup_stmt,
+    record_response,
+    release_stmt,
+    still_running,
+    stored_response,
+)
+
+
+async def _claim_row(key: str, req_hash: str, db: AsyncSession):
+    """
+    None once this request owns the row, else the stored response or RUNNING.
+    """
+    row = (await db.execute(lookup_stmt(key))).first()
+    # end the read transaction, so the next lookup sees new commits
+    await db.rollback()
+    now = time.time()
+    if row is not None and not is_stale(row, now):
+        return stored_response(row, req_hash)
+    try:
+        for stmt in claim_stmts(key, req_hash, now, row):
+            await db.execute(stmt)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return RUNNING  # another worker claimed it first
+    return None
+
+
+async def claim_idempotency_key(key: str, req_hash: str, db: AsyncSession):
+    """
+    None when this request now owns `key` and should run, otherwise the
+    stored response of the earlier request.
+    """
+    deadline = time.monotonic() + config.IDEMPOTENCY_LOCK_TIMEOUT
+    delay = POLL_MIN
+    while True:
+        mine = Claim(req_hash, asyncio.Event())
+        claim = inflight.setdefault(key, mine)
+        if claim is not mine:
+            # another request on this event loop has the key
+            try:
+                await asyncio.wait_for(claim.event.wait(), max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                raise still_running()
+            response = local_replay(claim, req_hash)
+            if response is not None:
+                return response
+            continue
+
+        try:
+            response = await _claim_row(key, req_hash, db)
+        except BaseException:
+            end_claim(key, failed=True)
+            raise
+        if response is None:
+            return None
+        end_claim(key, failed=True)
+        if response is not RUNNING:
+            return response
+        remaining = deadline - time.monotonic()
+        if remaining <= delay:
+            # the claim turns stale about when we stop waiting: a 409, so
+            # the client's next retry is the one that takes the key over
+            raise still_running()
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, POLL_MAX)
+
+
+async def complete_idempotency_key(key: str, status_code: int, body: str, db: AsyncSession) -> None:
+    await db.execute(complete_stmt(key, status_code, body))
+    record_response(key, status_code, body)
+
+
+async def finish_idempotency_key(key: str, db: AsyncSession, failed: bool = False) -> None:
+    try:
+        if failed:
+            await db.rollback()
+            await db.execute(release_stmt(key))
+            await db.commit()
+    finally:
+        end_claim(key, failed)
@@ -0,0 +1,57 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException, status
+
+from app.models import Location, Product
+from app.schemas.location import LocationCreate, LocationStockResponse, LocationStockUpdate
+from app.services.aio.product import ainvalidate_product_cache
+from app.services.location import (
+    add_location_stock_stmt,
+    check_stock_target,
+    location_stock_stmt,
+    set_location_stock_stmt,
+    sync_product_stock_stmt
+)
+
+
+async def create_location_service(location_in: LocationCreate, db: AsyncSession) -> Location:
+    location = Location(**location_in.model_dump())
+    db.add(location)
+    try:
+        await db.commit()
+        return location
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to create location: {str(e)}"
+        )
+
+
+async def list_locations_service(db: AsyncSession) -> list:
+    return (await db.scalars(select(Location).order_by(Location.id))).all()
+
+
+async def set_location_stock_service(
+    location_id: int, product_id: int, stock_in: LocationStockUpdate, db: AsyncSession
+) -> LocationStockResponse:
+    check_stock_target(await db.get(Location, location_id), await db.get(Product, product_id))
+    try:
+        if (await db.execute(set_location_stock_stmt(location_id, product_id, stock_in.quantity))).rowcount == 0:
+            await db.execute(add_location_stock_stmt(location_id, product_id, stock_in.quantity))
+        await db.execute(sync_product_stock_stmt(product_id))
+        await db.commit()
+        await ainvalidate_product_cache(product_id)
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to set stock: {str(e)}"
+        )
+    return LocationStockResponse(product_id=product_id, location_id=location_id, quantity=stock_in.quantity)
+
+
+async def list_product_locations_service(product_id: int, db: AsyncSession) -> list:
+    if await db.get(Product, product_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
+    return (await db.scalars(location_stock_stmt(product_id))).all()
@@ -0,0 +1,322 @@
+from sqlalchemy import select, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException
+from app.db.async_session import AsyncSessionLocal
+from app.models import Order
+from app.models import OrderAllocation
+from app.models import Product
+from app.models import User
+from app.schemas.order import (
+    OrderCreate,
+    OrderUpdate,
+    OrderCreatedResponse,
+    OrderBatchCreate,
+    OrderBatchResponse,
+    OrderBulkStatusUpdate,
+    OrderBulkStatusResponse
+)
+from app.services.aio.allocation import allocate, allocate_lines, give_back
+from app.services.aio.idempotency import (
+    claim_idempotency_key,
+    complete_idempotency_key,
+    finish_idempotency_key
+)
+from app.services.aio.product import ainvalidate_product_cache
+from app.services.allocation import (
+    locations_by_product,
+    order_allocations_stmt,
+    product_locations_stmt,
+    ship_to_point,
+    user_product_locations_stmt
+)
+from app.services.idempotency import request_hash
+from app.services.order_stmts import (
+    RESTOCKED_ON_DELETE,
+    checked_status,
+    found_order,
+    modified_concurrently,
+    reserve_stock_stmt,
+    reserve_stock_params,
+    cancel_order_stmt,
+    delete_order_stmt,
+    plan_batch,
+    reject_batch_product,
+    raise_batch_rejected,
+    batch_rows,
+    allocation_rows,
+    batch_response,
+    bulk_status_rounds,
+    bulk_restock,
+    id_chunks,
+    bulk_cancel_stmt,
+    bulk_rejected_stmt,
+    bulk_set_status_stmt,
+    restore_first_location_stmt,
+    restore_stock_many_stmt,
+    restore_stock_params,
+    bulk_status_response,
+    list_orders_stmt,
+    export_orders_stmt,
+    EXPORT_COLUMNS,
+    format_export_rows
+)
+from app.pagination import split_page
+
+
+async def _restore_stock(restock: dict, db: AsyncSession) -> None:
+    params = restore_stock_params(restock)
+    await db.execute(restore_stock_many_stmt, params)
+    await db.execute(restore_first_location_stmt, params)
+
+
+async def _restore_order_stock(order: Order, allocations, db: AsyncSession) -> None:
+    if allocations:
+        await give_back(db, {(order.product_id, row.location_id): row.quantity for row in allocations})
+    else:
+        await _restore_stock({order.product_id: order.quantity}, db)
+
+
+async def create_order_service(order_in: OrderCreate, db: AsyncSession, idempotency_key: str = None):
+    if idempotency_key is None:
+        return await _create_order(order_in, db)
+    replay = await claim_idempotency_key(idempotency_key, request_hash(order_in), db)
+    if replay is not None:
+        return replay
+    failed = True
+    try:
+        order = await _create_order(order_in, db, idempotency_key)
+        failed = False
+        return order
+    finally:
+        await finish_idempotency_key(idempotency_key, db, failed)
+
+
+async def _create_order(order_in: OrderCreate, db: AsyncSession, idempotency_key: str = None) -> OrderCreatedResponse:
+    # Validate user, reading the product's locations in the same statement
+    rows = (await db.execute(
+        user_product_locations_stmt, {"user_id": order_in.user_id, "product_id": order_in.product_id}
+    )).all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="User not found")
+    locations = [row for row in rows if row.location_id is not None]
+
+    # Reserve stock and insert the order in the same transaction
+    try:
+        plan = await allocate(db, order_in.product_id, order_in.quantity, ship_to_point(order_in.ship_to), locations)
+        if plan is None:
+            result = await db.execute(reserve_stock_stmt, reserve_stock_params(order_in.product_id, order_in.quantity))
+            reserved = result.rowcount == 1
+        else:
+            reserved = bool(plan)
+        if not reserved:
+            await db.rollback()
+            if await db.get(Product, order_in.product_id) is None:
+                raise HTTPException(status_code=404, detail="Product not found")
+            raise HTTPException(status_code=400, detail="Insufficient stock")
+
+        order = Order(
+            user_id=order_in.user_id,
+            product_id=order_in.product_id,
+            quantity=order_in.quantity,
+            status="CREATED",
+            allocations=[OrderAllocation(location_id=location_id, quantity=units) for location_id, units in plan or ()]
+        )
+        db.add(order)
+        await db.flush()
+        created = OrderCreatedResponse.model_validate(order)
+        if idempotency_key is not None:
+            await complete_idempotency_key(idempotency_key, 201, created.model_dump_json(), db)
+        await db.commit()
+        await ainvalidate_product_cache(order_in.product_id)
+        return created
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=f"Failed to create order: {str(e)}")
+
+
+async def create_orders_batch_service(batch_in: OrderBatchCreate, db: AsyncSession) -> OrderBatchResponse:
+    lines = batch_in.orders
+    atomic = batch_in.mode == "all_or_nothing"
+
+    known_users = set(await db.scalars(
+        select(User.id).where(User.id.in_({line.user_id for line in lines}))
+    ))
+    stock = dict((await db.execute(
+        select(Product.id, Product.stock).where(Product.id.in_({line.product_id for line in lines}))
+    )).all())
+
+    errors, requested, lines_by_product = plan_batch(lines, known_users, stock, atomic)
+    if atomic and errors:
+        raise_batch_rejected(lines, errors)
+
+    try:
+        located = {}
+        if requested:
+            located = locations_by_product((await db.execute(product_locations_stmt(*requested))).all())
+        line_plans = {}
+        for product_id, quantity in list(requested.items()):
+            if product_id in located:
+                plans = await allocate_lines(db, product_id, lines, lines_by_product[product_id], located[product_id])
+                reserved = plans is not None
+                line_plans.update(plans or {})
+            else:
+                reserved = (await db.execute(reserve_stock_stmt, reserve_stock_params(product_id, quantity))).rowcount == 1
+            if not reserved:
+                reject_batch_product(product_id, errors, requested, lines_by_product)
+                if atomic:
+                    await db.rollback()
+                    raise_batch_rejected(lines, errors)
+
+        accepted, rows = batch_rows(lines, lines_by_product)
+        order_ids = []
+        if rows:
+            order_ids = (await db.scalars(
+                insert(Order).returning(Order.id, sort_by_parameter_order=True),
+                rows
+            )).all()
+        if line_plans:
+            await db.execute(insert(OrderAllocation), allocation_rows(accepted, order_ids, line_plans))
+        await db.commit()
+        await ainvalidate_product_cache(*requested)
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=f"Failed to create orders: {str(e)}")
+
+    return batch_response(lines, errors, accepted, order_ids, line_plans)
+
+
+async def bulk_update_order_status_service(bulk_in: OrderBulkStatusUpdate, db: AsyncSession) -> OrderBulkStatusResponse:
+    rounds = bulk_status_rounds(bulk_in)
+    updated, unchanged, missing, rejected = [], [], [], []
+    cancelled = {}
+    try:
+        for ids, conditions in rounds:
+            changed = []
+            if bulk_in.status == "CANCELLED":
+                for order_id, product_id, quantity in await db.execute(bulk_cancel_stmt(conditions)):
+                    changed.append(order_id)
+                    cancelled[order_id] = (product_id, quantity)
+            changed += (await db.scalars(bulk_set_status_stmt(conditions, bulk_in.status))).all()
+            updated += changed
+            if bulk_in.status != "CANCELLED":
+                rejected += await db.scalars(bulk_rejected_stmt(conditions))
+
+            leftover = set(ids or ()).difference(changed)
+            if leftover:
+                found = set(await db.scalars(select(Order.id).where(Order.id.in_(leftover))))
+                unchanged += found.difference(rejected)
+                missing += leftover - found
+
+        allocations = []
+        for chunk in id_chunks(cancelled):
+            allocations += (await db.execute(order_allocations_stmt(chunk))).all()
+        restock, located = bulk_restock(cancelled, allocations)
+        if restock:
+            await _restore_stock(restock, db)
+        if located:
+            await give_back(db, located)
+        await db.commit()
+        await ainvalidate_product_cache(*{product_id for product_id, _ in cancelled.values()})
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=f"Failed to update orders: {str(e)}")
+
+    return bulk_status_response(updated, unchanged, missing, rejected)
+
+
+async def get_order_service(order_id: int, db: AsyncSession) -> Order:
+    return found_order(await db.get(Order, order_id))
+
+
+async def list_orders_service(db: AsyncSession, limit: int = 10, **filters):
+    """
+    Fetch a page of orders with their products, plus the cursor of the
+    next page (None on the last one).
+    """
+    result = await db.scalars(list_orders_stmt(limit=limit, **filters))
+    return split_page(result.all(), limit)
+
+
+async def list_user_orders_service(user_id: int, db: AsyncSession, limit: int = 10, **filters):
+    if await db.get(User, user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return await list_orders_service(db, limit=limit, user_id=user_id, **filters)
+
+
+async def export_orders_service(
+    fmt: str = "ndjson",
+    order_status: str = None,
+    after_id: int = None,
+    until_id: int = None,
+    chunk_size: int = 1000
+):
+    """
+    Async version of app.services.order.export_orders_service.
+    """
+    if fmt == "csv" and after_id is None:
+        yield format_export_rows([EXPORT_COLUMNS], fmt)
+    async with AsyncSessionLocal(for_reading=True) as db:
+        result = await db.stream(
+            export_orders_stmt(order_status, after_id, until_id)
+            .execution_options(yield_per=chunk_size)
+        )
+        async for rows in result.partitions():
+            yield format_export_rows(rows, fmt)
+
+
+async def update_order_service(order_id: int, order_in: OrderUpdate, db: AsyncSession) -> Order:
+    order = found_order(await db.get(Order, order_id))
+
+    try:
+        new_status = checked_status(order_in.status)
+
+        # Handle cancel logic
+        stock_changed = False
+        if new_status == "CANCELLED":
+            result = await db.execute(cancel_order_stmt(order_id))
+            if result.rowcount == 1:
+                allocations = (await db.execute(order_allocations_stmt([order_id]))).all()
+                await _restore_order_stock(order, allocations, db)
+                stock_changed = True
+
+        order.status = new_status
+        await db.commit()
+        if stock_changed:
+            await ainvalidate_product_cache(order.product_id)
+        return order
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=f"Failed to update order: {str(e)}")
+
+
+async def delete_order_service(order_id: int, db: AsyncSession):
+    order = found_order(await db.get(Order, order_id))
+
+    try:
+        allocations = (await db.execute(order_allocations_stmt([order_id]))).all()
+        result = await db.execute(delete_order_stmt(order_id, order.status))
+        if result.rowcount != 1:
+            await db.rollback()
+            raise modified_concurrently()
+        db.expunge(order)
+
+        restock = order.status in RESTOCKED_ON_DELETE
+        if restock:
+            await _restore_order_stock(order, allocations, db)
+
+        await db.commit()
+        if restock:
+            await ainvalidate_product_cache(order.product_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=f"Failed to delete order: {str(e)}")
@@ -0,0 +1,96 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from app import config
+from app.models import Product
+from app.schemas.product import ProductCreate, ProductUpdate, ProductResponse
+from app.services.allocation import located_stmt
+from app.services.product import (
+    changes_stock,
+    found_product,
+    invalidate_product_cache,
+    list_products_stmt,
+    located_stock_conflict,
+    product_cache,
+    product_cache_channel,
+    product_failed
+)
+from app.pagination import split_page
+
+
+async def ainvalidate_product_cache(*product_ids: int):
+    """
+    invalidate_product_cache() for the event loop; publishing to other
+    workers talks to the database, so it runs in the threadpool.
+    """
+    if product_cache_channel is None:
+        invalidate_product_cache(*product_ids)
+    else:
+        await run_in_threadpool(invalidate_product_cache, *product_ids)
+
+
+async def create_product_service(product_in: ProductCreate, db: AsyncSession) -> Product:
+    product = Product(**product_in.dict())
+    db.add(product)
+    try:
+        await db.commit()
+        return product
+    except Exception as e:
+        await db.rollback()
+        raise product_failed("create", e)
+
+
+async def _load_product(product_id: int, db: AsyncSession) -> Product:
+    return found_product(await db.get(Product, product_id))
+
+
+async def get_product_service(product_id: int, db: AsyncSession) -> ProductResponse:
+    if not config.PRODUCT_CACHE_ENABLED:
+        return await _load_product(product_id, db)
+    if product_cache_channel is not None and product_cache_channel.poll_due():
+        await run_in_threadpool(product_cache_channel.poll)
+
+    async def load():
+        return ProductResponse.model_validate(await _load_product(product_id, db))
+
+    return await product_cache.get_or_load_async(product_id, load)
+
+
+async def list_products_service(db: AsyncSession, limit: int = 10, columns=None, **filters):
+    """
+    Fetch a page of products matching `filters` (see list_products_stmt),
+    plus the cursor of the next page (None on the last one). With `columns`
+    the page holds read-only rows instead of tracked Product instances.
+    """
+    stmt, key = list_products_stmt(db.bind.dialect.name, limit=limit, columns=columns, **filters)
+    result = await (db.execute(stmt) if columns else db.scalars(stmt))
+    return split_page(result.all(), limit, key)
+
+
+async def update_product_service(product_id: int, product_in: ProductUpdate, db: AsyncSession) -> Product:
+    product = found_product(await db.get(Product, product_id))
+
+    updates = product_in.dict(exclude_unset=True)
+    if changes_stock(product, updates) and await db.scalar(located_stmt(product_id)):
+        raise located_stock_conflict()
+
+    for key, value in updates.items():
+        setattr(product, key, value)
+
+    try:
+        await db.commit()
+        await ainvalidate_product_cache(product_id)
+        return product
+    except Exception as e:
+        await db.rollback()
+        raise product_failed("update", e)
+
+
+async def delete_product_service(product_id: int, db: AsyncSession):
+    product = found_product(await db.get(Product, product_id))
+    try:
+        await db.delete(product)
+        await db.commit()
+        await ainvalidate_product_cache(product_id)
+    except Exception as e:
+        await db.rollback()
+        raise product_failed("delete", e)
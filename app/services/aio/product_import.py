@@ -0,0 +1,51 @@
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Product
+from app.schemas.product import ProductImportResponse
+from app.services.aio.product import ainvalidate_product_cache
+from app.services.product_import import (
+    IMPORT_COLUMNS,
+    ImportRejected,
+    INDEX_NEW_PRODUCTS,
+    INSERT_PRODUCTS_SQL,
+    LAST_PRODUCT_ID,
+    PAUSE_FTS,
+    RESUME_FTS,
+    check_located_stock,
+    import_products,
+    located_stock_stmt,
+    split_chunk,
+    upsert_stmt
+)
+
+
+async def _write_chunk(rows, db: AsyncSession) -> None:
+    inserts, upserts = split_chunk(rows)
+    try:
+        if inserts and db.bind.dialect.name == "sqlite":
+            # same paused-trigger bulk load as the sync _write_chunk
+            await db.execute(PAUSE_FTS)
+            last_id = (await db.execute(LAST_PRODUCT_ID)).scalar_one()
+            conn = await db.connection()
+            await conn.exec_driver_sql(INSERT_PRODUCTS_SQL, inserts)
+            await db.execute(INDEX_NEW_PRODUCTS, {"last_id": last_id})
+            await db.execute(RESUME_FTS)
+        elif inserts:
+            await db.execute(insert(Product.__table__), [dict(zip(IMPORT_COLUMNS[1:], row)) for row in inserts])
+        if upserts:
+            check_located_stock((await db.execute(located_stock_stmt(upserts))).all(), upserts)
+            await db.execute(upsert_stmt(db.bind.dialect.name), upserts)
+        await db.commit()
+    except (SQLAlchemyError, ImportRejected):
+        await db.rollback()
+        raise
+    await ainvalidate_product_cache(*(row["id"] for row in upserts))
+
+
+async def import_products_service(chunks, fmt: str, db: AsyncSession, chunk_size: int = 20000) -> ProductImportResponse:
+    async def write_chunk(rows):
+        await _write_chunk(rows, db)
+
+    return await import_products(chunks, fmt, write_chunk, chunk_size)
@@ -0,0 +1,9 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.product import ProductStatsResponse
+from app.services.product_stats import product_stats_response, product_stats_stmt
+
+
+async def get_product_stats_service(product_id: int, db: AsyncSession) -> ProductStatsResponse:
+    stmt = product_stats_stmt(product_id, db.bind.dialect.name)
+    return product_stats_response(product_id, (await db.execute(stmt)).first())
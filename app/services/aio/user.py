@@ -0,0 +1,123 @@
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException
+from app.db.async_session import AsyncSessionLocal
+from app.models import User
+from app.pagination import split_page
+from app.schemas.user import UserCreate, UserUpdate
+from app.services.user import (
+    apply_user_update,
+    export_users_stmt,
+    format_user_rows,
+    list_users_stmt,
+    new_user
+)
+
+
+async def create_user_service(user_in: UserCreate, db: AsyncSession) -> User:
+    user = await new_user(user_in)
+    db.add(user)
+    try:
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="User creation failed")
+    return user
+
+
+async def get_user_details_service(user_id: int, db: AsyncSession) -> User:
+    """
+    Fetch a user by ID from the database.
+    Raises HTTPException if the user is not found or DB error occurs.
+    """
+    try:
+        user = await db.get(User, user_id)
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch user: {str(e)}")
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+
+async def update_user_service(
+    user_id: int,
+    user_in: UserUpdate,
+    db: AsyncSession
+) -> User:
+    """
+    Update an existing user's details.
+    """
+    try:
+        user = await db.get(User, user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        apply_user_update(user, user_in)
+        await db.commit()
+        return user
+
+    except HTTPException:
+        # re-raise known API errors
+        raise
+    except Exception:
+        await db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to update user"
+        )
+
+
+async def delete_user_service(user_id: int, db: AsyncSession) -> None:
+    """
+    Delete a user by ID.
+    """
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(
+            status_code=404,
+            detail="User not found"
+        )
+
+    try:
+        await db.delete(user)
+        await db.commit()
+    except SQLAlchemyError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to delete user"
+        )
+
+
+async def get_all_users_service(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: str = None,
+    columns=None
+):
+    """
+    Fetch a page of users ordered by id, plus the cursor of the next page
+    (None on the last one). Pass `cursor` to continue after a previous
+    page; `skip` is still honoured for offset paging. With `columns` the
+    page holds read-only rows instead of tracked User instances.
+    """
+    try:
+        stmt = list_users_stmt(skip, limit, cursor, columns)
+        result = await (db.execute(stmt) if columns else db.scalars(stmt))
+        return split_page(result.all(), limit)
+    except SQLAlchemyError:
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to fetch users"
+        )
+
+
+async def export_users_service(chunk_size: int = 1000):
+    """
+    Yield every user as NDJSON, chunk_size rows per chunk.
+    Uses its own session since the response outlives the request's.
+    """
+    async with AsyncSessionLocal(for_reading=True) as db:
+        async for rows in (await db.stream(export_users_stmt(chunk_size))).partitions():
+            yield format_user_rows(rows)
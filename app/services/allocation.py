@@ -0,0 +1,289 @@
+"""
+Allocation of order units to stock locations.
+
+A product's locations are read in one statement (one range of the
+stock_locations primary key), the allocation is planned in Python by
+ALLOCATION_POLICY, and every location in the plan is taken with a guarded
+UPDATE, so no location can go below zero however many workers allocate at
+once. An order filled from one location costs the read and two UPDATEs:
+the location's, and products.stock's, which for a product kept per
+location is the sum of its locations and moves with them in the same
+transaction (see give_back). Products without location rows keep their
+stock in products.stock alone.
+
+For an order that some single location can fill, the policy picks:
+  nearest        the closest one to the order's ship_to
+  most_stock     the one with the most units
+  fewest_splits  the one with the fewest units to spare, which keeps the
+                 large stocks whole for the orders only they can fill
+Otherwise, with ALLOCATION_ALLOW_SPLIT, the order is split: nearest
+locations first for nearest, largest first for the other two, which takes
+the fewest locations.
+"""
+import math
+from collections import defaultdict
+
+from sqlalchemy import bindparam, exists, select, true, update
+from sqlalchemy.orm import Session
+
+from app import config
+from app.models import Location, OrderAllocation, Product, StockLocation, User
+
+EARTH_RADIUS_KM = 6371.0
+# a guarded UPDATE that misses still leaves its transaction holding the
+# write lock, so the read after it is current and the next attempt holds
+ALLOCATION_ATTEMPTS = 3
+
+
+def _nearest(row, ship_to):
+    return distance_km(row.latitude, row.longitude, ship_to), row.location_id
+
+
+def _most_stock(row, ship_to):
+    return -row.quantity, row.location_id
+
+
+def _least_stock(row, ship_to):
+    return row.quantity, row.location_id
+
+
+# policy -> (rank among the locations that can fill the order alone,
+#            order in which a split takes locations)
+POLICIES = {
+    "nearest": (_nearest, _nearest),
+    "most_stock": (_most_stock, _most_stock),
+    "fewest_splits": (_least_stock, _most_stock),
+}
+
+
+def ship_to_point(ship_to):
+    return None if ship_to is None else (ship_to.latitude, ship_to.longitude)
+
+
+def distance_km(latitude: float, longitude: float, ship_to) -> float:
+    # great-circle distance; locations without coordinates rank last
+    if ship_to is None or latitude is None or longitude is None:
+        return math.inf
+    lat1, lon1, lat2, lon2 = map(math.radians, (latitude, longitude, *ship_to))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def product_locations_stmt(*product_ids):
+    return (
+        select(
+            StockLocation.product_id,
+            StockLocation.location_id,
+            StockLocation.quantity,
+            Location.latitude,
+            Location.longitude
+        )
+        .join(Location, Location.id == StockLocation.location_id)
+        .where(StockLocation.product_id.in_(product_ids))
+    )
+
+
+# the user check and the product's locations in one round trip: no row if
+# the user does not exist, one row with a NULL location_id if the product
+# has no locations, else one row per location. Prebuilt, as building it
+# costs more than running it; pass user_id and product_id
+_located = product_locations_stmt(bindparam("product_id")).subquery()
+user_product_locations_stmt = (
+    select(
+        User.id.label("user_id"),
+        _located.c.location_id,
+        _located.c.quantity,
+        _located.c.latitude,
+        _located.c.longitude
+    )
+    .outerjoin(_located, true())
+    .where(User.id == bindparam("user_id"))
+)
+
+
+def order_allocations_stmt(order_ids):
+    return (
+        select(OrderAllocation.order_id, OrderAllocation.location_id, OrderAllocation.quantity)
+        .where(OrderAllocation.order_id.in_(order_ids))
+    )
+
+
+def plan_allocation(locations, quantity: int, ship_to=None, policy: str = None, allow_split: bool = None) -> list:
+    """
+    [(location_id, units)] taking `quantity` units from `locations` (rows of
+    product_locations_stmt), or [] if they cannot fill it.
+    """
+    policy = policy or config.ALLOCATION_POLICY
+    allow_split = config.ALLOCATION_ALLOW_SPLIT if allow_split is None else allow_split
+    whole_rank, split_rank = POLICIES[policy]
+    if quantity <= 0:
+        return []
+    whole = [row for row in locations if row.quantity >= quantity]
+    if whole:
+        best = min(whole, key=lambda row: whole_rank(row, ship_to))
+        return [(best.location_id, quantity)]
+    if not allow_split or sum(row.quantity for row in locations) < quantity:
+        return []
+    plan = []
+    for row in sorted((row for row in locations if row.quantity > 0), key=lambda row: split_rank(row, ship_to)):
+        units = min(row.quantity, quantity)
+        plan.append((row.location_id, units))
+        quantity -= units
+        if quantity == 0:
+            return plan
+    return []
+
+
+def split_plan(plan: list, quantities: list) -> list:
+    """
+    Share out a plan for sum(quantities) units, in order: one plan per
+    quantity.
+    """
+    remaining = [[location_id, units] for location_id, units in plan]
+    plans, position = [], 0
+    for quantity in quantities:
+        part = []
+        while quantity:
+            location_id, units = remaining[position]
+            units = min(units, quantity)
+            part.append((location_id, units))
+            quantity -= units
+            remaining[position][1] -= units
+            if remaining[position][1] == 0:
+                position += 1
+        plans.append(part)
+    return plans
+
+
+def batch_groups(lines, indexes: list) -> dict:
+    # lines going to the same place share one allocation
+    groups = defaultdict(list)
+    for index in indexes:
+        groups[ship_to_point(lines[index].ship_to)].append(index)
+    return groups
+
+
+def take_stmt(product_id: int, location_id: int, quantity: int):
+    return (
+        update(StockLocation)
+        .where(
+            StockLocation.product_id == product_id,
+            StockLocation.location_id == location_id,
+            StockLocation.quantity >= quantity
+        )
+        .values(quantity=StockLocation.quantity - quantity)
+        .execution_options(synchronize_session=False)
+    )
+
+
+# executemany of relative increments, one parameter set per (product, location)
+give_back_stmt = (
+    update(StockLocation.__table__)
+    .where(
+        StockLocation.__table__.c.product_id == bindparam("give_product_id"),
+        StockLocation.__table__.c.location_id == bindparam("give_location_id")
+    )
+    .values(quantity=StockLocation.__table__.c.quantity + bindparam("give_quantity"))
+)
+
+
+def give_back_params(units: dict):
+    # (product, location) order, so concurrent transactions lock rows in the same order
+    return [
+        {"give_product_id": product_id, "give_location_id": location_id, "give_quantity": quantity}
+        for (product_id, location_id), quantity in sorted(units.items())
+    ]
+
+
+# executemany moving products.stock along with its locations, one
+# parameter set per product
+product_stock_delta_stmt = (
+    update(Product.__table__)
+    .where(Product.__table__.c.id == bindparam("delta_product_id"))
+    .values(stock=Product.__table__.c.stock + bindparam("delta_quantity"))
+)
+
+
+def product_stock_delta_params(units: dict):
+    by_product = defaultdict(int)
+    for (product_id, _), quantity in units.items():
+        by_product[product_id] += quantity
+    return [
+        {"delta_product_id": product_id, "delta_quantity": quantity}
+        for product_id, quantity in sorted(by_product.items())
+    ]
+
+
+def plan_units(product_id: int, plan: list) -> dict:
+    return {(product_id, location_id): units for location_id, units in plan}
+
+
+def located_stmt(product_id: int):
+    # whether the product's stock is kept per location
+    return select(exists().where(StockLocation.product_id == product_id))
+
+
+def give_back(db: Session, units: dict) -> None:
+    """
+    Return units that allocate() took ({(product, location): units}) to
+    their locations and to products.stock.
+    """
+    db.execute(give_back_stmt, give_back_params(units))
+    db.execute(product_stock_delta_stmt, product_stock_delta_params(units))
+
+
+def allocate(db: Session, product_id: int, quantity: int, ship_to=None, locations=None):
+    """
+    Take `quantity` units of a product from its locations. Returns the plan
+    carried out, [] if the locations cannot fill the order, or None if the
+    product's stock is not kept per location. `locations` are the product's
+    rows if they were already read.
+    """
+    for _ in range(ALLOCATION_ATTEMPTS):
+        if locations is None:
+            locations = db.execute(product_locations_stmt(product_id)).all()
+        if not locations:
+            return None
+        plan = plan_allocation(locations, quantity, ship_to)
+        if not plan:
+            return []
+        taken = []
+        for location_id, units in plan:
+            if db.execute(take_stmt(product_id, location_id, units)).rowcount != 1:
+                break
+            taken.append((location_id, units))
+        else:
+            db.execute(product_stock_delta_stmt, {"delta_product_id": product_id, "delta_quantity": -quantity})
+            return plan
+        # another order took stock since the read: undo and plan again
+        # (products.stock has not moved yet)
+        if taken:
+            db.execute(give_back_stmt, give_back_params(plan_units(product_id, taken)))
+        locations = None
+    return []
+
+
+def allocate_lines(db: Session, product_id: int, lines, indexes: list, locations) -> dict:
+    """
+    Allocate a product's batch lines: {line index: plan}, or None, with
+    nothing taken, if their locations cannot fill all of them.
+    """
+    plans, taken = {}, defaultdict(int)
+    for ship_to, group in batch_groups(lines, indexes).items():
+        plan = allocate(db, product_id, sum(lines[i].quantity for i in group), ship_to, locations)
+        locations = None  # stale once this group has taken its units
+        if not plan:
+            if taken:
+                give_back(db, taken)
+            return None
+        for key, units in plan_units(product_id, plan).items():
+            taken[key] += units
+        plans.update(zip(group, split_plan(plan, [lines[i].quantity for i in group])))
+    return plans
+
+
+def locations_by_product(rows) -> dict:
+    by_product = defaultdict(list)
+    for row in rows:
+        by_product[row.product_id].append(row)
+    return by_product
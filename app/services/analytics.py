@@ -0,0 +1,224 @@
+"""
+Order analytics: top products by revenue, daily order volume and status mix.
+
+A time window is summarized in one pass: the window's orders are read off
+the covering ix_orders_created_at index in columnar chunks of
+ANALYTICS_CHUNK_SIZE rows, and every aggregate is a np.bincount over the
+chunk's arrays. The summary is cached per window for ANALYTICS_CACHE_TTL
+seconds, so the three endpoints and repeated calls share it. All-time
+figures come from the product_stats summary instead of the orders (see
+product_stats_source for dialects without its triggers).
+
+Orders keep no price; revenue uses each product's current price, like the
+order export and GET /products/{id}/stats, and leaves cancelled orders out.
+"""
+import time
+from datetime import date
+
+import numpy as np
+from sqlalchemy import case, select
+from sqlalchemy.orm import Session
+
+from app import config
+from app.cache import TTLCache
+from app.metrics import instrument_cache
+from app.models import Order, Product
+from app.models.product_stats import ORDER_STATUSES, STATS_COLUMNS, product_stats_source
+from app.schemas.analytics import DailyVolume, StatusShare, TopProduct
+
+DAY = 86400
+STATUS_CODES = {status: code for code, status in enumerate(ORDER_STATUSES)}
+CANCELLED = STATUS_CODES["CANCELLED"]
+
+# OrderWindow summaries keyed by (days, first day of the window)
+analytics_cache = TTLCache(maxsize=64, ttl=config.ANALYTICS_CACHE_TTL, name="analytics")
+instrument_cache(analytics_cache)
+
+
+class OrderWindow:
+    """
+    Aggregates of the orders created since `start` (epoch seconds, a UTC
+    midnight), one array slot per product, day or status.
+    """
+
+    def __init__(self, start: float, days: int, product_ids, names: list):
+        self.start = start
+        self.product_ids = product_ids
+        self.names = names
+        self.product_units = np.zeros(len(product_ids))
+        self.product_revenue = np.zeros(len(product_ids))
+        self.day_orders = np.zeros(days)
+        self.day_units = np.zeros(days)
+        self.day_revenue = np.zeros(days)
+        self.status_orders = np.zeros(len(ORDER_STATUSES))
+        self.status_units = np.zeros(len(ORDER_STATUSES))
+
+    def add(self, chunk, prices) -> None:
+        """
+        Fold in a chunk of (product_id, quantity, status code, created_at) rows.
+        """
+        if not len(self.product_ids):
+            return
+        slot = np.searchsorted(self.product_ids, chunk[:, 0])
+        np.minimum(slot, len(self.product_ids) - 1, out=slot)
+        # skip orders of products created after the product list was read
+        known = self.product_ids[slot] == chunk[:, 0]
+        if not known.all():
+            chunk, slot = chunk[known], slot[known]
+        _, quantity, status_code, created_at = chunk.T
+        status_code = status_code.astype(np.intp)
+        live_units = np.where(status_code == CANCELLED, 0.0, quantity)
+        live_revenue = live_units * prices[slot]
+        day = ((created_at - self.start) // DAY).astype(np.intp)
+        # a clock a little ahead of ours must not index past the last day
+        np.minimum(day, len(self.day_orders) - 1, out=day)
+
+        products, days, statuses = len(self.product_ids), len(self.day_orders), len(self.status_orders)
+        self.product_units += np.bincount(slot, live_units, products)
+        self.product_revenue += np.bincount(slot, live_revenue, products)
+        self.day_orders += np.bincount(day, minlength=days)
+        self.day_units += np.bincount(day, quantity, days)
+        self.day_revenue += np.bincount(day, live_revenue, days)
+        self.status_orders += np.bincount(status_code, minlength=statuses)
+        self.status_units += np.bincount(status_code, quantity, statuses)
+
+
+def window_start(days: int, now: float = None) -> float:
+    # whole UTC days: today and the days - 1 before it
+    today = int((time.time() if now is None else now) // DAY)
+    return float((today - days + 1) * DAY)
+
+
+def _products(db: Session):
+    rows = db.execute(select(Product.id, Product.price, Product.name).order_by(Product.id)).all()
+    ids = np.fromiter((row.id for row in rows), dtype=np.int64, count=len(rows))
+    prices = np.fromiter((row.price for row in rows), dtype=np.float64, count=len(rows))
+    return ids, prices, [row.name for row in rows]
+
+
+def window_orders_stmt(start: float):
+    return (
+        select(Order.product_id, Order.quantity, case(STATUS_CODES, value=Order.status), Order.created_at)
+        .where(Order.created_at >= start, Order.product_id.is_not(None))
+    )
+
+
+def columnar_chunks(db: Session, stmt, size: int):
+    """
+    The rows of `stmt` as float64 arrays of up to `size` rows, fetched
+    straight off the DBAPI cursor: building a Row object per order would
+    cost several times what the aggregation does.
+    """
+    conn = db.connection()
+    compiled = stmt.compile(conn)
+    params = compiled.construct_params()
+    if compiled.positiontup is not None:
+        params = [params[name] for name in compiled.positiontup]
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(str(compiled), params)
+        while True:
+            rows = cursor.fetchmany(size)
+            if not rows:
+                return
+            yield np.array(rows, dtype=np.float64)
+    finally:
+        cursor.close()
+
+
+def load_order_window(days: int, start: float, db: Session) -> OrderWindow:
+    product_ids, prices, names = _products(db)
+    window = OrderWindow(start, days, product_ids, names)
+    for chunk in columnar_chunks(db, window_orders_stmt(start), config.ANALYTICS_CHUNK_SIZE):
+        window.add(chunk, prices)
+    return window
+
+
+def order_window(days: int, db: Session) -> OrderWindow:
+    start = window_start(days)
+    return analytics_cache.get_or_load((days, start), lambda: load_order_window(days, start, db))
+
+
+def top_products(product_ids, names: list, units, revenue, limit: int) -> list:
+    limit = min(limit, int(np.count_nonzero(revenue)))
+    if limit == 0:
+        return []
+    top = np.argpartition(-revenue, limit - 1)[:limit]
+    top = top[np.argsort(-revenue[top], kind="stable")]
+    return [
+        TopProduct(product_id=int(product_ids[i]), name=names[i], units=int(units[i]), revenue=round(float(revenue[i]), 2))
+        for i in top
+    ]
+
+
+def daily_volume(window: OrderWindow) -> list:
+    first_day = int(window.start // DAY)
+    return [
+        DailyVolume(
+            date=date.fromordinal(date(1970, 1, 1).toordinal() + first_day + i),
+            orders=int(window.day_orders[i]),
+            units=int(window.day_units[i]),
+            revenue=round(float(window.day_revenue[i]), 2)
+        )
+        for i in range(len(window.day_orders))
+    ]
+
+
+def status_mix(orders, units) -> list:
+    total = orders.sum()
+    return [
+        StatusShare(
+            status=status,
+            orders=int(orders[code]),
+            units=int(units[code]),
+            share=round(float(orders[code] / total), 4) if total else 0.0
+        )
+        for status, code in STATUS_CODES.items()
+    ]
+
+
+def all_time_stats(db: Session):
+    """
+    (product ids, names, live units, revenue, status orders, status units)
+    from product_stats, one array slot per product with orders.
+    """
+    stats = product_stats_source(db.get_bind().dialect.name)
+    fields = [stats.c[column.key] for _, orders, units in STATS_COLUMNS for column in (orders, units)]
+    rows = db.execute(
+        select(Product.id, Product.name, Product.price, *fields)
+        .join(stats, stats.c.product_id == Product.id)
+        .order_by(Product.id)
+    ).all()
+    counts = np.array([row[3:] for row in rows], dtype=np.float64).reshape(len(rows), len(fields))
+    status_orders, status_units = counts[:, 0::2], counts[:, 1::2]
+    live_units = status_units.sum(axis=1) - status_units[:, CANCELLED]
+    prices = np.fromiter((row.price for row in rows), dtype=np.float64, count=len(rows))
+    ids = np.fromiter((row.id for row in rows), dtype=np.int64, count=len(rows))
+    return (
+        ids, [row.name for row in rows], live_units, live_units * prices,
+        status_orders.sum(axis=0), status_units.sum(axis=0)
+    )
+
+
+def all_time(db: Session):
+    return analytics_cache.get_or_load(("all", 0), lambda: all_time_stats(db))
+
+
+def top_products_service(db: Session, limit: int = 10, days: int = None) -> list:
+    if days is None:
+        ids, names, units, revenue, _, _ = all_time(db)
+        return top_products(ids, names, units, revenue, limit)
+    window = order_window(days, db)
+    return top_products(window.product_ids, window.names, window.product_units, window.product_revenue, limit)
+
+
+def daily_volume_service(db: Session, days: int = 30) -> list:
+    return daily_volume(order_window(days, db))
+
+
+def status_mix_service(db: Session, days: int = None) -> list:
+    if days is None:
+        _, _, _, _, orders, units = all_time(db)
+        return status_mix(orders, units)
+    window = order_window(days, db)
+    return status_mix(window.status_orders, window.status_units)
@@ -1,20 +1,64 @@
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
 
 from app.models import User
 from app.schemas.auth import LoginRequest, TokenResponse
-from app.utils import verify_password,create_access_token
+from app.utils import averify_password,create_access_token,aget_password_hash,password_needs_rehash
 
 
-def login_user_service(
-    login_in: LoginRequest,
-    db: Session
-) -> TokenResponse:
+def login_user_stmt(email: str):
+    return select(User.id, User.password).where(User.email == email)
+
+
+def store_rehash_stmt(user_id: int, old_hash: str, new_hash: str):
+    # only if the password was not changed in the meantime
+    return (
+        update(User)
+        .where(User.id == user_id, User.password == old_hash)
+        .values(password=new_hash)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _find_login_user(email: str, db: Session):
+    user = db.execute(login_user_stmt(email)).first()
+    # end the read transaction so the connection goes back to the pool
+    # while bcrypt runs
+    db.rollback()
+    return user
+
+
+def _store_rehash(user_id: int, old_hash: str, new_hash: str, db: Session) -> None:
+    try:
+        db.execute(store_rehash_stmt(user_id, old_hash, new_hash))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+
+async def _rehash_password(user_id: int, old_hash: str, password: str, store_rehash) -> None:
     """
-    Verify user credentials and return JWT token.
+    Upgrade the stored hash to the configured bcrypt cost. A failure here
+    must not fail the login, the rehash is simply retried next time.
+    """
+    try:
+        new_hash = await aget_password_hash(password)
+        await store_rehash(user_id, old_hash, new_hash)
+    except Exception:
+        pass
+
+
+async def authenticate(login_in: LoginRequest, find_user, store_rehash) -> TokenResponse:
+    """
+    The login flow for either kind of session: find_user(email) and
+    store_rehash(user_id, old_hash, new_hash) are coroutines that run the
+    queries, while bcrypt is awaited from its own pool.
     """
     try:
-        user = db.query(User).filter(User.email == login_in.email).first()
+        user = await find_user(login_in.email)
 
         if not user:
             raise HTTPException(
@@ -22,11 +66,15 @@ def login_user_service(
                 detail="Invalid email or password"
             )
 
-        if not verify_password(login_in.password, user.password):
+        if not await averify_password(login_in.password, user.password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid email or password"
             )
+
+        if password_needs_rehash(user.password):
+            await _rehash_password(user.id, user.password, login_in.password, store_rehash)
+
         access_token = create_access_token(
             data={"sub": str(user.id)}
         )
@@ -39,3 +87,22 @@ def login_user_service(
             status_code=500,
             detail="Authentication failed"
         )
+
+
+async def login_user_service(
+    login_in: LoginRequest,
+    db: Session
+) -> TokenResponse:
+    """
+    Verify user credentials and return JWT token.
+
+    Async although the session is sync: the queries run in the threadpool,
+    so no threadpool thread waits on bcrypt.
+    """
+    async def find_user(email):
+        return await run_in_threadpool(_find_login_user, email, db)
+
+    async def store_rehash(user_id, old_hash, new_hash):
+        await run_in_threadpool(_store_rehash, user_id, old_hash, new_hash, db)
+
+    return await authenticate(login_in, find_user, store_rehash)
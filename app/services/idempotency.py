@@ -0,0 +1,257 @@
+"""
+Idempotency keys for write endpoints.
+
+The first request with a key claims it by inserting an in-flight row; its
+response is stored in that row in the same transaction as its own writes.
+Retries with the same key get the stored response back from one primary
+key lookup. A request that fails releases its key, so a retry runs for
+real.
+
+Duplicates that arrive while the first request is still running wait for
+it instead of running again: within a worker on the request itself (no
+database access at all), across workers by polling its row. Only one
+request per key and worker ever tries to insert the row, so a retry storm
+does not turn into a queue of failing writes on the database lock.
+"""
+import hashlib
+import threading
+import time
+
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import config
+from app.models import IdempotencyKey
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+# waiting on a request another worker is running: poll its row, backing
+# off from POLL_MIN to POLL_MAX seconds
+POLL_MIN = 0.01
+POLL_MAX = 0.2
+PRUNE_INTERVAL = 300
+# the row exists but its request has not finished yet
+RUNNING = object()
+
+
+class Claim:
+    """The request in this worker that runs a key; local duplicates wait on it."""
+
+    def __init__(self, req_hash: str, event):
+        self.req_hash = req_hash
+        self.event = event
+        self.response = None  # (status_code, body) once stored
+
+
+# key -> Claim of the request handling it in this worker; shared with the
+# async services, which put asyncio events in it (one DB_MODE per process)
+inflight = {}
+_next_prune = 0.0
+
+
+def scoped_key(request: Request, key: str):
+    """
+    The key as stored: per token subject, so two clients cannot collide.
+    """
+    if key is None:
+        return None
+    return f"{request.state.user.get('sub')}:{key}"
+
+
+def request_hash(payload) -> str:
+    # unset optional fields are left out, so adding one to a schema does not
+    # change the hash of the requests that do not use it
+    return hashlib.sha256(payload.model_dump_json(exclude_none=True).encode()).hexdigest()
+
+
+def replay_response(status_code: int, body: str) -> Response:
+    return Response(
+        content=body,
+        status_code=status_code,
+        media_type="application/json",
+        headers={REPLAYED_HEADER: "true"}
+    )
+
+
+def _check_hash(stored_hash: str, req_hash: str) -> None:
+    if stored_hash != req_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used with a different request"
+        )
+
+
+def still_running() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="A request with this Idempotency-Key is still in progress"
+    )
+
+
+def local_replay(claim: Claim, req_hash: str):
+    """
+    After waiting on a local claim: its response, or None if it failed.
+    """
+    _check_hash(claim.req_hash, req_hash)
+    if claim.response is None:
+        return None
+    return replay_response(*claim.response)
+
+
+def lookup_stmt(key: str):
+    return select(
+        IdempotencyKey.request_hash,
+        IdempotencyKey.status_code,
+        IdempotencyKey.body,
+        IdempotencyKey.created_at
+    ).where(IdempotencyKey.key == key)
+
+
+def is_stale(row, now: float) -> bool:
+    """
+    Expired, or claimed by a request that never finished.
+    """
+    if row.created_at < now - config.IDEMPOTENCY_TTL:
+        return True
+    return row.status_code is None and row.created_at < now - config.IDEMPOTENCY_LOCK_TIMEOUT
+
+
+def stored_response(row, req_hash: str):
+    """
+    The stored response of a finished request, RUNNING while it runs.
+    """
+    _check_hash(row.request_hash, req_hash)
+    if row.status_code is None:
+        return RUNNING
+    return replay_response(row.status_code, row.body)
+
+
+def claim_stmts(key: str, req_hash: str, now: float, stale=None) -> list:
+    stmts = []
+    if stale is not None:
+        # only the stale row we saw, not one another request just claimed
+        stmts.append(
+            delete(IdempotencyKey)
+            .where(IdempotencyKey.key == key, IdempotencyKey.created_at == stale.created_at)
+        )
+    stmts.append(
+        insert(IdempotencyKey).values(key=key, request_hash=req_hash, created_at=now)
+    )
+    global _next_prune
+    if now >= _next_prune:
+        _next_prune = now + PRUNE_INTERVAL
+        stmts.append(
+            delete(IdempotencyKey).where(IdempotencyKey.created_at < now - config.IDEMPOTENCY_TTL)
+        )
+    return stmts
+
+
+def complete_stmt(key: str, status_code: int, body: str):
+    return (
+        update(IdempotencyKey)
+        .where(IdempotencyKey.key == key)
+        .values(status_code=status_code, body=body)
+    )
+
+
+def release_stmt(key: str):
+    return delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None))
+
+
+def record_response(key: str, status_code: int, body: str) -> None:
+    claim = inflight.get(key)
+    if claim is not None:
+        claim.response = (status_code, body)
+
+
+def end_claim(key: str, failed: bool) -> None:
+    """
+    Drop this worker's claim on `key` and wake its local duplicates.
+    """
+    claim = inflight.pop(key, None)
+    if claim is not None:
+        if failed:
+            claim.response = None
+        claim.event.set()
+
+
+def _claim_row(key: str, req_hash: str, db: Session):
+    """
+    None once this request owns the row, else the stored response or RUNNING.
+    """
+    row = db.execute(lookup_stmt(key)).first()
+    # end the read transaction, so the next lookup sees new commits
+    db.rollback()
+    now = time.time()
+    if row is not None and not is_stale(row, now):
+        return stored_response(row, req_hash)
+    try:
+        for stmt in claim_stmts(key, req_hash, now, row):
+            db.execute(stmt)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return RUNNING  # another worker claimed it first
+    return None
+
+
+def claim_idempotency_key(key: str, req_hash: str, db: Session):
+    """
+    None when this request now owns `key` and should run (then call
+    complete_idempotency_key before its commit and finish_idempotency_key
+    after), otherwise the stored response of the earlier request.
+    """
+    deadline = time.monotonic() + config.IDEMPOTENCY_LOCK_TIMEOUT
+    delay = POLL_MIN
+    while True:
+        mine = Claim(req_hash, threading.Event())
+        claim = inflight.setdefault(key, mine)
+        if claim is not mine:
+            # another request in this worker has the key
+            if not claim.event.wait(max(0.0, deadline - time.monotonic())):
+                raise still_running()
+            response = local_replay(claim, req_hash)
+            if response is not None:
+                return response
+            continue
+
+        try:
+            response = _claim_row(key, req_hash, db)
+        except BaseException:
+            end_claim(key, failed=True)
+            raise
+        if response is None:
+            return None
+        end_claim(key, failed=True)
+        if response is not RUNNING:
+            return response
+        remaining = deadline - time.monotonic()
+        if remaining <= delay:
+            # the claim turns stale about when we stop waiting: a 409, so
+            # the client's next retry is the one that takes the key over
+            raise still_running()
+        time.sleep(delay)
+        delay = min(delay * 2, POLL_MAX)
+
+
+def complete_idempotency_key(key: str, status_code: int, body: str, db: Session) -> None:
+    """
+    Store the response; runs in the request's own transaction.
+    """
+    db.execute(complete_stmt(key, status_code, body))
+    record_response(key, status_code, body)
+
+
+def finish_idempotency_key(key: str, db: Session, failed: bool = False) -> None:
+    """
+    Release the claim of a failed request, and hand the outcome to the
+    duplicates waiting in this worker.
+    """
+    try:
+        if failed:
+            db.rollback()
+            db.execute(release_stmt(key))
+            db.commit()
+    finally:
+        end_claim(key, failed)
@@ -0,0 +1,110 @@
+"""
+Warehouse locations and the units of each product they hold. Orders draw
+on them through app/services/allocation.py. Once a product has locations,
+products.stock is their sum: setting a location's stock recomputes it,
+and orders move it along with the locations they take from.
+"""
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+from fastapi import HTTPException, status
+
+from app.models import Location, Product, StockLocation
+from app.schemas.location import LocationCreate, LocationStockResponse, LocationStockUpdate
+from app.services.product import invalidate_product_cache
+
+
+def create_location_service(location_in: LocationCreate, db: Session) -> Location:
+    location = Location(**location_in.model_dump())
+    db.add(location)
+    try:
+        db.commit()
+        db.refresh(location)
+        return location
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to create location: {str(e)}"
+        )
+
+
+def list_locations_service(db: Session) -> list:
+    return db.scalars(select(Location).order_by(Location.id)).all()
+
+
+def check_stock_target(location, product) -> None:
+    if location is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Location not found")
+    if product is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
+
+
+def _stock_location(location_id: int, product_id: int):
+    return StockLocation.product_id == product_id, StockLocation.location_id == location_id
+
+
+def set_location_stock_stmt(location_id: int, product_id: int, quantity: int):
+    # matches nothing if the location does not hold the product yet, see
+    # add_location_stock_stmt
+    return (
+        update(StockLocation)
+        .where(*_stock_location(location_id, product_id))
+        .values(quantity=quantity)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def add_location_stock_stmt(location_id: int, product_id: int, quantity: int):
+    return insert(StockLocation).values(product_id=product_id, location_id=location_id, quantity=quantity)
+
+
+def sync_product_stock_stmt(product_id: int):
+    # products.stock of a product kept per location is their sum
+    return (
+        update(Product)
+        .where(Product.id == product_id)
+        .values(stock=select(func.coalesce(func.sum(StockLocation.quantity), 0))
+                .where(StockLocation.product_id == product_id)
+                .scalar_subquery())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def set_location_stock_service(
+    location_id: int, product_id: int, stock_in: LocationStockUpdate, db: Session
+) -> LocationStockResponse:
+    """
+    Set how many units of a product a location holds, exactly
+    stock_in.quantity, then recompute products.stock as the sum of the
+    product's locations. When this is the product's first location, the
+    stock it had until then is replaced, not added to: the caller states
+    where its units actually are.
+    """
+    check_stock_target(db.get(Location, location_id), db.get(Product, product_id))
+    try:
+        if db.execute(set_location_stock_stmt(location_id, product_id, stock_in.quantity)).rowcount == 0:
+            db.execute(add_location_stock_stmt(location_id, product_id, stock_in.quantity))
+        db.execute(sync_product_stock_stmt(product_id))
+        db.commit()
+        invalidate_product_cache(product_id)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to set stock: {str(e)}"
+        )
+    return LocationStockResponse(product_id=product_id, location_id=location_id, quantity=stock_in.quantity)
+
+
+def location_stock_stmt(product_id: int):
+    return (
+        select(StockLocation)
+        .where(StockLocation.product_id == product_id)
+        .order_by(StockLocation.location_id)
+    )
+
+
+def list_product_locations_service(product_id: int, db: Session) -> list:
+    if db.get(Product, product_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
+    return db.scalars(location_stock_stmt(product_id)).all()
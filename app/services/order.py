@@ -1,59 +1,309 @@
+from sqlalchemy import select, insert
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
+from app.db.session import SessionLocal
 from app.models import Order
+from app.models import OrderAllocation
 from app.models import Product
 from app.models import User
-from app.schemas.order import OrderCreate, OrderUpdate
-from enum import Enum
-
-# Define allowed statuses
-class OrderStatusEnum(str, Enum):
-    CREATED = "CREATED"
-    SHIPPED = "SHIPPED"
-    DELIVERED = "DELIVERED"
-    CANCELLED = "CANCELLED"
-
-def create_order_service(order_in: OrderCreate, db: Session) -> Order:
-    # Validate user
-    user = db.get(User, order_in.user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+from app.pagination import split_page
+from app.services.allocation import (
+    allocate,
+    allocate_lines,
+    give_back,
+    locations_by_product,
+    order_allocations_stmt,
+    product_locations_stmt,
+    ship_to_point,
+    user_product_locations_stmt
+)
+from app.services.idempotency import (
+    claim_idempotency_key,
+    complete_idempotency_key,
+    finish_idempotency_key,
+    request_hash
+)
+from app.services.order_stmts import (
+    EXPORT_COLUMNS,
+    RESTOCKED_ON_DELETE,
+    allocation_rows,
+    batch_response,
+    batch_rows,
+    bulk_cancel_stmt,
+    bulk_restock,
+    bulk_rejected_stmt,
+    bulk_set_status_stmt,
+    bulk_status_response,
+    bulk_status_rounds,
+    cancel_order_stmt,
+    checked_status,
+    delete_order_stmt,
+    export_orders_stmt,
+    format_export_rows,
+    found_order,
+    id_chunks,
+    list_orders_stmt,
+    modified_concurrently,
+    plan_batch,
+    raise_batch_rejected,
+    reject_batch_product,
+    reserve_stock_params,
+    reserve_stock_stmt,
+    restore_first_location_stmt,
+    restore_stock_many_stmt,
+    restore_stock_params
+)
+from app.services.product import invalidate_product_cache
+from app.schemas.order import (
+    OrderCreate,
+    OrderUpdate,
+    OrderCreatedResponse,
+    OrderBatchCreate,
+    OrderBatchResponse,
+    OrderBulkStatusUpdate,
+    OrderBulkStatusResponse
+)
+
+def _reserve_stock(product_id: int, quantity: int, db: Session) -> bool:
+    """
+    Atomically take `quantity` units of stock. Returns False if nothing was reserved.
+    """
+    return db.execute(reserve_stock_stmt, reserve_stock_params(product_id, quantity)).rowcount == 1
+
+
+def _restore_stock(restock: dict, db: Session) -> None:
+    """
+    Give units ({product id: units}) of orders without allocations back to
+    products.stock, and to the lowest-id location of products that are
+    kept per location since.
+    """
+    params = restore_stock_params(restock)
+    db.execute(restore_stock_many_stmt, params)
+    db.execute(restore_first_location_stmt, params)
+
+
+def _restore_order_stock(order: Order, allocations, db: Session) -> None:
+    """
+    Give an order's units back to the locations it was allocated from, or
+    to products.stock if it has no allocations.
+    """
+    if allocations:
+        give_back(db, {(order.product_id, row.location_id): row.quantity for row in allocations})
+    else:
+        _restore_stock({order.product_id: order.quantity}, db)
 
-    # Validate product and stock
-    product = db.get(Product, order_in.product_id)
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    
-    if product.stock < order_in.quantity:
-        raise HTTPException(status_code=400, detail="Insufficient stock")
-
-    # Reduce stock
-    product.stock -= order_in.quantity
-
-    order = Order(
-        user_id=order_in.user_id,
-        product_id=order_in.product_id,
-        quantity=order_in.quantity,
-        status="CREATED"
-    )
-    db.add(order)
 
+def create_order_service(order_in: OrderCreate, db: Session, idempotency_key: str = None):
+    """
+    Create one order. With an idempotency key, a repeat of an earlier
+    request returns that request's stored response instead.
+    """
+    if idempotency_key is None:
+        return _create_order(order_in, db)
+    replay = claim_idempotency_key(idempotency_key, request_hash(order_in), db)
+    if replay is not None:
+        return replay
+    failed = True
     try:
-        db.commit()
-        db.refresh(order)
+        order = _create_order(order_in, db, idempotency_key)
+        failed = False
         return order
+    finally:
+        finish_idempotency_key(idempotency_key, db, failed)
+
+
+def _create_order(order_in: OrderCreate, db: Session, idempotency_key: str = None) -> OrderCreatedResponse:
+    # Validate user, reading the product's locations in the same statement
+    rows = db.execute(
+        user_product_locations_stmt, {"user_id": order_in.user_id, "product_id": order_in.product_id}
+    ).all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="User not found")
+    locations = [row for row in rows if row.location_id is not None]
+
+    # Reserve stock and insert the order in the same transaction
+    try:
+        plan = allocate(db, order_in.product_id, order_in.quantity, ship_to_point(order_in.ship_to), locations)
+        reserved = _reserve_stock(order_in.product_id, order_in.quantity, db) if plan is None else bool(plan)
+        if not reserved:
+            db.rollback()
+            if db.get(Product, order_in.product_id) is None:
+                raise HTTPException(status_code=404, detail="Product not found")
+            raise HTTPException(status_code=400, detail="Insufficient stock")
+
+        order = Order(
+            user_id=order_in.user_id,
+            product_id=order_in.product_id,
+            quantity=order_in.quantity,
+            status="CREATED",
+            allocations=[OrderAllocation(location_id=location_id, quantity=units) for location_id, units in plan or ()]
+        )
+        db.add(order)
+        db.flush()
+        created = OrderCreatedResponse.model_validate(order)
+        if idempotency_key is not None:
+            # stored in the same transaction as the order, so a retry can
+            # never run the order again once it exists
+            complete_idempotency_key(idempotency_key, 201, created.model_dump_json(), db)
+        db.commit()
+        invalidate_product_cache(order_in.product_id)
+        return created
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
-        # Restore stock in case of failure
-        product.stock += order_in.quantity
         raise HTTPException(status_code=400, detail=f"Failed to create order: {str(e)}")
 
 
+def create_orders_batch_service(batch_in: OrderBatchCreate, db: Session) -> OrderBatchResponse:
+    """
+    Create many orders in one transaction.
+    Users and products are validated with one IN query each, stock is
+    reserved once per product for the summed quantity (per product and
+    ship_to for products kept per location, with their locations read in
+    one more IN query), and the orders are inserted in bulk.
+    """
+    lines = batch_in.orders
+    atomic = batch_in.mode == "all_or_nothing"
+
+    known_users = set(db.scalars(
+        select(User.id).where(User.id.in_({line.user_id for line in lines}))
+    ))
+    stock = dict(db.execute(
+        select(Product.id, Product.stock).where(Product.id.in_({line.product_id for line in lines}))
+    ).all())
+
+    errors, requested, lines_by_product = plan_batch(lines, known_users, stock, atomic)
+    if atomic and errors:
+        raise_batch_rejected(lines, errors)
+
+    try:
+        located = locations_by_product(db.execute(product_locations_stmt(*requested)).all()) if requested else {}
+        line_plans = {}
+        # Reserve stock; a guard failure here means a concurrent order took it
+        for product_id, quantity in list(requested.items()):
+            if product_id in located:
+                plans = allocate_lines(db, product_id, lines, lines_by_product[product_id], located[product_id])
+                reserved = plans is not None
+                line_plans.update(plans or {})
+            else:
+                reserved = _reserve_stock(product_id, quantity, db)
+            if not reserved:
+                reject_batch_product(product_id, errors, requested, lines_by_product)
+                if atomic:
+                    db.rollback()
+                    raise_batch_rejected(lines, errors)
+
+        accepted, rows = batch_rows(lines, lines_by_product)
+        order_ids = []
+        if rows:
+            order_ids = db.scalars(
+                insert(Order).returning(Order.id, sort_by_parameter_order=True),
+                rows
+            ).all()
+        if line_plans:
+            db.execute(insert(OrderAllocation), allocation_rows(accepted, order_ids, line_plans))
+        db.commit()
+        invalidate_product_cache(*requested)
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Failed to create orders: {str(e)}")
+
+    return batch_response(lines, errors, accepted, order_ids, line_plans)
+
+
+def bulk_update_order_status_service(bulk_in: OrderBulkStatusUpdate, db: Session) -> OrderBulkStatusResponse:
+    """
+    Move many orders, by ids or by filter, to one status with set-based
+    UPDATE ... RETURNING statements in a single transaction. Same rules as
+    update_order_service: cancelling an order that still holds stock gives
+    it back, to the locations it was allocated from if any. With a filter, orders already in the target status are simply
+    not matched. Cancelled orders only ever stay cancelled: for any other
+    target they are reported as rejected.
+    """
+    rounds = bulk_status_rounds(bulk_in)
+    updated, unchanged, missing, rejected = [], [], [], []
+    cancelled = {}
+    try:
+        for ids, conditions in rounds:
+            changed = []
+            if bulk_in.status == "CANCELLED":
+                for order_id, product_id, quantity in db.execute(bulk_cancel_stmt(conditions)):
+                    changed.append(order_id)
+                    cancelled[order_id] = (product_id, quantity)
+            changed += db.scalars(bulk_set_status_stmt(conditions, bulk_in.status)).all()
+            updated += changed
+            if bulk_in.status != "CANCELLED":
+                rejected += db.scalars(bulk_rejected_stmt(conditions))
+
+            leftover = set(ids or ()).difference(changed)
+            if leftover:
+                found = set(db.scalars(select(Order.id).where(Order.id.in_(leftover))))
+                unchanged += found.difference(rejected)
+                missing += leftover - found
+
+        allocations = [row for chunk in id_chunks(cancelled) for row in db.execute(order_allocations_stmt(chunk))]
+        restock, located = bulk_restock(cancelled, allocations)
+        if restock:
+            _restore_stock(restock, db)
+        if located:
+            give_back(db, located)
+        db.commit()
+        invalidate_product_cache(*{product_id for product_id, _ in cancelled.values()})
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Failed to update orders: {str(e)}")
+
+    return bulk_status_response(updated, unchanged, missing, rejected)
+
+
 def get_order_service(order_id: int, db: Session) -> Order:
-    order = db.get(Order, order_id)
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    return order
+    return found_order(db.get(Order, order_id))
+
+
+def list_orders_service(db: Session, limit: int = 10, **filters):
+    """
+    Fetch a page of orders with their products, plus the cursor of the
+    next page (None on the last one).
+    """
+    stmt = list_orders_stmt(limit=limit, **filters)
+    return split_page(db.scalars(stmt).all(), limit)
+
+
+def list_user_orders_service(user_id: int, db: Session, limit: int = 10, **filters):
+    if db.get(User, user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return list_orders_service(db, limit=limit, user_id=user_id, **filters)
+
+
+def export_orders_service(
+    fmt: str = "ndjson",
+    order_status: str = None,
+    after_id: int = None,
+    until_id: int = None,
+    chunk_size: int = 1000
+):
+    """
+    Yield orders as CSV or NDJSON, chunk_size rows per chunk, from a
+    server-side cursor so memory stays flat however many rows there are.
+    To resume after a dropped connection, drop the trailing partial line and
+    pass the last id received as after_id; resumed CSV has no header row so
+    it can be appended to what was already written.
+    Uses its own session since the response outlives the request's.
+    """
+    if fmt == "csv" and after_id is None:
+        yield format_export_rows([EXPORT_COLUMNS], fmt)
+    with SessionLocal(for_reading=True) as db:
+        result = db.execute(
+            export_orders_stmt(order_status, after_id, until_id)
+            .execution_options(stream_results=True, yield_per=chunk_size)
+        )
+        for rows in result.partitions():
+            yield format_export_rows(rows, fmt)
 
 
 # def update_order_service(order_id: int, order_in: OrderUpdate, db: Session) -> Order:
@@ -85,57 +335,68 @@ def get_order_service(order_id: int, db: Session) -> Order:
 #         raise HTTPException(status_code=400, detail=f"Failed to update order: {str(e)}")
 
 def update_order_service(order_id: int, order_in: OrderUpdate, db: Session) -> Order:
-    order = db.get(Order, order_id)
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-
-    # If quantity changes, adjust stock
-    if getattr(order_in, "quantity", None) is not None and order_in.quantity != order.quantity:
-        product = order.product
-        diff = order_in.quantity - order.quantity
-        if diff > 0 and product.stock < diff:
-            raise HTTPException(status_code=400, detail="Insufficient stock for update")
-        product.stock -= diff
-        order.quantity = order_in.quantity
-    
-    
-    if getattr(order_in, "status", None) is not None:
-        # Normalize status to uppercase
-        new_status = order_in.status.upper()
-
-        # Validate against allowed statuses
-        if new_status not in OrderStatusEnum.__members__:
-            raise HTTPException(status_code=400, detail=f"Invalid status. Allowed: {list(OrderStatusEnum.__members__.keys())}")
-
-        # Handle cancel logic
-        if new_status == "CANCELLED" and order.status not in ("CANCELLED", "DELIVERED"):
-            order.product.stock += order.quantity
-
-        order.status = new_status
+    order = found_order(db.get(Order, order_id))
 
+    stock_changed = False
     try:
+        # If quantity changes, adjust stock
+        if getattr(order_in, "quantity", None) is not None and order_in.quantity != order.quantity:
+            stock_changed = True
+            diff = order_in.quantity - order.quantity
+            if diff > 0:
+                if not _reserve_stock(order.product_id, diff, db):
+                    db.rollback()
+                    raise HTTPException(status_code=400, detail="Insufficient stock for update")
+            else:
+                _restore_stock({order.product_id: -diff}, db)
+            order.quantity = order_in.quantity
+
+        if getattr(order_in, "status", None) is not None:
+            new_status = checked_status(order_in.status)
+
+            # Handle cancel logic: only the request that actually moves the
+            # order out of a restockable status gives the stock back
+            if new_status == "CANCELLED":
+                result = db.execute(cancel_order_stmt(order_id))
+                if result.rowcount == 1:
+                    _restore_order_stock(order, db.execute(order_allocations_stmt([order_id])).all(), db)
+                    stock_changed = True
+
+            order.status = new_status
+
         db.commit()
+        if stock_changed:
+            invalidate_product_cache(order.product_id)
         db.refresh(order)
         return order
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=f"Failed to update order: {str(e)}")
 
 
 def delete_order_service(order_id: int, db: Session):
-    order = db.get(Order, order_id)
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-
-    # Restore stock before deletion if status is either Created or Shipped
-    if(order.status == "CREATED" or order.status == "SHIPPED" ):
-        order.product.stock += order.quantity
-    else:
-        print("Stock will be restocked after returning")
+    order = found_order(db.get(Order, order_id))
 
     try:
-        db.delete(order)
+        # read before the delete, which takes the order's allocations with it
+        allocations = db.execute(order_allocations_stmt([order_id])).all()
+        result = db.execute(delete_order_stmt(order_id, order.status))
+        if result.rowcount != 1:
+            db.rollback()
+            raise modified_concurrently()
+        db.expunge(order)
+
+        restock = order.status in RESTOCKED_ON_DELETE
+        if restock:
+            _restore_order_stock(order, allocations, db)
+
         db.commit()
+        if restock:
+            invalidate_product_cache(order.product_id)
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=f"Failed to delete order: {str(e)}")
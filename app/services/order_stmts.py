@@ -0,0 +1,377 @@
+"""
+Statements and pure helpers shared by the sync (app.services.order) and
+async (app.services.aio.order) order services: they build SQL and plan or
+shape results, but never execute anything themselves.
+"""
+import csv
+import io
+import json
+from collections import defaultdict
+from enum import Enum
+
+from sqlalchemy import bindparam, func, select, update, delete
+from sqlalchemy.orm import joinedload
+from fastapi import HTTPException
+from app.models import Order
+from app.models import Product
+from app.models import StockLocation
+from app.pagination import keyset
+from app.schemas.order import (
+    OrderAllocationResponse,
+    OrderCreatedResponse,
+    OrderBatchLineResult,
+    OrderBatchResponse,
+    OrderBulkStatusUpdate,
+    OrderBulkStatusRejection,
+    OrderBulkStatusResponse
+)
+
+
+# Define allowed statuses
+class OrderStatusEnum(str, Enum):
+    CREATED = "CREATED"
+    SHIPPED = "SHIPPED"
+    DELIVERED = "DELIVERED"
+    CANCELLED = "CANCELLED"
+
+
+# Guarded UPDATE that takes reserve_quantity units of stock for a product.
+# The stock check and the decrement happen in one statement, so concurrent
+# workers can never oversell. Prebuilt for the hot single-order path; see
+# reserve_stock_params
+reserve_stock_stmt = (
+    update(Product)
+    .where(Product.id == bindparam("reserve_product_id"), Product.stock >= bindparam("reserve_quantity"))
+    .values(stock=Product.stock - bindparam("reserve_quantity"))
+    .execution_options(synchronize_session=False)
+)
+
+
+def reserve_stock_params(product_id: int, quantity: int) -> dict:
+    return {"reserve_product_id": product_id, "reserve_quantity": quantity}
+
+
+def found_order(order) -> Order:
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return order
+
+
+def checked_status(new_status: str) -> str:
+    # Normalize status to uppercase and validate against allowed statuses
+    new_status = new_status.upper()
+    if new_status not in OrderStatusEnum.__members__:
+        raise HTTPException(status_code=400, detail=f"Invalid status. Allowed: {list(OrderStatusEnum.__members__.keys())}")
+    return new_status
+
+
+# Deleting an order in one of these statuses gives its stock back;
+# delivered orders are restocked when they are returned
+RESTOCKED_ON_DELETE = ("CREATED", "SHIPPED")
+
+
+def modified_concurrently() -> HTTPException:
+    return HTTPException(status_code=409, detail="Order was modified concurrently, retry")
+
+
+def cancel_order_stmt(order_id: int):
+    """
+    Moves an order to CANCELLED only if it still holds stock, so only one
+    of several concurrent cancels restores it.
+    """
+    return (
+        update(Order)
+        .where(
+            Order.id == order_id,
+            Order.status.notin_(["CANCELLED", "DELIVERED"])
+        )
+        .values(status="CANCELLED")
+        .execution_options(synchronize_session=False)
+    )
+
+
+def delete_order_stmt(order_id: int, current_status):
+    """
+    Deletes an order guarded on the status we read, so a concurrent status
+    change cannot make us restore stock for an order that no longer holds it.
+    """
+    return (
+        delete(Order)
+        .where(Order.id == order_id, Order.status == current_status)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def plan_batch(lines, known_users: set, stock: dict, atomic: bool):
+    """
+    Work out which batch lines can be created from the looked-up users and
+    product stock. Returns (errors, requested, lines_by_product) where
+    `errors` maps line index -> reason, `requested` maps product id -> total
+    quantity to reserve and `lines_by_product` the accepted line indexes.
+    """
+    errors = {}
+    requested = defaultdict(int)
+    lines_by_product = defaultdict(list)
+    for index, line in enumerate(lines):
+        if line.quantity <= 0:
+            errors[index] = "Quantity must be positive"
+        elif line.user_id not in known_users:
+            errors[index] = "User not found"
+        elif line.product_id not in stock:
+            errors[index] = "Product not found"
+        elif atomic or requested[line.product_id] + line.quantity <= stock[line.product_id]:
+            requested[line.product_id] += line.quantity
+            lines_by_product[line.product_id].append(index)
+        else:
+            errors[index] = "Insufficient stock"
+
+    if atomic:
+        for product_id in [p for p, q in requested.items() if q > stock[p]]:
+            reject_batch_product(product_id, errors, requested, lines_by_product)
+    return errors, requested, lines_by_product
+
+
+def reject_batch_product(product_id: int, errors: dict, requested: dict, lines_by_product: dict):
+    for index in lines_by_product.pop(product_id):
+        errors[index] = "Insufficient stock"
+    del requested[product_id]
+
+
+def raise_batch_rejected(lines, errors: dict):
+    raise HTTPException(
+        status_code=400,
+        detail=[
+            {"index": index, "detail": errors[index]}
+            for index in range(len(lines)) if index in errors
+        ]
+    )
+
+
+def batch_rows(lines, lines_by_product: dict):
+    accepted = sorted(i for indexes in lines_by_product.values() for i in indexes)
+    rows = [
+        {
+            "user_id": lines[i].user_id,
+            "product_id": lines[i].product_id,
+            "quantity": lines[i].quantity,
+            "status": OrderStatusEnum.CREATED,
+        }
+        for i in accepted
+    ]
+    return accepted, rows
+
+
+def allocation_rows(accepted: list, order_ids: list, line_plans: dict):
+    return [
+        {"order_id": order_id, "location_id": location_id, "quantity": units}
+        for index, order_id in zip(accepted, order_ids)
+        for location_id, units in line_plans.get(index, ())
+    ]
+
+
+def batch_response(lines, errors: dict, accepted: list, order_ids: list, line_plans: dict) -> OrderBatchResponse:
+    results = [
+        OrderBatchLineResult(index=index, ok=False, detail=detail)
+        for index, detail in errors.items()
+    ]
+    for index, order_id in zip(accepted, order_ids):
+        allocations = [
+            OrderAllocationResponse(location_id=location_id, quantity=units)
+            for location_id, units in line_plans.get(index, ())
+        ]
+        results.append(OrderBatchLineResult(
+            index=index,
+            ok=True,
+            order=OrderCreatedResponse(id=order_id, status="CREATED", allocations=allocations, **lines[index].model_dump())
+        ))
+    results.sort(key=lambda r: r.index)
+    return OrderBatchResponse(created=len(order_ids), failed=len(errors), results=results)
+
+
+# ids per IN list; keeps every statement under SQLite's bound parameter limit
+BULK_STATUS_ID_CHUNK = 5000
+
+
+def id_chunks(ids):
+    ids = sorted(ids)
+    return (ids[i:i + BULK_STATUS_ID_CHUNK] for i in range(0, len(ids), BULK_STATUS_ID_CHUNK))
+
+
+def bulk_status_rounds(bulk_in: OrderBulkStatusUpdate):
+    """
+    Split a bulk transition into statement rounds of (ids, conditions):
+    one round per BULK_STATUS_ID_CHUNK ids, or a single round (ids None)
+    for a filter.
+    """
+    if (bulk_in.ids is None) == (bulk_in.filter is None):
+        raise HTTPException(status_code=400, detail="Pass either ids or filter")
+    if bulk_in.ids is not None:
+        return [(chunk, [Order.id.in_(chunk)]) for chunk in id_chunks(set(bulk_in.ids))]
+
+    conditions = []
+    if bulk_in.filter.user_id is not None:
+        conditions.append(Order.user_id == bulk_in.filter.user_id)
+    if bulk_in.filter.product_id is not None:
+        conditions.append(Order.product_id == bulk_in.filter.product_id)
+    if bulk_in.filter.status is not None:
+        conditions.append(Order.status == bulk_in.filter.status)
+    if not conditions:
+        raise HTTPException(status_code=400, detail="Filter needs at least one of user_id, product_id, status")
+    return [(None, conditions)]
+
+
+def bulk_cancel_stmt(conditions):
+    """
+    Set-based cancel_order_stmt: cancels the matching orders that still
+    hold stock and returns what each one gives back.
+    """
+    return (
+        update(Order)
+        .where(*conditions, Order.status.notin_(["CANCELLED", "DELIVERED"]))
+        .values(status="CANCELLED")
+        .returning(Order.id, Order.product_id, Order.quantity)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def bulk_set_status_stmt(conditions, new_status: str):
+    # a cancelled order has given its stock back, moving it on would ship
+    # units it no longer holds: bulk_rejected_stmt reports it instead
+    return (
+        update(Order)
+        .where(*conditions, Order.status != new_status, Order.status != "CANCELLED")
+        .values(status=new_status)
+        .returning(Order.id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def bulk_rejected_stmt(conditions):
+    # the matching orders bulk_set_status_stmt leaves alone because they
+    # are cancelled; only asked for a target other than CANCELLED
+    return select(Order.id).where(*conditions, Order.status == "CANCELLED")
+
+
+# executemany of relative stock increments, one parameter set per product
+restore_stock_many_stmt = (
+    update(Product.__table__)
+    .where(Product.__table__.c.id == bindparam("restore_product_id"))
+    .values(stock=Product.__table__.c.stock + bindparam("restore_quantity"))
+)
+
+
+# Units given back to products.stock by orders without allocations. When
+# such an order predates its product's locations, the product's stock is
+# now their sum, so the units also go to its lowest-id location; matches
+# nothing for other products. Same parameters as restore_stock_many_stmt
+_first_location = StockLocation.__table__.alias("first_location")
+restore_first_location_stmt = (
+    update(StockLocation.__table__)
+    .where(
+        StockLocation.__table__.c.product_id == bindparam("restore_product_id"),
+        StockLocation.__table__.c.location_id == (
+            select(func.min(_first_location.c.location_id))
+            .where(_first_location.c.product_id == bindparam("restore_product_id"))
+            .scalar_subquery()
+        )
+    )
+    .values(quantity=StockLocation.__table__.c.quantity + bindparam("restore_quantity"))
+)
+
+
+def restore_stock_params(restock: dict):
+    # product id order, so concurrent transactions lock rows in the same order
+    return [
+        {"restore_product_id": product_id, "restore_quantity": quantity}
+        for product_id, quantity in sorted(restock.items())
+    ]
+
+
+def bulk_restock(cancelled: dict, allocations):
+    """
+    Split what the cancelled orders ({order id: (product id, quantity)})
+    give back into products.stock increments per product and location
+    increments per (product, location), from the orders' allocation rows.
+    """
+    by_location = defaultdict(int)
+    for order_id, location_id, quantity in allocations:
+        by_location[(cancelled[order_id][0], location_id)] += quantity
+    allocated = {order_id for order_id, _, _ in allocations}
+    by_product = defaultdict(int)
+    for order_id, (product_id, quantity) in cancelled.items():
+        if order_id not in allocated:
+            by_product[product_id] += quantity
+    return by_product, by_location
+
+
+def bulk_status_response(updated: list, unchanged: list, missing: list, cancelled: list) -> OrderBulkStatusResponse:
+    rejected = [(order_id, "Order not found") for order_id in missing]
+    rejected += [(order_id, "Order is cancelled") for order_id in cancelled]
+    return OrderBulkStatusResponse(
+        updated=sorted(updated),
+        unchanged=sorted(unchanged),
+        rejected=[OrderBulkStatusRejection(id=order_id, detail=detail) for order_id, detail in sorted(rejected)]
+    )
+
+
+def list_orders_stmt(
+    user_id: int = None,
+    product_id: int = None,
+    order_status: str = None,
+    sort: str = "-id",
+    cursor: str = None,
+    limit: int = 10
+):
+    """
+    One page of orders, served by the (user_id|product_id|status, ..., id)
+    indexes. Products are joined into the same query, so a page costs one
+    statement whatever its size.
+    """
+    stmt = select(Order).options(joinedload(Order.product))
+    if user_id is not None:
+        stmt = stmt.where(Order.user_id == user_id)
+    if product_id is not None:
+        stmt = stmt.where(Order.product_id == product_id)
+    if order_status is not None:
+        stmt = stmt.where(Order.status == order_status)
+    return keyset(stmt, [Order.id], cursor, limit, descending=sort.startswith("-"))
+
+
+EXPORT_COLUMNS = ("id", "user_id", "product_id", "quantity", "status", "unit_price", "extended_value")
+
+
+def export_orders_stmt(order_status: str = None, after_id: int = None, until_id: int = None):
+    """
+    Orders in id order with their product's price and the line's extended
+    value (quantity * price). Orders keep no price of their own, so this is
+    the product's current price. Served by the primary key, or by
+    ix_orders_status_id when filtering on status.
+    """
+    stmt = (
+        select(
+            Order.id,
+            Order.user_id,
+            Order.product_id,
+            Order.quantity,
+            Order.status,
+            Product.price.label("unit_price"),
+            func.round(Order.quantity * Product.price, 2).label("extended_value")
+        )
+        .outerjoin(Product, Product.id == Order.product_id)
+        .order_by(Order.id)
+    )
+    if order_status is not None:
+        stmt = stmt.where(Order.status == order_status)
+    if after_id is not None:
+        stmt = stmt.where(Order.id > after_id)
+    if until_id is not None:
+        stmt = stmt.where(Order.id <= until_id)
+    return stmt
+
+
+def format_export_rows(rows, fmt: str) -> str:
+    if fmt == "csv":
+        out = io.StringIO()
+        csv.writer(out, lineterminator="\n").writerows(rows)
+        return out.getvalue()
+    return "".join(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in rows)
@@ -1,7 +1,63 @@
+import logging
+
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
+from app import config
+from app.cache import TTLCache, DBInvalidationChannel
+from app.db.session import engine
+from app.metrics import instrument_cache
 from app.models import Product
-from app.schemas.product import ProductCreate, ProductUpdate
+from app.models.product import products_fts
+from app.pagination import keyset, split_page
+from app.schemas.product import ProductCreate, ProductUpdate, ProductResponse
+from app.services.allocation import located_stmt
+
+logger = logging.getLogger(__name__)
+
+# Cached ProductResponse snapshots keyed by product id
+product_cache = TTLCache(
+    maxsize=config.PRODUCT_CACHE_SIZE,
+    ttl=config.PRODUCT_CACHE_TTL,
+    name="products"
+)
+instrument_cache(product_cache)
+product_cache_channel = (
+    DBInvalidationChannel(engine, product_cache, config.PRODUCT_CACHE_POLL_INTERVAL, key_type=int)
+    if config.PRODUCT_CACHE_INVALIDATION == "db" else None
+)
+
+
+def invalidate_product_cache(*product_ids: int):
+    """
+    Drop products from this worker's cache and, if configured, from the
+    other workers' caches. Call after the change is committed.
+    """
+    if not config.PRODUCT_CACHE_ENABLED or not product_ids:
+        return
+    product_cache.invalidate(*product_ids)
+    if product_cache_channel is not None:
+        try:
+            product_cache_channel.publish(product_ids)
+        except Exception:
+            # the write is already committed; other workers fall back to the TTL
+            logger.exception("Failed to publish product cache invalidation")
+
+
+def found_product(product) -> Product:
+    if not product:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found"
+        )
+    return product
+
+
+def product_failed(action: str, e: Exception) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Failed to {action} product: {str(e)}"
+    )
 
 
 def create_product_service(product_in: ProductCreate, db: Session) -> Product:
@@ -13,58 +69,155 @@ def create_product_service(product_in: ProductCreate, db: Session) -> Product:
         return product
     except Exception as e:
         db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Failed to create product: {str(e)}"
-        )
+        raise product_failed("create", e)
 
 
-def get_product_service(product_id: int, db: Session) -> Product:
-    product = db.get(Product, product_id)
-    if not product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Product not found"
-        )
-    return product
+def _load_product(product_id: int, db: Session) -> Product:
+    return found_product(db.get(Product, product_id))
+
+
+def get_product_service(product_id: int, db: Session) -> ProductResponse:
+    """
+    Read a product through the product cache. Concurrent misses for the
+    same id share one query.
+    """
+    if not config.PRODUCT_CACHE_ENABLED:
+        return _load_product(product_id, db)
+    if product_cache_channel is not None and product_cache_channel.poll_due():
+        product_cache_channel.poll()
+    return product_cache.get_or_load(
+        product_id,
+        lambda: ProductResponse.model_validate(_load_product(product_id, db))
+    )
+
+
+# sort field -> keyset columns, ending with the unique id
+PRODUCT_SORTS = {
+    "id": ("id",),
+    "name": ("name", "id"),
+    "price": ("price", "id"),
+}
+
+
+def _prefix_upper_bound(prefix: str):
+    """
+    Smallest string greater than every string starting with `prefix`.
+    name >= prefix AND name < bound is a plain range, which the name index
+    can serve (unlike LIKE 'x%', which SQLite only does so with
+    case_sensitive_like); tests/test_product_search.py checks the plan.
+    """
+    last = ord(prefix[-1])
+    if last >= 0x10FFFF:
+        return None
+    # the surrogates U+D800..U+DFFF are no characters, and cannot be encoded
+    following = 0xE000 if last == 0xD7FF else last + 1
+    return prefix[:-1] + chr(following)
+
+
+def _fts_match_query(text: str) -> str:
+    # quote every term so user input is never parsed as FTS5 syntax
+    return " ".join('"' + term.replace('"', '""') + '"' for term in text.split())
+
+
+def list_products_stmt(
+    dialect: str,
+    name_prefix: str = None,
+    q: str = None,
+    min_price: float = None,
+    max_price: float = None,
+    in_stock: bool = False,
+    sort: str = "id",
+    cursor: str = None,
+    limit: int = 10,
+    columns=None
+):
+    """
+    Build the listing query. Returns (stmt, key) where key gives the sort
+    key of a row for the next cursor. With `columns` it selects those
+    columns as plain rows instead of Product instances.
+    """
+    descending = sort.startswith("-")
+    fields = PRODUCT_SORTS[sort.lstrip("-")]
+
+    stmt = select(*columns) if columns else select(Product)
+    if name_prefix:
+        stmt = stmt.where(Product.name >= name_prefix)
+        upper = _prefix_upper_bound(name_prefix)
+        if upper is not None:
+            stmt = stmt.where(Product.name < upper)
+    if q and q.strip():
+        if dialect == "sqlite":
+            # IN (sorted rowid list) rather than a JOIN: products is then
+            # walked in id order and the ORDER BY needs no temp B-tree
+            stmt = stmt.where(Product.id.in_(
+                select(products_fts.c.rowid)
+                .where(products_fts.c.name.match(_fts_match_query(q)))
+            ))
+        else:
+            stmt = stmt.where(Product.name.ilike(f"%{q.strip()}%"))
+    if min_price is not None:
+        stmt = stmt.where(Product.price >= min_price)
+    if max_price is not None:
+        stmt = stmt.where(Product.price <= max_price)
+    if in_stock:
+        stmt = stmt.where(Product.stock > 0)
+
+    stmt = keyset(stmt, [getattr(Product, field) for field in fields], cursor, limit, descending)
+    return stmt, lambda product: tuple(getattr(product, field) for field in fields)
+
+
+def list_products_service(db: Session, limit: int = 10, columns=None, **filters):
+    """
+    Fetch a page of products matching `filters` (see list_products_stmt),
+    plus the cursor of the next page (None on the last one). With `columns`
+    the page holds read-only rows instead of tracked Product instances.
+    """
+    stmt, key = list_products_stmt(db.get_bind().dialect.name, limit=limit, columns=columns, **filters)
+    result = db.execute(stmt) if columns else db.scalars(stmt)
+    return split_page(result.all(), limit, key)
+
+
+# products.stock of a product kept per location is the sum of its locations
+LOCATED_STOCK_CONFLICT = (
+    "This product's stock is kept per location, "
+    "set it with PUT /locations/{location_id}/stock/{product_id}"
+)
+
+
+def changes_stock(product: Product, updates: dict) -> bool:
+    return updates.get("stock", product.stock) != product.stock
+
+
+def located_stock_conflict() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=LOCATED_STOCK_CONFLICT)
 
 
 def update_product_service(product_id: int, product_in: ProductUpdate, db: Session) -> Product:
-    product = db.get(Product, product_id)
-    if not product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Product not found"
-        )
+    product = found_product(db.get(Product, product_id))
 
-    for key, value in product_in.dict(exclude_unset=True).items():
+    updates = product_in.dict(exclude_unset=True)
+    if changes_stock(product, updates) and db.scalar(located_stmt(product_id)):
+        raise located_stock_conflict()
+
+    for key, value in updates.items():
         setattr(product, key, value)
 
     try:
         db.commit()
+        invalidate_product_cache(product_id)
         db.refresh(product)
         return product
     except Exception as e:
         db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Failed to update product: {str(e)}"
-        )
+        raise product_failed("update", e)
 
 
 def delete_product_service(product_id: int, db: Session):
-    product = db.get(Product, product_id)
-    if not product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Product not found"
-        )
+    product = found_product(db.get(Product, product_id))
     try:
         db.delete(product)
         db.commit()
+        invalidate_product_cache(product_id)
     except Exception as e:
         db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Failed to delete product: {str(e)}"
-        )
+        raise product_failed("delete", e)
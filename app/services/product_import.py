@@ -0,0 +1,350 @@
+import asyncio
+import codecs
+import csv
+import json
+
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from fastapi import HTTPException, status
+
+from app.models import Product, StockLocation
+from app.schemas.product import ProductCreate, ProductImportError, ProductImportResponse
+from app.services.product import LOCATED_STOCK_CONFLICT, invalidate_product_cache
+
+IMPORT_MAX_ERRORS = 1000
+# a longer line fails the import: the parser holds a line in memory until
+# its end arrives
+IMPORT_MAX_LINE_LENGTH = 64 * 1024
+
+
+def import_format(fmt: str = None, content_type: str = None) -> str:
+    """
+    The explicit ?format= wins, otherwise it is taken from Content-Type.
+    """
+    if fmt:
+        return fmt
+    content_type = (content_type or "").lower()
+    if "csv" in content_type:
+        return "csv"
+    if "ndjson" in content_type or "jsonl" in content_type or "json-seq" in content_type:
+        return "ndjson"
+    raise HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail="Send text/csv or application/x-ndjson, or pass ?format="
+    )
+
+
+def _parse_ndjson(numbered_lines):
+    """
+    Decode a batch of (line_number, line) in one json.loads call on a JSON
+    array; if the batch has a bad line, fall back to line by line.
+    """
+    try:
+        values = json.loads("[" + ",".join(line for _, line in numbered_lines) + "]")
+    except ValueError:
+        values = None
+    # a line like `{..},{..}` would add two values and shift the rest
+    if values is not None and len(values) == len(numbered_lines):
+        return [(line_no, value) for (line_no, _), value in zip(numbered_lines, values)]
+
+    records = []
+    for line_no, line in numbered_lines:
+        try:
+            records.append((line_no, json.loads(line)))
+        except ValueError:
+            records.append((line_no, None))
+    return records
+
+
+def _line_too_long(line_no: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Line {line_no} is longer than {IMPORT_MAX_LINE_LENGTH} characters"
+    )
+
+
+async def iter_import_records(chunks, fmt: str):
+    """
+    Parse an uploaded body incrementally, yielding one list of
+    (line_number, record) per network chunk. `chunks` is an async iterator
+    of bytes, e.g. request.stream(). Only the current chunk and the line
+    it ends in are held in memory, so CSV fields must not contain line
+    breaks; a line longer than IMPORT_MAX_LINE_LENGTH characters raises a
+    413.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    buffer = ""
+    line_no = 0
+    header = None
+
+    async def lines():
+        nonlocal buffer
+        read = 0
+        async for chunk in chunks:
+            buffer += decoder.decode(chunk)
+            *complete, buffer = buffer.split("\n")
+            if complete and max(map(len, complete)) > IMPORT_MAX_LINE_LENGTH:
+                too_long = next(n for n, line in enumerate(complete) if len(line) > IMPORT_MAX_LINE_LENGTH)
+                raise _line_too_long(read + too_long + 1)
+            if len(buffer) > IMPORT_MAX_LINE_LENGTH:
+                raise _line_too_long(read + len(complete) + 1)
+            if complete:
+                read += len(complete)
+                yield complete
+        tail = buffer + decoder.decode(b"", final=True)
+        if tail:
+            yield [tail]
+
+    async for batch in lines():
+        records = []
+        if fmt == "csv":
+            # the reader takes a trailing \r as the end of the line
+            for row in csv.reader(batch):
+                line_no += 1
+                if not row:
+                    continue
+                if header is None:
+                    header = [name.strip().lower() for name in row]
+                    continue
+                records.append((line_no, dict(zip(header, row))))
+        else:
+            numbered = [(line_no + n, line) for n, line in enumerate(batch, 1) if line.strip()]
+            line_no += len(batch)
+            records = _parse_ndjson(numbered)
+        if records:
+            yield records
+
+
+def _validate_record(record):
+    """
+    Return (id, name, price, stock) for one record, or raise ValueError. An
+    `id` column is optional; rows with an id upsert that product.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("Malformed record")
+    product_id = record.get("id")
+    if product_id in (None, ""):
+        product_id = None
+    else:
+        try:
+            product_id = int(product_id)
+        except (TypeError, ValueError):
+            raise ValueError("id must be a positive integer")
+        if product_id < 1:
+            raise ValueError("id must be a positive integer")
+    try:
+        product = ProductCreate.model_validate(record)
+    except ValidationError as e:
+        raise ValueError("; ".join(
+            f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()
+        ))
+    return product_id, product.name, product.price, product.stock
+
+
+class ImportReport:
+    """
+    Running totals of an import; keeps at most IMPORT_MAX_ERRORS errors.
+    """
+
+    def __init__(self):
+        self.received = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, line: int, detail: str):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append(ProductImportError(line=line, detail=detail))
+
+    def response(self) -> ProductImportResponse:
+        return ProductImportResponse(
+            received=self.received,
+            imported=self.imported,
+            failed=self.failed,
+            # row-by-row retries report after later chunks were parsed
+            errors=sorted(self.errors, key=lambda error: error.line),
+            errors_truncated=self.failed > len(self.errors)
+        )
+
+
+def upsert_stmt(dialect: str):
+    if dialect == "sqlite":
+        stmt = sqlite.insert(Product.__table__)
+    elif dialect == "postgresql":
+        stmt = postgresql.insert(Product.__table__)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Importing rows with an id is not supported on {dialect}"
+        )
+    return stmt.on_conflict_do_update(
+        index_elements=[Product.__table__.c.id],
+        set_={
+            "name": stmt.excluded.name,
+            "price": stmt.excluded.price,
+            "stock": stmt.excluded.stock,
+        }
+    )
+
+
+IMPORT_COLUMNS = ("id", "name", "price", "stock")
+
+
+class ImportRejected(Exception):
+    """
+    A chunk the service refuses to write; like a database error, the
+    chunk is then written row by row and the message goes to each line
+    that still fails.
+    """
+
+
+def located_stock_stmt(upserts):
+    # products in the chunk's id range whose stock is kept per location
+    ids = [row["id"] for row in upserts]
+    return (
+        select(Product.id, Product.stock)
+        .where(
+            Product.id.between(min(ids), max(ids)),
+            select(StockLocation.product_id).where(StockLocation.product_id == Product.id).exists()
+        )
+    )
+
+
+def check_located_stock(located, upserts) -> None:
+    """
+    Refuse upserts that would change the stock of a product kept per
+    location; that stock is the sum of its locations.
+    """
+    stock = dict(located)
+    if any(row["id"] in stock and row["stock"] != stock[row["id"]] for row in upserts):
+        raise ImportRejected(LOCATED_STOCK_CONFLICT)
+
+
+def split_chunk(rows):
+    """
+    Split validated rows into plain inserts, as (name, price, stock) tuples,
+    and upserts, as column dicts.
+    """
+    inserts = [row[1:] for row in rows if row[0] is None]
+    upserts = [dict(zip(IMPORT_COLUMNS, row)) for row in rows if row[0] is not None]
+    return inserts, upserts
+
+
+# Bulk load without the per-row FTS trigger, which costs several times the
+# insert itself: pause it, insert, then index every new row in one statement.
+# All inside the chunk's write transaction, so no other insert can slip into
+# the paused window and nobody else ever sees the trigger paused.
+PAUSE_FTS = text("INSERT INTO products_fts_paused (id) VALUES (1)")
+RESUME_FTS = text("DELETE FROM products_fts_paused")
+INDEX_NEW_PRODUCTS = text(
+    "INSERT INTO products_fts(rowid, name) SELECT id, name FROM products WHERE id > :last_id"
+)
+LAST_PRODUCT_ID = select(func.coalesce(func.max(Product.id), 0))
+# plain tuples straight to the driver's executemany; the generic insert()
+# path costs about as much per row as SQLite itself
+INSERT_PRODUCTS_SQL = "INSERT INTO products (name, price, stock) VALUES (?, ?, ?)"
+
+
+def _write_chunk(rows, db: Session) -> None:
+    inserts, upserts = split_chunk(rows)
+    try:
+        if inserts and db.get_bind().dialect.name == "sqlite":
+            db.execute(PAUSE_FTS.execution_options(db_write=True))
+            # new rows get ids above the current maximum (no AUTOINCREMENT)
+            last_id = db.execute(LAST_PRODUCT_ID).scalar_one()
+            db.connection().exec_driver_sql(INSERT_PRODUCTS_SQL, inserts)
+            db.execute(INDEX_NEW_PRODUCTS, {"last_id": last_id})
+            db.execute(RESUME_FTS)
+        elif inserts:
+            db.execute(insert(Product.__table__), [dict(zip(IMPORT_COLUMNS[1:], row)) for row in inserts])
+        if upserts:
+            check_located_stock(db.execute(located_stock_stmt(upserts)).all(), upserts)
+            db.execute(upsert_stmt(db.get_bind().dialect.name), upserts)
+        db.commit()
+    except (SQLAlchemyError, ImportRejected):
+        db.rollback()
+        raise
+    invalidate_product_cache(*(row["id"] for row in upserts))
+
+
+def _db_error(e: SQLAlchemyError) -> str:
+    # the driver's message (e.g. the failed constraint), not the statement
+    orig = getattr(e, "orig", None)
+    return f"{e.__class__.__name__}: {orig}" if orig is not None else e.__class__.__name__
+
+
+async def import_products(chunks, fmt: str, write_chunk, chunk_size: int = 20000) -> ProductImportResponse:
+    """
+    Stream records from `chunks`, validate them against ProductCreate and
+    hand them to `write_chunk(rows)` (a coroutine) chunk_size at a time.
+    Each chunk is its own transaction; a chunk the database rejects is
+    written again one row per transaction, so only the offending lines
+    fail and the import carries on. A chunk is written while the next one
+    is parsed, at most one write in flight. An HTTPException from the
+    parser (a line too long) ends the import; the chunks written before
+    it stay imported.
+    """
+    report = ImportReport()
+    lines, rows = [], []
+    writing = None  # (task, lines, rows) of the chunk in flight
+
+    async def write_rows(chunk_lines, chunk_rows):
+        for line, row in zip(chunk_lines, chunk_rows):
+            try:
+                await write_chunk([row])
+                report.imported += 1
+            except SQLAlchemyError as e:
+                report.error(line, f"Rejected by the database: {_db_error(e)}")
+            except ImportRejected as e:
+                report.error(line, str(e))
+
+    async def finish_write():
+        nonlocal writing
+        if writing is None:
+            return
+        task, chunk_lines, chunk_rows = writing
+        writing = None
+        try:
+            await task
+            report.imported += len(chunk_lines)
+        except (SQLAlchemyError, ImportRejected):
+            await write_rows(chunk_lines, chunk_rows)
+
+    async def flush():
+        nonlocal writing, lines, rows
+        await finish_write()
+        writing = (asyncio.ensure_future(write_chunk(rows)), lines, rows)
+        lines, rows = [], []
+
+    try:
+        async for records in iter_import_records(chunks, fmt):
+            report.received += len(records)
+            for line_no, record in records:
+                try:
+                    row = _validate_record(record)
+                except ValueError as e:
+                    report.error(line_no, str(e))
+                    continue
+                lines.append(line_no)
+                rows.append(row)
+            if len(rows) >= chunk_size:
+                await flush()
+        if rows:
+            await flush()
+    finally:
+        # never leave a write running on the session after we return
+        await finish_write()
+    return report.response()
+
+
+async def import_products_service(chunks, fmt: str, db: Session, chunk_size: int = 20000) -> ProductImportResponse:
+    async def write_chunk(rows):
+        # the sync Session runs in the threadpool, off the event loop
+        await run_in_threadpool(_write_chunk, rows, db)
+
+    return await import_products(chunks, fmt, write_chunk, chunk_size)
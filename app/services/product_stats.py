@@ -0,0 +1,156 @@
+"""
+Per-product sales aggregates. product_stats is kept in step with orders by
+triggers (see app/db/init_db.py), so a product's summary is one primary
+key lookup however many orders there are. Without the triggers (dialects
+other than SQLite) the summary is aggregated from the product's orders.
+
+Recompute the table from scratch and check it against orders:
+    python -m app.services.product_stats --batch-size 1000
+    python -m app.services.product_stats --verify-only
+"""
+import argparse
+import sys
+import time
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from app.models import Product, ProductStats
+from app.models.product_stats import STATS_COLUMNS, product_stats_aggregate, product_stats_source
+from app.schemas.product import OrderStatusStats, ProductStatsResponse
+
+STATS_FIELDS = [column for _, orders, units in STATS_COLUMNS for column in (orders, units)]
+
+
+def product_stats_stmt(product_id: int, dialect: str):
+    stats = product_stats_source(dialect, product_id - 1, product_id)
+    # outer join: a product nobody ordered has no stats row yet
+    return (
+        select(Product.price, *(stats.c[column.key] for column in STATS_FIELDS))
+        .outerjoin(stats, stats.c.product_id == Product.id)
+        .where(Product.id == product_id)
+    )
+
+
+def product_stats_response(product_id: int, row) -> ProductStatsResponse:
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found"
+        )
+    by_status = {
+        name: OrderStatusStats(orders=getattr(row, orders.key) or 0, units=getattr(row, units.key) or 0)
+        for name, orders, units in STATS_COLUMNS
+    }
+    units_ordered = sum(stats.units for stats in by_status.values())
+    return ProductStatsResponse(
+        product_id=product_id,
+        orders=sum(stats.orders for stats in by_status.values()),
+        units_ordered=units_ordered,
+        by_status=by_status,
+        revenue=round((units_ordered - by_status["CANCELLED"].units) * row.price, 2),
+        delivered_revenue=round(by_status["DELIVERED"].units * row.price, 2)
+    )
+
+
+def get_product_stats_service(product_id: int, db: Session) -> ProductStatsResponse:
+    stmt = product_stats_stmt(product_id, db.get_bind().dialect.name)
+    return product_stats_response(product_id, db.execute(stmt).first())
+
+
+def _in_range(column, after: int, until: int):
+    conditions = [column <= until]
+    if after is not None:
+        conditions.append(column > after)
+    return conditions
+
+
+def _product_batches(db: Session, batch_size: int):
+    """
+    (after, until) product id ranges of batch_size products each; after is
+    None for the first one.
+    """
+    after = None
+    while True:
+        stmt = select(Product.id).order_by(Product.id).limit(batch_size)
+        if after is not None:
+            stmt = stmt.where(Product.id > after)
+        ids = db.scalars(stmt).all()
+        if not ids:
+            return
+        yield after, ids[-1]
+        after = ids[-1]
+
+
+def rebuild_product_stats(db: Session, batch_size: int = 1000) -> int:
+    """
+    Recompute product_stats from orders, batch_size products per
+    transaction. Each batch deletes its rows first, which takes the write
+    lock, so no order write can land between its read and its insert; the
+    triggers keep the batches already done current. Returns the number of
+    rows written.
+    """
+    aggregate_columns = list(product_stats_aggregate().selected_columns.keys())
+    written = 0
+    for after, until in _product_batches(db, batch_size):
+        try:
+            db.execute(delete(ProductStats).where(*_in_range(ProductStats.product_id, after, until)))
+            written += db.execute(
+                insert(ProductStats).from_select(aggregate_columns, product_stats_aggregate(after, until))
+            ).rowcount
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+    return written
+
+
+def verify_product_stats(db: Session, batch_size: int = 1000) -> list:
+    """
+    Ids of the products whose stored stats differ from a recount of their
+    orders. Each batch is compared in a single statement, so it sees one
+    consistent snapshot while orders keep changing.
+    """
+    mismatched = []
+    for after, until in _product_batches(db, batch_size):
+        recount = product_stats_aggregate(after, until).subquery()
+        stmt = (
+            select(Product.id)
+            .outerjoin(ProductStats, ProductStats.product_id == Product.id)
+            .outerjoin(recount, recount.c.product_id == Product.id)
+            .where(*_in_range(Product.id, after, until))
+            .where(or_(*(
+                func.coalesce(column, 0) != func.coalesce(recount.c[column.key], 0)
+                for column in STATS_FIELDS
+            )))
+        )
+        mismatched += db.scalars(stmt).all()
+    return mismatched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild and verify the product_stats table")
+    parser.add_argument("--batch-size", type=int, default=1000, help="products per transaction")
+    parser.add_argument("--verify-only", action="store_true")
+    args = parser.parse_args()
+
+    from app.db.init_db import ensure_schema
+    from app.db.session import SessionLocal, engine
+
+    ensure_schema(engine)
+    with SessionLocal() as db:
+        if not args.verify_only:
+            started = time.perf_counter()
+            written = rebuild_product_stats(db, args.batch_size)
+            print(f"rebuilt {written} product_stats rows in {time.perf_counter() - started:.2f}s")
+        started = time.perf_counter()
+        mismatched = verify_product_stats(db, args.batch_size)
+    print(f"verified in {time.perf_counter() - started:.2f}s: {len(mismatched)} products differ from their orders")
+    if mismatched:
+        print("first mismatches:", mismatched[:20])
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,16 @@
+import json
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from app.db.session import SessionLocal
 from app.models import User
-from app.utils import get_password_hash
+from app.pagination import keyset, split_page
+from app.utils import aget_password_hash
 from app.schemas.user import UserCreate
 
-def create_user_service(user_in: UserCreate, db: Session) -> User:
-    hashed_password = get_password_hash(user_in.password)
-
-    user = User(
-        username=user_in.username,
-        email=user_in.email,
-        password=hashed_password
-    )
+def _insert_user(user: User, db: Session) -> User:
     db.add(user)
     try:
         db.commit()
@@ -21,6 +20,19 @@ def create_user_service(user_in: UserCreate, db: Session) -> User:
         raise HTTPException(status_code=400, detail="User creation failed")
     return user
 
+async def new_user(user_in: UserCreate) -> User:
+    # bcrypt is awaited from its own pool, off the event loop
+    return User(
+        username=user_in.username,
+        email=user_in.email,
+        password=await aget_password_hash(user_in.password)
+    )
+
+
+async def create_user_service(user_in: UserCreate, db: Session) -> User:
+    # only the insert takes a threadpool thread
+    return await run_in_threadpool(_insert_user, await new_user(user_in), db)
+
 def get_user_details_service(user_id: int, db: Session) -> User:
     """
     Fetch a user by ID from the database.
@@ -44,6 +56,19 @@ from app.models.user import User
 from app.schemas.user import UserUpdate
 
 
+def apply_user_update(user: User, user_in: UserUpdate) -> None:
+    update_data = user_in.dict(exclude_unset=True)
+
+    if not update_data:
+        raise HTTPException(
+            status_code=400,
+            detail="No fields provided for update"
+        )
+
+    for key, value in update_data.items():
+        setattr(user, key, value)
+
+
 def update_user_service(
     user_id: int,
     user_in: UserUpdate,
@@ -58,17 +83,7 @@ def update_user_service(
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        update_data = user_in.dict(exclude_unset=True)
-
-        if not update_data:
-            raise HTTPException(
-                status_code=400,
-                detail="No fields provided for update"
-            )
-
-        for key, value in update_data.items():
-            setattr(user, key, value)
-
+        apply_user_update(user, user_in)
         db.commit()
         db.refresh(user)
         return user
@@ -105,24 +120,52 @@ def delete_user_service(user_id: int, db: Session) -> None:
             detail="Failed to delete user"
         )
 
+def list_users_stmt(skip: int = 0, limit: int = 10, cursor: str = None, columns=None):
+    stmt = keyset(select(*columns) if columns else select(User), [User.id], cursor, limit)
+    if skip:
+        stmt = stmt.offset(skip)
+    return stmt
+
+
 def get_all_users_service(
     db: Session,
     skip: int = 0,
-    limit: int = 10
+    limit: int = 10,
+    cursor: str = None,
+    columns=None
 ):
     """
-    Fetch paginated list of users.
+    Fetch a page of users ordered by id, plus the cursor of the next page
+    (None on the last one). Pass `cursor` to continue after a previous
+    page; `skip` is still honoured for offset paging. With `columns` the
+    page holds read-only rows instead of tracked User instances.
     """
     try:
-        users = (
-            db.query(User)
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
-        return users
+        stmt = list_users_stmt(skip, limit, cursor, columns)
+        return split_page((db.execute(stmt) if columns else db.scalars(stmt)).all(), limit)
     except SQLAlchemyError:
         raise HTTPException(
             status_code=500,
             detail="Failed to fetch users"
-        )
\ No newline at end of file
+        )
+
+
+def export_users_stmt(chunk_size: int):
+    return select(User.id, User.username, User.email).order_by(User.id).execution_options(yield_per=chunk_size)
+
+
+def format_user_rows(rows) -> str:
+    return "".join(
+        json.dumps({"id": row.id, "username": row.username, "email": row.email}) + "\n"
+        for row in rows
+    )
+
+
+def export_users_service(chunk_size: int = 1000):
+    """
+    Yield every user as NDJSON, chunk_size rows per chunk.
+    Uses its own session since the response outlives the request's.
+    """
+    with SessionLocal(for_reading=True) as db:
+        for rows in db.execute(export_users_stmt(chunk_size)).partitions():
+            yield format_user_rows(rows)
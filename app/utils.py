@@ -1,20 +1,35 @@
-import os
+import time
+import asyncio
+import hashlib
+import threading
 import bcrypt
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from jose import jwt
+from fastapi import HTTPException, status
+from jose import jwt, jwk, JWTError
 from typing import Optional, Dict, Any
-from dotenv import load_dotenv
 
+from app import config
+from app.cache import TTLCache
+from app.metrics import instrument_cache
 
 
-# Load environment variables from .env
-load_dotenv()
+JWT_SECRET_KEY = config.JWT_SECRET_KEY
+JWT_ALGORITHM = config.JWT_ALGORITHM
+JWT_ACCESS_TOKEN_EXPIRE_MINUTES = config.JWT_ACCESS_TOKEN_EXPIRE_MINUTES
 
-JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
-JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
-JWT_ACCESS_TOKEN_EXPIRE_MINUTES = int(
-    os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", 30)
+# Signing key and allowed algorithms, prepared once instead of on every call
+JWT_SIGNING_KEY = jwk.construct(JWT_SECRET_KEY, JWT_ALGORITHM) if JWT_SECRET_KEY else None
+JWT_ALGORITHMS = [JWT_ALGORITHM]
+
+# Decoded payloads of already verified tokens, keyed by token digest.
+# Entries expire at the token's own `exp` claim.
+token_cache = TTLCache(
+    maxsize=config.JWT_CACHE_SIZE,
+    ttl=config.JWT_CACHE_TTL,
+    name="jwt"
 )
+instrument_cache(token_cache)
 
 def create_access_token(
     data: Dict[str, Any],
@@ -45,7 +60,7 @@ def create_access_token(
     })
     encoded_jwt = jwt.encode(
         to_encode,
-        JWT_SECRET_KEY,
+        JWT_SIGNING_KEY,
         algorithm=JWT_ALGORITHM
     )
     return encoded_jwt
@@ -58,9 +73,14 @@ def verify_jwt_token(token: str) -> Dict[str, Any]:
     if not JWT_SECRET_KEY:
         raise RuntimeError("JWT_SECRET_KEY is not set in environment variables")
 
+    if config.JWT_CACHE_ENABLED:
+        cache_key = hashlib.sha256(token.encode()).digest()
+        payload = token_cache.get(cache_key)
+        if payload is not None:
+            return dict(payload)
+
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        return payload
+        payload = jwt.decode(token, JWT_SIGNING_KEY, algorithms=JWT_ALGORITHMS)
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -68,11 +88,77 @@ def verify_jwt_token(token: str) -> Dict[str, Any]:
             headers={"WWW-Authenticate": "Bearer"}
         )
 
-def get_password_hash(password: str) -> str:
+    if config.JWT_CACHE_ENABLED:
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            # expire the entry together with the token
+            token_cache.set(cache_key, payload, expires_at=time.monotonic() + (exp - time.time()))
+        else:
+            token_cache.set(cache_key, payload)
+        payload = dict(payload)
+    return payload
+
+# bcrypt releases the GIL, so a small dedicated thread pool hashes in
+# parallel without holding the request threadpool or the event loop
+_hash_executor = ThreadPoolExecutor(
+    max_workers=config.BCRYPT_POOL_SIZE,
+    thread_name_prefix="bcrypt"
+)
+_hash_slots = threading.BoundedSemaphore(
+    config.BCRYPT_POOL_SIZE + config.BCRYPT_QUEUE_LIMIT
+)
+
+
+def _submit_hash_job(fn, *args) -> Future:
+    """
+    Queue a bcrypt job, or raise 503 when the hashing queue is full.
+    """
+    if not _hash_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Password hashing is busy, retry shortly",
+            headers={"Retry-After": "1"}
+        )
+    try:
+        future = _hash_executor.submit(fn, *args)
+    except BaseException:
+        _hash_slots.release()
+        raise
+    future.add_done_callback(lambda _: _hash_slots.release())
+    return future
+
+
+def _hash_password(password: str) -> str:
     # Generate a salt and hash the password
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=config.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+
+def _check_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+
+def get_password_hash(password: str) -> str:
+    return _submit_hash_job(_hash_password, password).result()
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return _submit_hash_job(_check_password, plain_password, hashed_password).result()
+
+async def aget_password_hash(password: str) -> str:
+    return await asyncio.wrap_future(_submit_hash_job(_hash_password, password))
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    return await asyncio.wrap_future(
+        _submit_hash_job(_check_password, plain_password, hashed_password)
+    )
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    True when the hash was made with a cost other than BCRYPT_ROUNDS.
+    """
+    try:
+        # $2b$<cost>$<salt+hash>
+        return int(hashed_password.split("$")[2]) != config.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
@@ -0,0 +1,165 @@
+"""
+Tail latency at twice capacity, with and without admission control.
+
+First measures capacity: throughput of GET /products/{id} (product cache
+off, so every request reads the database) with a few clients in a closed
+loop. Then, for each scenario in its own interpreter, requests arrive in
+an open loop at --overload times that rate for --seconds while GET / is
+probed every 50ms. Without admission control the backlog grows for as
+long as the overload lasts and every request, the health check included,
+waits behind it. With it, requests past the latency budget are shed with
+a 503 and the ones served stay within budget plus service time. The
+per-user scenario splits the load 90/10 between two users, with a rate
+limit of half the capacity per user: the heavy user gets 429s and the
+light one is still served.
+
+Requests still unanswered --drain seconds after the last arrival are
+reported as unfinished; in sync mode, without admission control the
+threadpool can starve waiting for connections and never answer them.
+
+Usage:
+    python -m benchmarks.admission --seconds 5 --overload 2
+    DB_MODE=async python -m benchmarks.admission
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from benchmarks.common import asgi_request, load_app, percentile, summarize, use_temp_database
+
+PRODUCTS = 1000
+SCENARIOS = {
+    "capacity": {"ADMISSION_ENABLED": "false"},
+    "no admission": {"ADMISSION_ENABLED": "false"},
+    "admission": {"ADMISSION_ENABLED": "true", "ADMISSION_USER_RATE": "0"},
+    "per-user": {"ADMISSION_ENABLED": "true"},
+}
+
+
+def child(scenario: str, rate: float, seconds: float, drain: float):
+    use_temp_database()
+    os.environ["PRODUCT_CACHE_ENABLED"] = "false"
+    app = load_app()
+    from app.db.session import SessionLocal
+    from app.models import Product
+    from app.utils import create_access_token
+
+    with SessionLocal() as db:
+        db.add_all(Product(id=i, name=f"product-{i}", price=1.0, stock=100) for i in range(1, PRODUCTS + 1))
+        db.commit()
+    users = {sub: {"Authorization": f"Bearer {create_access_token({'sub': sub})}"} for sub in ("heavy", "light")}
+
+    async def get_product(headers):
+        started = time.perf_counter()
+        status, _, _ = await asgi_request(app, "GET", f"/products/{random.randint(1, PRODUCTS)}", headers=headers)
+        return status, time.perf_counter() - started
+
+    async def capacity():
+        # warm up, then count what a few clients in a closed loop get through
+        for _ in range(200):
+            await get_product(users["heavy"])
+        done = 0
+        deadline = time.perf_counter() + seconds
+
+        async def client():
+            nonlocal done
+            while time.perf_counter() < deadline:
+                await get_product(users["heavy"])
+                done += 1
+
+        await asyncio.gather(*(client() for _ in range(4)))
+        return {"rps": done / seconds}
+
+    async def overload():
+        probes = []
+        stop = asyncio.Event()
+
+        async def probe():
+            while not stop.is_set():
+                started = time.perf_counter()
+                await asgi_request(app, "GET", "/")
+                probes.append(time.perf_counter() - started)
+                await asyncio.sleep(0.05)
+
+        prober = asyncio.create_task(probe())
+        tasks = {"heavy": [], "light": []}
+        started = time.perf_counter()
+        total = int(rate * seconds)
+        for n in range(total):
+            delay = started + n / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            user = "light" if n % 10 == 0 else "heavy"
+            tasks[user].append(asyncio.create_task(get_product(users[user])))
+        everything = tasks["heavy"] + tasks["light"]
+        await asyncio.wait(everything, timeout=drain)
+        stop.set()
+        await asyncio.wait([prober], timeout=drain)
+
+        result = {"health_p99_ms": round(percentile(probes, 99) * 1000, 3)}
+        for user, started_tasks in tasks.items():
+            finished = [task.result() for task in started_tasks if task.done()]
+            served = [seconds for status, seconds in finished if status == 200]
+            result[user] = {
+                "sent": len(started_tasks),
+                "served": len(served),
+                "503": sum(1 for status, _ in finished if status == 503),
+                "429": sum(1 for status, _ in finished if status == 429),
+                "unfinished": len(started_tasks) - len(finished),
+                "p50_ms": summarize(served, 1)["p50_ms"],
+                "p99_ms": summarize(served, 1)["p99_ms"],
+            }
+        # what is left hangs in the threadpool; do not wait on it at exit
+        print(json.dumps(result), flush=True)
+        os._exit(0)
+
+    print(json.dumps(asyncio.run(capacity() if scenario == "capacity" else overload())), flush=True)
+
+
+def run_child(scenario: str, rate: float, seconds: float, drain: float) -> dict:
+    env = {**os.environ, **SCENARIOS[scenario]}
+    if scenario == "per-user":
+        # each user may take half the capacity
+        env["ADMISSION_USER_RATE"] = str(rate / 4)
+        env["ADMISSION_USER_BURST"] = str(max(1, int(rate / 40)))
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.admission", "--child", scenario,
+         "--rate", str(rate), "--seconds", str(seconds), "--drain", str(drain)],
+        env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--overload", type=float, default=2)
+    parser.add_argument("--drain", type=float, default=30)
+    parser.add_argument("--child")
+    parser.add_argument("--rate", type=float)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.rate, args.seconds, args.drain)
+        return
+
+    capacity = run_child("capacity", 0, args.seconds, args.drain)["rps"]
+    rate = capacity * args.overload
+    print(f"capacity {capacity:.0f} req/s, offering {rate:.0f} req/s for {args.seconds:g}s")
+    print(f"{'scenario':13} {'user':6} {'sent':>6} {'served':>7} {'503':>6} {'429':>6} {'unfin':>6} "
+          f"{'p50 ms':>8} {'p99 ms':>9} {'GET / p99':>10}")
+    for scenario in ("no admission", "admission", "per-user"):
+        result = run_child(scenario, rate, args.seconds, args.drain)
+        for user in ("heavy", "light"):
+            r = result[user]
+            print(f"{scenario:13} {user:6} {r['sent']:6} {r['served']:7} {r['503']:6} {r['429']:6} "
+                  f"{r['unfinished']:6} {r['p50_ms']:8.1f} {r['p99_ms']:9.1f} {result['health_p99_ms']:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+/analytics/* against a naive ORM loop over the same orders.
+
+Loads --orders orders spread over the last --span days and --products
+products, then for each window in --windows computes top products, daily
+volume and status mix:
+  - vectorized: the analytics service's single columnar pass (cache cold)
+  - cached:     the three endpoints over HTTP once the window is cached
+  - naive ORM:  Order objects with their product, accumulated row by row
+and checks that both give the same numbers. All-time top products and
+status mix come from product_stats and are timed too.
+
+Usage:
+    python -m benchmarks.analytics --orders 5000000 --windows 30,365
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from collections import defaultdict
+
+from benchmarks.common import asgi_request, load_app, use_temp_database
+
+STATUSES = ["CREATED", "SHIPPED", "DELIVERED", "CANCELLED"]
+LOAD_CHUNK = 100_000
+
+
+def naive_orm(db, days: int):
+    """
+    The row-by-row version: every order as an ORM object with its product.
+    yield_per keeps 5M objects from being held at once.
+    """
+    from sqlalchemy import select
+    from sqlalchemy.orm import joinedload
+    from app.models import Order
+    from app.services.analytics import DAY, window_start
+
+    start = window_start(days)
+    revenue, units = defaultdict(float), defaultdict(int)
+    daily = defaultdict(lambda: [0, 0, 0.0])
+    mix = defaultdict(lambda: [0, 0])
+    stmt = select(Order).where(Order.created_at >= start).options(joinedload(Order.product)).execution_options(yield_per=10_000)
+    for order in db.scalars(stmt):
+        status = order.status.value
+        day = daily[int((order.created_at - start) // DAY)]
+        day[0] += 1
+        day[1] += order.quantity
+        mix[status][0] += 1
+        mix[status][1] += order.quantity
+        if status != "CANCELLED":
+            value = order.quantity * order.product.price
+            revenue[order.product_id] += value
+            units[order.product_id] += order.quantity
+            day[2] += value
+    top = sorted(revenue, key=revenue.get, reverse=True)[:10]
+    return top, daily, mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--orders", type=int, default=5_000_000)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--span", type=int, default=365)
+    parser.add_argument("--windows", default="30,365")
+    args = parser.parse_args()
+    windows = [int(days) for days in args.windows.split(",")]
+
+    use_temp_database()
+    os.environ["SLOW_QUERY_MS"] = "0"
+    app = load_app()
+    from sqlalchemy import insert
+    from app.db.init_db import PRODUCT_STATS_DDL
+    from app.db.session import SessionLocal, engine
+    from app.models import Order, Product, User
+    from app.services import analytics
+    from app.services.product_stats import rebuild_product_stats
+    from app.utils import create_access_token
+
+    with SessionLocal() as db:
+        db.add(User(id=1, username="bench", email="bench@example.com", password="x"))
+        db.add_all(
+            Product(id=i, name=f"product-{i}", price=round(random.uniform(1, 100), 2), stock=100)
+            for i in range(1, args.products + 1)
+        )
+        db.commit()
+
+    # load without the per-row product_stats triggers, then rebuild it once
+    started = time.perf_counter()
+    now = time.time()
+    with engine.begin() as conn:
+        for name in ("orders_stats_ai", "orders_stats_ad", "orders_stats_au"):
+            conn.exec_driver_sql(f"DROP TRIGGER {name}")
+        for offset in range(0, args.orders, LOAD_CHUNK):
+            conn.execute(insert(Order), [
+                {"user_id": 1, "product_id": random.randint(1, args.products), "quantity": random.randint(1, 5),
+                 "status": random.choice(STATUSES), "created_at": now - random.random() * args.span * 86400}
+                for _ in range(min(LOAD_CHUNK, args.orders - offset))
+            ])
+        for ddl in PRODUCT_STATS_DDL:
+            conn.exec_driver_sql(ddl)
+    with SessionLocal() as db:
+        rebuild_product_stats(db)
+    print(f"loaded {args.orders} orders in {time.perf_counter() - started:.0f}s")
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': '1'})}"}
+    paths = ["/analytics/top-products?days={}", "/analytics/daily-volume?days={}", "/analytics/status-mix?days={}"]
+
+    async def cached(days: int) -> float:
+        for path in paths:
+            await asgi_request(app, "GET", path.format(days), headers=headers)
+        started = time.perf_counter()
+        for _ in range(100):
+            for path in paths:
+                await asgi_request(app, "GET", path.format(days), headers=headers)
+        return (time.perf_counter() - started) / 300
+
+    print(f"{'window':>7} {'orders':>9} {'vectorized':>11} {'cached':>9} {'naive ORM':>10} {'speedup':>8}  match")
+    for days in windows:
+        analytics.analytics_cache.clear()
+        with SessionLocal() as db:
+            started = time.perf_counter()
+            window = analytics.order_window(days, db)
+            vectorized = time.perf_counter() - started
+            top = analytics.top_products_service(db, days=days)
+            daily = analytics.daily_volume_service(db, days=days)
+            mix = analytics.status_mix_service(db, days=days)
+        hit = asyncio.run(cached(days))
+
+        with SessionLocal() as db:
+            started = time.perf_counter()
+            naive_top, naive_daily, naive_mix = naive_orm(db, days)
+            naive = time.perf_counter() - started
+        match = (
+            [row.product_id for row in top] == naive_top
+            and all(row.orders == naive_daily[i][0] and row.units == naive_daily[i][1]
+                    and abs(row.revenue - naive_daily[i][2]) < 0.01 for i, row in enumerate(daily))
+            and all(row.orders == naive_mix[row.status][0] and row.units == naive_mix[row.status][1] for row in mix)
+        )
+        print(f"{days:6}d {int(window.day_orders.sum()):9} {vectorized:10.2f}s {hit * 1000:7.2f}ms "
+              f"{naive:9.1f}s {naive / vectorized:7.0f}x  {'yes' if match else 'NO'}")
+
+    analytics.analytics_cache.clear()
+    with SessionLocal() as db:
+        started = time.perf_counter()
+        analytics.top_products_service(db)
+        analytics.status_mix_service(db)
+        print(f"all time from product_stats: {(time.perf_counter() - started) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+p50/p99 latency of the sync (threadpool) and async (AsyncSession) stacks.
+
+Each mode runs in its own interpreter so DB_MODE is picked up at import
+time. N concurrent clients fire a mix of GET /users/{id} and
+GET /products/{id} straight into the ASGI app.
+
+Usage:
+    python -m benchmarks.async_vs_sync --clients 50 200 1000 --requests 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.common import asgi_request, load_app, summarize, use_temp_database
+
+
+async def _drive(app, clients: int, per_client: int, token: str, rows: int):
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies = []
+    errors = 0
+
+    async def client(n: int):
+        nonlocal errors
+        for i in range(per_client):
+            item = (n * per_client + i) % rows + 1
+            path = f"/users/{item}" if i % 2 else f"/products/{item}"
+            started = time.perf_counter()
+            status_code, _, _ = await asgi_request(app, "GET", path, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            errors += status_code != 200
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(n) for n in range(clients)))
+    stats = summarize(latencies, time.perf_counter() - started)
+    stats["errors"] = errors
+    return stats
+
+
+def child(mode: str, clients_list, per_client: int, rows: int):
+    use_temp_database()
+    os.environ["DB_MODE"] = mode
+
+    app = load_app()
+    from app.db.session import SessionLocal
+    from app.models import Product, User
+    from app.utils import create_access_token
+
+    with SessionLocal() as db:
+        db.add_all(
+            User(id=i, username=f"user{i}", email=f"user{i}@example.com", password="x")
+            for i in range(1, rows + 1)
+        )
+        db.add_all(
+            Product(id=i, name=f"product-{i}", price=1.0, stock=100)
+            for i in range(1, rows + 1)
+        )
+        db.commit()
+    token = create_access_token({"sub": "1"})
+
+    async def run_all():
+        # one event loop for every round, the async pool is bound to it
+        return {
+            clients: await _drive(app, clients, per_client, token, rows)
+            for clients in clients_list
+        }
+
+    results = asyncio.run(run_all())
+    print(json.dumps({"mode": mode, "results": results}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--child", choices=["sync", "async"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.clients, args.requests, args.rows)
+        return
+
+    for mode in ("sync", "async"):
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.async_vs_sync", "--child", mode,
+             "--requests", str(args.requests), "--rows", str(args.rows),
+             "--clients", *map(str, args.clients)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        report = json.loads(out.strip().splitlines()[-1])
+        for clients, stats in report["results"].items():
+            print(f"{mode:5} clients={clients:>5} p50={stats['p50_ms']}ms "
+                  f"p99={stats['p99_ms']}ms rps={stats['throughput_rps']} errors={stats['errors']}")
+
+
+if __name__ == "__main__":
+    main()
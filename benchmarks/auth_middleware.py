@@ -0,0 +1,140 @@
+"""
+Per-request overhead of the pure ASGI JWTAuthMiddleware against the
+previous BaseHTTPMiddleware implementation (copied below as-is).
+
+Both middlewares wrap the same tiny app with a JSON route and a streaming
+route under /products, so the numbers are dominated by the middleware.
+Tasks created per request are counted through the loop's task factory.
+
+Usage:
+    python -m benchmarks.auth_middleware --requests 5000
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import time
+
+from benchmarks.common import asgi_request, summarize, use_temp_database
+
+
+def build_legacy_middleware():
+    from fastapi import Request, status
+    from starlette.middleware.base import BaseHTTPMiddleware
+    from starlette.responses import JSONResponse
+
+    from app.utils import verify_jwt_token
+
+    class LegacyJWTAuthMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request: Request, call_next):
+            protected_paths = ["/orders", "/products"]
+            try:
+                if any(request.url.path.startswith(path) for path in protected_paths):
+                    auth_header = request.headers.get("Authorization")
+                    if not auth_header or not auth_header.startswith("Bearer "):
+                        return JSONResponse(
+                            status_code=status.HTTP_401_UNAUTHORIZED,
+                            content={"detail": "Authorization header missing or invalid"}
+                        )
+                    token = auth_header.split(" ")[1]
+                    print(1)
+                    try:
+                        payload = verify_jwt_token(token)
+                        request.state.user = payload
+                        print(payload)
+                    except Exception:
+                        print(3)
+                        return JSONResponse(
+                            status_code=status.HTTP_401_UNAUTHORIZED,
+                            content={"detail": "Invalid or expired token"}
+                        )
+                    print(2)
+                response = await call_next(request)
+                return response
+            except Exception:
+                return JSONResponse(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    content={"detail": "Internal server error in authentication middleware"}
+                )
+
+    return LegacyJWTAuthMiddleware
+
+
+def build_app(middleware):
+    from fastapi import FastAPI, Request
+    from fastapi.responses import StreamingResponse
+
+    app = FastAPI()
+
+    @app.get("/products/item")
+    async def item(request: Request):
+        return {"user": request.state.user["sub"]}
+
+    @app.get("/products/stream")
+    async def stream():
+        async def chunks():
+            for n in range(100):
+                yield b"x" * 1024
+        return StreamingResponse(chunks())
+
+    app.add_middleware(middleware)
+    return app
+
+
+async def measure(app, path: str, requests: int, headers: dict) -> dict:
+    loop = asyncio.get_running_loop()
+    created = 0
+
+    def factory(loop, coro, **kwargs):
+        nonlocal created
+        created += 1
+        return asyncio.Task(coro, loop=loop, **kwargs)
+
+    latencies = []
+    loop.set_task_factory(factory)
+    started = time.perf_counter()
+    try:
+        for _ in range(requests):
+            t = time.perf_counter()
+            status_code, _, _ = await asgi_request(app, "GET", path, headers=headers)
+            latencies.append(time.perf_counter() - t)
+            assert status_code == 200, status_code
+    finally:
+        loop.set_task_factory(None)
+    stats = summarize(latencies, time.perf_counter() - started)
+    stats["tasks_per_request"] = round(created / requests, 2)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    use_temp_database()
+    from app.middleware import JWTAuthMiddleware
+    from app.utils import create_access_token
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': '1'})}"}
+    apps = {
+        "base_http": build_app(build_legacy_middleware()),
+        "pure_asgi": build_app(JWTAuthMiddleware),
+    }
+
+    async def run_all():
+        results = []
+        for path in ("/products/item", "/products/stream"):
+            for name, app in apps.items():
+                # the legacy middleware prints on every request
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    stats = await measure(app, path, args.requests, headers)
+                results.append((name, path, stats))
+        return results
+
+    for name, path, stats in asyncio.run(run_all()):
+        print(f"{name:9} {path:17} mean={stats['mean_ms']}ms p99={stats['p99_ms']}ms "
+              f"rps={stats['throughput_rps']} tasks/request={stats['tasks_per_request']}")
+
+
+if __name__ == "__main__":
+    main()
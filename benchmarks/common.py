@@ -0,0 +1,121 @@
+"""
+Shared helpers for the benchmark scripts: an isolated database per run,
+a tiny in-process ASGI client and latency summaries.
+"""
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+
+
+def use_temp_database(prefix: str = "wms-bench") -> str:
+    """
+    Point the app at a fresh SQLite file. Must run before `app` is imported.
+    """
+    tmp = tempfile.mkdtemp(prefix=prefix)
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+    return tmp
+
+
+def load_app():
+    """
+    app.main's app with its database prepared the way the lifespan hook
+    does; asgi_request sends no lifespan events.
+    """
+    from app.main import app
+    from app.db.init_db import ensure_schema
+    from app.db.session import engine
+
+    ensure_schema(engine)
+    return app
+
+
+def percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed: float) -> dict:
+    """
+    Throughput and latency percentiles (milliseconds) for one run.
+    """
+    ms = [l * 1000 for l in latencies]
+    return {
+        "requests": len(ms),
+        "throughput_rps": round(len(ms) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(ms), 3) if ms else 0.0,
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+    }
+
+
+async def asgi_request(app, method: str, path: str, json_body=None, headers=None, body: bytes = None):
+    """
+    Send one HTTP request straight into an ASGI app, no sockets involved.
+    `body` may also be an iterator of byte chunks, sent as a streamed
+    (chunked) request body.
+    Returns (status_code, response_headers, body_bytes).
+    """
+    raw_path, _, query = path.partition("?")
+    if json_body is not None:
+        body = json.dumps(json_body).encode()
+    body = body or b""
+    streamed = not isinstance(body, bytes)
+    chunks = iter(body) if streamed else iter([body])
+    request_headers = [(b"host", b"bench")]
+    if json_body is not None:
+        request_headers.append((b"content-type", b"application/json"))
+    if streamed:
+        request_headers.append((b"transfer-encoding", b"chunked"))
+    else:
+        request_headers.append((b"content-length", str(len(body)).encode()))
+    for key, value in (headers or {}).items():
+        request_headers.append((key.lower().encode(), value.encode()))
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": raw_path,
+        "raw_path": raw_path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": request_headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    pending = next(chunks, b"")
+    sent = False
+    done = asyncio.Event()
+
+    async def receive():
+        nonlocal pending, sent
+        if not sent:
+            chunk, pending = pending, next(chunks, None)
+            sent = pending is None
+            return {"type": "http.request", "body": chunk, "more_body": not sent}
+        # Like a real client, only disconnect once the response is complete
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    response = {"status": None, "headers": [], "body": []}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = message.get("headers", [])
+        elif message["type"] == "http.response.body":
+            response["body"].append(message.get("body", b""))
+            if not message.get("more_body", False):
+                done.set()
+
+    await app(scope, receive, send)
+    return response["status"], response["headers"], b"".join(response["body"])
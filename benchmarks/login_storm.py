@@ -0,0 +1,92 @@
+"""
+How much latency other endpoints lose during a login storm.
+
+Probe clients keep calling GET /products/{id} while login clients hammer
+POST /auth/login, all through the ASGI app in one process (sync stack).
+Each setup first measures the probes alone, then with the storm running:
+
+    inline  bcrypt runs in a request threadpool thread (previous behaviour)
+    pool    bcrypt runs in the bounded pool and is awaited, 503 once its
+            queue is full
+
+Usage:
+    python -m benchmarks.login_storm --logins 100 --probes 10 --seconds 5
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import asgi_request, load_app, summarize, use_temp_database
+
+SETUPS = ("inline", "pool")
+
+
+async def _probe(app, headers: dict, deadline: float, latencies: list):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        status_code, _, _ = await asgi_request(app, "GET", "/products/1", headers=headers)
+        latencies.append(time.perf_counter() - started)
+        assert status_code == 200, status_code
+
+
+async def _login(app, deadline: float, counts: dict):
+    body = {"email": "storm@example.com", "password": "storm-password"}
+    while time.perf_counter() < deadline:
+        status_code, _, _ = await asgi_request(app, "POST", "/auth/login", json_body=body)
+        counts[status_code] = counts.get(status_code, 0) + 1
+        if status_code == 503:
+            await asyncio.sleep(0.05)
+
+
+async def run(app, headers: dict, probes: int, logins: int, seconds: float) -> dict:
+    latencies, counts = [], {}
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(_probe(app, headers, deadline, latencies) for _ in range(probes)),
+        *(_login(app, deadline, counts) for _ in range(logins)),
+    )
+    stats = summarize(latencies, time.perf_counter() - started)
+    stats["logins"] = counts
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--logins", type=int, default=100, help="concurrent login clients")
+    parser.add_argument("--probes", type=int, default=10, help="concurrent probe clients")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--setup", choices=SETUPS, nargs="+", default=list(SETUPS))
+    args = parser.parse_args()
+
+    use_temp_database()
+    app = load_app()
+    from app.db.session import SessionLocal
+    from app.models import Product, User
+    from app.services import auth as auth_service
+    from starlette.concurrency import run_in_threadpool
+    from app.utils import _check_password, _hash_password, averify_password, create_access_token
+
+    with SessionLocal() as db:
+        db.add(User(username="storm", email="storm@example.com", password=_hash_password("storm-password")))
+        db.add(Product(id=1, name="product-1", price=1.0, stock=1))
+        db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': '1'})}"}
+
+    async def inline_verify(plain_password, hashed_password):
+        return await run_in_threadpool(_check_password, plain_password, hashed_password)
+
+    async def run_all():
+        for setup in args.setup:
+            auth_service.averify_password = inline_verify if setup == "inline" else averify_password
+            idle = await run(app, headers, args.probes, 0, args.seconds)
+            storm = await run(app, headers, args.probes, args.logins, args.seconds)
+            print(f"{setup:6} idle  p50={idle['p50_ms']}ms p99={idle['p99_ms']}ms rps={idle['throughput_rps']}")
+            print(f"{setup:6} storm p50={storm['p50_ms']}ms p99={storm['p99_ms']}ms "
+                  f"rps={storm['throughput_rps']} logins={storm['logins']}")
+
+    asyncio.run(run_all())
+
+
+if __name__ == "__main__":
+    main()
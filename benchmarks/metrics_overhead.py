@@ -0,0 +1,124 @@
+"""
+Cost of the Prometheus instrumentation per request.
+
+Runs the same request loop with METRICS_ENABLED=false and =true, each in
+its own interpreter (the flag is read at import time), and reports the
+mean time per request and the difference. GET / exercises only the HTTP
+middleware and route class; GET /products/{id} with the product cache off
+adds the engine hooks (one pool checkout, one query per request).
+End to end the difference is within run-to-run noise, so the hooks on the
+hot path are also timed directly.
+
+Usage:
+    python -m benchmarks.metrics_overhead --requests 20000 --rounds 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import timeit
+
+from benchmarks.common import asgi_request, load_app, use_temp_database
+
+PATHS = ["/", "/products/1"]
+
+
+def child(requests: int, rounds: int):
+    use_temp_database()
+    os.environ["PRODUCT_CACHE_ENABLED"] = "false"
+    app = load_app()
+    from app.db.session import SessionLocal
+    from app.models import Product
+    from app.utils import create_access_token
+
+    with SessionLocal() as db:
+        db.add(Product(id=1, name="product-1", price=1.0, stock=100))
+        db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': '1'})}"}
+
+    async def run(path: str) -> float:
+        for _ in range(200):
+            await asgi_request(app, "GET", path, headers=headers)
+        best = None
+        # best of several rounds, to keep scheduler noise out of a
+        # difference of a few microseconds
+        for _ in range(rounds):
+            started = time.perf_counter()
+            for _ in range(requests):
+                await asgi_request(app, "GET", path, headers=headers)
+            elapsed = (time.perf_counter() - started) / requests
+            best = elapsed if best is None else min(best, elapsed)
+        return best * 1e6
+
+    async def run_all():
+        return {path: await run(path) for path in PATHS}
+
+    print(json.dumps(asyncio.run(run_all())))
+
+
+def hook_costs(number: int = 200_000) -> dict:
+    """
+    Microseconds per call of each piece of per-request/per-query work.
+    """
+    use_temp_database()
+    from app import metrics
+
+    class Conn:
+        info = {}
+
+    conn = Conn()
+    gauge = metrics.in_progress("GET", "/products/{product_id}")
+
+    def request():
+        gauge.inc()
+        gauge.dec()
+        metrics.observe_request("GET", "/products/{product_id}", 200, 0.001)
+
+    def query():
+        metrics._before_cursor_execute(conn, None, "SELECT 1", (), None, False)
+        metrics._after_cursor_execute(conn, None, "SELECT 1", (), None, False)
+
+    def checkout():
+        metrics._on_checkout(None, None, None)
+        metrics._on_checkin(None, None)
+        metrics.DB_POOL_WAIT.observe(0.0001)
+
+    return {
+        name: min(timeit.repeat(fn, number=number, repeat=3)) / number * 1e6
+        for name, fn in (("request", request), ("query", query), ("checkout", checkout))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.requests, args.rounds)
+        return
+
+    results = {}
+    for enabled in ("false", "true"):
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.metrics_overhead", "--child",
+             "--requests", str(args.requests), "--rounds", str(args.rounds)],
+            check=True, capture_output=True, text=True,
+            env={**os.environ, "METRICS_ENABLED": enabled},
+        ).stdout
+        results[enabled] = json.loads(out.strip().splitlines()[-1])
+
+    for path in PATHS:
+        off, on = results["false"][path], results["true"][path]
+        print(f"GET {path:14} metrics off {off:8.1f}us  on {on:8.1f}us  difference {on - off:6.1f}us/request")
+    for name, cost in hook_costs().items():
+        print(f"hooks per {name:9} {cost:6.2f}us")
+
+
+if __name__ == "__main__":
+    main()
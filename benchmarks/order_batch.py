@@ -0,0 +1,77 @@
+"""
+Throughput of POST /orders/batch versus sequential single-order creation.
+
+Both paths call the services directly with a fresh session per "request",
+the way the routers do, against a temporary SQLite file.
+
+Usage:
+    python -m benchmarks.order_batch --batch-size 500 --products 50
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.models import Product, User
+from app.schemas.order import OrderBatchCreate, OrderCreate
+from app.services.order import create_order_service, create_orders_batch_service
+
+
+def _session_factory(path: str, products: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    with Session() as db:
+        db.add(User(id=1, username="bench", email="bench@example.com", password="x"))
+        db.add_all(
+            Product(id=i, name=f"product-{i}", price=9.99, stock=10**9)
+            for i in range(1, products + 1)
+        )
+        db.commit()
+    return engine, Session
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--products", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    lines = [
+        OrderCreate(user_id=1, product_id=rng.randint(1, args.products), quantity=rng.randint(1, 5))
+        for _ in range(args.batch_size)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, Session = _session_factory(os.path.join(tmp, "single.db"), args.products)
+        started = time.perf_counter()
+        for line in lines:
+            with Session() as db:
+                create_order_service(line, db)
+        sequential = time.perf_counter() - started
+        engine.dispose()
+
+        engine, Session = _session_factory(os.path.join(tmp, "batch.db"), args.products)
+        started = time.perf_counter()
+        with Session() as db:
+            result = create_orders_batch_service(OrderBatchCreate(orders=lines), db)
+        batched = time.perf_counter() - started
+        engine.dispose()
+
+    assert result.created == args.batch_size, result.failed
+    print({
+        "batch_size": args.batch_size,
+        "sequential_orders_per_sec": round(args.batch_size / sequential, 1),
+        "batch_orders_per_sec": round(args.batch_size / batched, 1),
+        "speedup": round(sequential / batched, 1),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Wave shipping: moving many orders to a new status.
+
+Seeds --orders orders, then times POST /orders/batch/status shipping
+--wave of them by ids, cancelling them again (with stock restore), and a
+filter-based transition, against one PUT /orders/{id} per order for a
+sample of --put-sample orders (extrapolated to the wave size).
+
+Usage:
+    python -m benchmarks.order_bulk_status --orders 100000 --wave 10000
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.common import asgi_request, load_app, use_temp_database
+
+
+def _seed(engine, users: int, products: int, orders: int, rng: random.Random) -> None:
+    from app.models import Order, Product, User
+
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "password": "x"}
+            for i in range(1, users + 1)
+        ])
+        conn.execute(Product.__table__.insert(), [
+            {"id": i, "name": f"product-{i}", "price": 1.0, "stock": 0}
+            for i in range(1, products + 1)
+        ])
+        batch = 50000
+        for start in range(1, orders + 1, batch):
+            conn.execute(Order.__table__.insert(), [
+                {
+                    "id": i,
+                    "user_id": rng.randint(1, users),
+                    "product_id": rng.randint(1, products),
+                    "quantity": rng.randint(1, 5),
+                    "status": "CREATED",
+                }
+                for i in range(start, min(start + batch, orders + 1))
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--wave", type=int, default=10_000)
+    parser.add_argument("--put-sample", type=int, default=500)
+    args = parser.parse_args()
+
+    use_temp_database()
+    from sqlalchemy import func, select
+    app = load_app()
+    from app.db.session import engine
+    from app.models import Order, Product
+    from app.utils import create_access_token
+
+    rng = random.Random(5)
+    _seed(engine, args.users, args.products, args.orders, rng)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': '1'})}"}
+    wave = rng.sample(range(1, args.orders + 1), args.wave)
+
+    async def bulk(body: dict):
+        started = time.perf_counter()
+        status_code, _, response = await asgi_request(app, "POST", "/orders/batch/status", body, headers)
+        elapsed = time.perf_counter() - started
+        assert status_code == 200, (status_code, response)
+        return elapsed
+
+    async def run_all():
+        elapsed = await bulk({"status": "SHIPPED", "ids": wave})
+        print(f"bulk ship     {args.wave:>7} orders {elapsed * 1000:8.1f}ms")
+
+        elapsed = await bulk({"status": "CANCELLED", "ids": wave})
+        print(f"bulk cancel   {args.wave:>7} orders {elapsed * 1000:8.1f}ms (with stock restore)")
+        with engine.connect() as conn:
+            restored = conn.execute(select(func.sum(Product.stock))).scalar_one()
+            expected = conn.execute(
+                select(func.sum(Order.quantity)).where(Order.id.in_(wave))
+            ).scalar_one()
+        assert restored == expected, (restored, expected)
+
+        elapsed = await bulk({"status": "SHIPPED", "filter": {"user_id": 1, "status": "CREATED"}})
+        print(f"bulk filter   user 1 orders {elapsed * 1000:8.1f}ms")
+
+        in_wave = set(wave)
+        sample = [order_id for order_id in range(1, args.orders + 1) if order_id not in in_wave][:args.put_sample]
+        started = time.perf_counter()
+        for order_id in sample:
+            status_code, _, _ = await asgi_request(
+                app, "PUT", f"/orders/{order_id}", {"status": "SHIPPED"}, headers
+            )
+            assert status_code == 200, status_code
+        per_order = (time.perf_counter() - started) / len(sample)
+        print(f"PUT per order {args.wave:>7} orders {per_order * args.wave * 1000:8.1f}ms "
+              f"(extrapolated from {len(sample)})")
+
+    asyncio.run(run_all())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+GET /orders/export throughput, memory and resumability.
+
+Seeds --orders orders, streams the full export through the ASGI app
+counting bytes as they arrive (nothing is kept), and reports rows/sec and
+the growth of the process' peak RSS; flat memory shows up as the same
+growth for every size. Then cuts an export mid-line, resumes it with
+after_id and checks the stitched result matches an uninterrupted export.
+
+Usage:
+    python -m benchmarks.order_export --orders 200000 1000000 --format csv ndjson
+"""
+import argparse
+import asyncio
+import json
+import random
+import resource
+import sys
+import time
+
+from benchmarks.common import asgi_request, load_app, use_temp_database
+
+STATUSES = ["CREATED", "SHIPPED", "DELIVERED", "CANCELLED"]
+
+
+def _seed(engine, start: int, stop: int, products: int, rng: random.Random) -> None:
+    from app.models import Order, Product, User
+
+    with engine.begin() as conn:
+        if start == 1:
+            conn.execute(User.__table__.insert(), [
+                {"id": 1, "username": "user1", "email": "user1@example.com", "password": "x"}
+            ])
+            conn.execute(Product.__table__.insert(), [
+                {"id": i, "name": f"product-{i}", "price": round(rng.uniform(1, 500), 2), "stock": 100}
+                for i in range(1, products + 1)
+            ])
+        batch = 50000
+        for first in range(start, stop, batch):
+            conn.execute(Order.__table__.insert(), [
+                {
+                    "id": i,
+                    "user_id": 1,
+                    "product_id": rng.randint(1, products),
+                    "quantity": rng.randint(1, 20),
+                    "status": rng.choice(STATUSES),
+                }
+                for i in range(first, min(first + batch, stop))
+            ])
+
+
+async def stream(app, path: str, headers: dict) -> tuple:
+    """
+    Drive a GET through the app, discarding the body as it arrives.
+    Returns (status_code, bytes, lines).
+    """
+    result = {"status": None, "bytes": 0, "lines": 0}
+    done = asyncio.Event()
+    raw_path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": raw_path, "raw_path": raw_path.encode(), "query_string": query.encode(),
+        "root_path": "", "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+        "headers": [(b"host", b"bench")] + [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+    }
+
+    async def receive():
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            body = message.get("body", b"")
+            result["bytes"] += len(body)
+            result["lines"] += body.count(b"\n")
+            if not message.get("more_body", False):
+                done.set()
+
+    await app(scope, receive, send)
+    return result["status"], result["bytes"], result["lines"]
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--orders", type=int, nargs="+", default=[200_000, 1_000_000])
+    parser.add_argument("--format", choices=["csv", "ndjson"], nargs="+", default=["csv", "ndjson"])
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    use_temp_database()
+    app = load_app()
+    from app.db.session import engine
+    from app.utils import create_access_token
+
+    rng = random.Random(11)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': '1'})}"}
+
+    async def check_resume(fmt: str) -> bool:
+        path = f"/orders/export?format={fmt}&until_id=5000"
+        _, _, full = await asgi_request(app, "GET", path, headers=headers)
+        # drop the connection in the middle of a line
+        cut = full[:len(full) // 3]
+        received = cut[:cut.rfind(b"\n") + 1]
+        last = received.rstrip(b"\n").rsplit(b"\n", 1)[-1]
+        last_id = json.loads(last)["id"] if fmt == "ndjson" else int(last.split(b",")[0])
+        _, _, rest = await asgi_request(app, "GET", f"{path}&after_id={last_id}", headers=headers)
+        return received + rest == full
+
+    async def run_all():
+        seeded = 1
+        ok = True
+        for orders in sorted(args.orders):
+            started = time.perf_counter()
+            _seed(engine, seeded, orders + 1, args.products, rng)
+            seeded = orders + 1
+            print(f"seeded {orders} orders in {time.perf_counter() - started:.1f}s")
+            for fmt in args.format:
+                rss_before = peak_rss_mb()
+                started = time.perf_counter()
+                status_code, size, lines = await stream(
+                    app, f"/orders/export?format={fmt}&chunk_size={args.chunk_size}", headers
+                )
+                elapsed = time.perf_counter() - started
+                rows = lines - (fmt == "csv")
+                assert status_code == 200 and rows == orders, (status_code, rows)
+                print(f"{fmt:6} orders={orders:>9} {rows / elapsed:>10,.0f} rows/s "
+                      f"{size / elapsed / 2**20:.1f}MB/s elapsed={elapsed:.2f}s "
+                      f"peak_rss_growth={peak_rss_mb() - rss_before:.1f}MB")
+        for fmt in args.format:
+            resumed = await check_resume(fmt)
+            ok = ok and resumed
+            print(f"resume {fmt:6} {'OK' if resumed else 'MISMATCH'}")
+        return ok
+
+    if not asyncio.run(run_all()):
+        sys.exit("resumed export does not match an uninterrupted one")
+
+
+if __name__ == "__main__":
+    main()
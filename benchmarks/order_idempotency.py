@@ -0,0 +1,118 @@
+"""
+Retry storm against POST /orders/ with and without Idempotency-Key.
+
+Sends --keys distinct orders, each --duplicates times concurrently (a
+scanner retrying on timeouts), and checks that with keys:
+  - exactly one order per key was created and stock dropped once per key
+  - every duplicate got the same 201 body, all but one marked as replayed
+Without keys every duplicate creates an order, which is the wasted work
+the header removes. Also times a later retry (a stored response) against
+creating the order. Exits 1 if the check fails.
+
+At most --concurrency requests are in flight, below the connection pool
+size: past it, sync requests starve the threadpool waiting for
+connections whatever the headers.
+
+Usage:
+    python -m benchmarks.order_idempotency --keys 50 --duplicates 20
+    DB_MODE=async python -m benchmarks.order_idempotency
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from benchmarks.common import asgi_request, load_app, use_temp_database
+
+STOCK = 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--keys", type=int, default=50)
+    parser.add_argument("--duplicates", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    use_temp_database()
+    app = load_app()
+    from sqlalchemy import func, select
+    from app.db.session import SessionLocal
+    from app.models import Order, Product, User
+    from app.utils import create_access_token
+
+    with SessionLocal() as db:
+        db.add(User(id=1, username="scanner", email="scanner@example.com", password="x"))
+        db.add_all(Product(id=i, name=f"product-{i}", price=1.0, stock=STOCK) for i in range(1, args.keys + 1))
+        db.commit()
+    auth = {"Authorization": f"Bearer {create_access_token({'sub': '1'})}"}
+
+    def counts():
+        with SessionLocal() as db:
+            orders = db.scalar(select(func.count()).select_from(Order))
+            sold = db.scalar(select(func.sum(STOCK - Product.stock)))
+        return orders, sold
+
+    async def bounded(limit: asyncio.Semaphore, *request, **kwargs):
+        async with limit:
+            return await asgi_request(*request, **kwargs)
+
+    async def storm(run: str, with_keys: bool):
+        limit = asyncio.Semaphore(args.concurrency)
+        requests = []
+        for i in range(1, args.keys + 1):
+            headers = {**auth, "Idempotency-Key": f"{run}-{i}"} if with_keys else auth
+            body = {"user_id": 1, "product_id": i, "quantity": 1}
+            requests += [bounded(limit, app, "POST", "/orders/", json_body=body, headers=headers)
+                         for _ in range(args.duplicates)]
+        before = counts()
+        started = time.perf_counter()
+        responses = await asyncio.gather(*requests)
+        elapsed = time.perf_counter() - started
+        after = counts()
+        return responses, after[0] - before[0], after[1] - before[1], elapsed
+
+    async def run_all():
+        total = args.keys * args.duplicates
+        ok = True
+        for with_keys in (False, True):
+            responses, orders, sold, elapsed = await storm("storm", with_keys)
+            label = "with keys   " if with_keys else "without keys"
+            print(f"{label} {total} requests in {elapsed:.2f}s: {orders} orders created, stock down {sold}")
+            if not with_keys:
+                continue
+            for i in range(args.keys):
+                group = responses[i * args.duplicates:(i + 1) * args.duplicates]
+                statuses = {status for status, _, _ in group}
+                bodies = {json.loads(body)["id"] if status == 201 else body for status, _, body in group}
+                originals = sum(1 for _, headers, _ in group if (b"idempotent-replayed", b"true") not in headers)
+                if statuses != {201} or len(bodies) != 1 or originals != 1:
+                    print(f"key {i + 1}: statuses {statuses}, {len(bodies)} distinct bodies, {originals} not replayed")
+                    ok = False
+            if orders != args.keys or sold != args.keys:
+                ok = False
+            print(f"check {'passed' if ok else 'FAILED'}: expected {args.keys} orders and stock down {args.keys}")
+
+        # a later retry is one lookup of the stored response
+        headers = {**auth, "Idempotency-Key": "storm-1"}
+        body = {"user_id": 1, "product_id": 1, "quantity": 1}
+        samples = {"create": [], "replay": []}
+        for n in range(200):
+            started = time.perf_counter()
+            await asgi_request(app, "POST", "/orders/", json_body=body,
+                               headers={**auth, "Idempotency-Key": f"single-{n}"})
+            samples["create"].append(time.perf_counter() - started)
+            started = time.perf_counter()
+            await asgi_request(app, "POST", "/orders/", json_body=body, headers=headers)
+            samples["replay"].append(time.perf_counter() - started)
+        for name, values in samples.items():
+            print(f"{name:7} {sorted(values)[len(values) // 2] * 1000:6.2f}ms median")
+        return ok
+
+    if not asyncio.run(run_all()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Order listing: query count per page and latency on a large orders table.
+
+Counts the SQL statements issued by GET /users/{id}/orders and GET /orders/
+for several page sizes and exits non-zero if the count grows with the page
+size (an N+1 on order.product). Then prints the query plans and p50/p99 of
+the common listing shapes.
+
+Usage:
+    python -m benchmarks.order_listing --orders 200000 --requests 200
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from benchmarks.common import asgi_request, load_app, summarize, use_temp_database
+
+STATUSES = ["CREATED", "SHIPPED", "DELIVERED", "CANCELLED"]
+
+
+def _seed(engine, users: int, products: int, orders: int, rng: random.Random) -> None:
+    from app.models import Order, Product, User
+
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "password": "x"}
+            for i in range(1, users + 1)
+        ])
+        conn.execute(Product.__table__.insert(), [
+            {"id": i, "name": f"product-{i}", "price": 1.0, "stock": 100}
+            for i in range(1, products + 1)
+        ])
+        batch = 50000
+        for start in range(1, orders + 1, batch):
+            conn.execute(Order.__table__.insert(), [
+                {
+                    "id": i,
+                    "user_id": rng.randint(1, users),
+                    "product_id": rng.randint(1, products),
+                    "quantity": 1,
+                    "status": rng.choice(STATUSES),
+                }
+                for i in range(start, min(start + batch, orders + 1))
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    use_temp_database()
+    from sqlalchemy import event, text
+    app = load_app()
+    from app.db.session import engine
+    from app.services.order import list_orders_stmt
+    from app.utils import create_access_token
+
+    rng = random.Random(7)
+    _seed(engine, args.users, args.products, args.orders, rng)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': '1'})}"}
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a, **kw: statements.append(a[2]))
+
+    async def count_queries(path: str) -> int:
+        statements.clear()
+        status_code, _, body = await asgi_request(app, "GET", path, headers=headers)
+        assert status_code == 200, (status_code, body)
+        return len(statements)
+
+    async def check_query_counts() -> bool:
+        ok = True
+        for path in ("/users/1/orders", "/orders/", "/orders/?status=SHIPPED"):
+            sep = "&" if "?" in path else "?"
+            counts = {limit: await count_queries(f"{path}{sep}limit={limit}") for limit in (1, 10, 100, 1000)}
+            constant = len(set(counts.values())) == 1
+            ok = ok and constant
+            print(f"queries {path:26} {counts} {'OK' if constant else 'N+1!'}")
+        return ok
+
+    ok = asyncio.run(check_query_counts())
+
+    with engine.connect() as conn:
+        for name, filters in (
+            ("user", {"user_id": 1}),
+            ("user+status", {"user_id": 1, "order_status": "SHIPPED"}),
+            ("product+status", {"product_id": 1, "order_status": "CREATED"}),
+            ("status", {"order_status": "DELIVERED"}),
+        ):
+            stmt = list_orders_stmt(limit=50, **filters)
+            sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+            plan = conn.execute(text("EXPLAIN QUERY PLAN " + sql)).all()
+            print(f"plan {name:15} " + "; ".join(row[-1] for row in plan))
+
+    # users may only list their own orders, so each user shape uses its token
+    tokens = {}
+
+    def as_user(user_id: int) -> dict:
+        if user_id not in tokens:
+            tokens[user_id] = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+        return tokens[user_id]
+
+    async def latency(request_fn) -> dict:
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            path, user_id = request_fn()
+            t = time.perf_counter()
+            status_code, _, _ = await asgi_request(app, "GET", path, headers=as_user(user_id))
+            latencies.append(time.perf_counter() - t)
+            assert status_code == 200, status_code
+        return summarize(latencies, time.perf_counter() - started)
+
+    async def run_latency():
+        def user_orders(query: str = ""):
+            user_id = rng.randint(1, args.users)
+            return f"/users/{user_id}/orders?limit=50{query}", user_id
+
+        shapes = {
+            "user": user_orders,
+            "user+status": lambda: user_orders(f"&status={rng.choice(STATUSES)}"),
+            "product": lambda: (f"/orders/?product_id={rng.randint(1, args.products)}&limit=50", 1),
+            "status": lambda: (f"/orders/?status={rng.choice(STATUSES)}&limit=50", 1),
+        }
+        for name, request_fn in shapes.items():
+            stats = await latency(request_fn)
+            print(f"latency {name:12} p50={stats['p50_ms']}ms p99={stats['p99_ms']}ms")
+
+    asyncio.run(run_latency())
+    if not ok:
+        sys.exit("order listing issues a query per row (N+1)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Multi-process stress test for order creation.
+
+Several worker processes hammer `create_order_service` for the same product
+against one SQLite file and we check that stock never goes below zero and
+that the number of created orders matches the stock that was taken.
+The same run is repeated with the old read-check-write implementation so
+the two can be compared side by side. The schema is the app's own
+(ensure_schema, so the product_stats triggers fire too) and orders/sec
+only counts the order loop: workers connect first and start together.
+
+Usage:
+    python -m benchmarks.order_stress --workers 8 --orders 200 --stock 1000
+"""
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+# before the app's config is imported: contended UPDATEs would flood the slow query log
+os.environ.setdefault("SLOW_QUERY_MS", "0")
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.db.init_db import ensure_schema
+from app.db.session import create_db_engine
+from app.models import Order, Product, User
+from app.schemas.order import OrderCreate
+from app.services.order import create_order_service
+
+
+def legacy_create_order(order_in: OrderCreate, db) -> Order:
+    """
+    The previous implementation: read the product, check stock in Python,
+    then write the decremented value back.
+    """
+    user = db.get(User, order_in.user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    product = db.get(Product, order_in.product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    if product.stock < order_in.quantity:
+        raise HTTPException(status_code=400, detail="Insufficient stock")
+    product.stock -= order_in.quantity
+    order = Order(
+        user_id=order_in.user_id,
+        product_id=order_in.product_id,
+        quantity=order_in.quantity,
+        status="CREATED"
+    )
+    db.add(order)
+    try:
+        db.commit()
+        db.refresh(order)
+        return order
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Failed to create order: {str(e)}")
+
+
+IMPLEMENTATIONS = {
+    "atomic": create_order_service,
+    "legacy": legacy_create_order,
+}
+
+
+def _seed(url: str, stock: int) -> None:
+    engine = create_db_engine(url)
+    ensure_schema(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add(User(id=1, username="stress", email="stress@example.com", password="x"))
+        db.add(Product(id=1, name="stress-product", price=1.0, stock=stock))
+        db.commit()
+    engine.dispose()
+
+
+def _worker(url: str, impl: str, attempts: int, quantity: int, ready, start, results) -> None:
+    engine = create_db_engine(url)
+    Session = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    create = IMPLEMENTATIONS[impl]
+    created = rejected = errors = 0
+    order_in = OrderCreate(user_id=1, product_id=1, quantity=quantity)
+    engine.connect().close()
+    ready.release()
+    start.wait()
+    started = time.perf_counter()
+    for _ in range(attempts):
+        with Session() as db:
+            try:
+                create(order_in, db)
+                created += 1
+            except HTTPException as exc:
+                if exc.detail == "Insufficient stock":
+                    rejected += 1
+                else:
+                    errors += 1
+            except OperationalError:
+                errors += 1
+    finished = time.perf_counter()
+    engine.dispose()
+    results.put((created, rejected, errors, started, finished))
+
+
+def run(impl: str, workers: int, attempts: int, quantity: int, stock: int, db_path: str) -> dict:
+    url = f"sqlite:///{db_path}"
+    _seed(url, stock)
+
+    results = mp.Queue()
+    ready, start = mp.Semaphore(0), mp.Event()
+    procs = [
+        mp.Process(target=_worker, args=(url, impl, attempts, quantity, ready, start, results))
+        for _ in range(workers)
+    ]
+    for proc in procs:
+        proc.start()
+    for _ in procs:
+        ready.acquire()
+    start.set()
+    totals = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+    # perf_counter is CLOCK_MONOTONIC, shared by the worker processes
+    elapsed = max(t[4] for t in totals) - min(t[3] for t in totals)
+
+    engine = create_db_engine(url)
+    with engine.connect() as conn:
+        final_stock = conn.execute(select(Product.stock).where(Product.id == 1)).scalar_one()
+        ordered = conn.execute(select(func.coalesce(func.sum(Order.quantity), 0))).scalar_one()
+    engine.dispose()
+
+    created = sum(t[0] for t in totals)
+    return {
+        "impl": impl,
+        "created": created,
+        "rejected": sum(t[1] for t in totals),
+        "errors": sum(t[2] for t in totals),
+        "final_stock": final_stock,
+        "oversold_units": max(0, ordered - stock),
+        "stock_mismatch": (stock - final_stock) != ordered,
+        "orders_per_sec": round(created / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--orders", type=int, default=200, help="attempts per worker")
+    parser.add_argument("--quantity", type=int, default=1)
+    parser.add_argument("--stock", type=int, default=1000)
+    parser.add_argument("--impl", choices=["atomic", "legacy", "both"], default="both")
+    args = parser.parse_args()
+
+    impls = ["legacy", "atomic"] if args.impl == "both" else [args.impl]
+    with tempfile.TemporaryDirectory() as tmp:
+        for impl in impls:
+            stats = run(impl, args.workers, args.orders, args.quantity, args.stock,
+                        os.path.join(tmp, f"{impl}.db"))
+            print(stats)
+            if impl == "atomic":
+                assert stats["oversold_units"] == 0 and not stats["stock_mismatch"], stats
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Throughput and memory of POST /products/import.
+
+Generates CSV or NDJSON on the fly and streams it into the ASGI app in
+64 KiB chunks, so the file never exists in memory as a whole. Reports
+rows/sec and the growth of the process' peak RSS for each size; flat
+memory shows up as the same growth for every size.
+
+Usage:
+    python -m benchmarks.product_import --rows 50000 200000 --format csv ndjson
+"""
+import argparse
+import asyncio
+import json
+import resource
+import time
+
+from benchmarks.common import asgi_request, load_app, use_temp_database
+
+CHUNK_BYTES = 64 * 1024
+
+
+def _lines(fmt: str, start: int, stop: int) -> bytes:
+    out = []
+    for i in range(start, stop):
+        name, price, stock = f"sku-{i}", i % 50000 / 100 + 1, i % 100
+        if fmt == "csv":
+            out.append(f"{name},{price},{stock}\n")
+        else:
+            out.append(json.dumps({"name": name, "price": price, "stock": stock}) + "\n")
+    return "".join(out).encode()
+
+
+def generate(fmt: str, rows: int, block_rows: int = 5000):
+    """
+    Yield the upload body in CHUNK_BYTES pieces. One block of rows is built
+    up front and repeated (names need not be unique), so the client side
+    costs next to nothing and the body is never held in memory as a whole.
+    """
+    if fmt == "csv":
+        yield b"name,price,stock\n"
+    block = _lines(fmt, 0, block_rows)
+    for _ in range(rows // block_rows):
+        for offset in range(0, len(block), CHUNK_BYTES):
+            yield block[offset:offset + CHUNK_BYTES]
+    if rows % block_rows:
+        yield _lines(fmt, 0, rows % block_rows)
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[50_000, 200_000])
+    parser.add_argument("--format", choices=["csv", "ndjson"], nargs="+", default=["csv", "ndjson"])
+    parser.add_argument("--chunk-size", type=int, default=20000)
+    args = parser.parse_args()
+
+    use_temp_database()
+    app = load_app()
+    from app.utils import create_access_token
+
+    token = create_access_token({"sub": "1"})
+    content_types = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+    async def run_all():
+        for fmt in args.format:
+            for rows in args.rows:
+                headers = {"Authorization": f"Bearer {token}", "Content-Type": content_types[fmt]}
+                rss_before = peak_rss_mb()
+                started = time.perf_counter()
+                status_code, _, body = await asgi_request(
+                    app, "POST", f"/products/import?chunk_size={args.chunk_size}",
+                    headers=headers, body=generate(fmt, rows)
+                )
+                elapsed = time.perf_counter() - started
+                report = json.loads(body)
+                assert status_code == 200 and report["imported"] == rows, (status_code, report)
+                print(f"{fmt:6} rows={rows:>8} {rows / elapsed:>10,.0f} rows/s "
+                      f"elapsed={elapsed:.2f}s peak_rss_growth={peak_rss_mb() - rss_before:.1f}MB")
+
+    asyncio.run(run_all())
+
+
+if __name__ == "__main__":
+    main()
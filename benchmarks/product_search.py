@@ -0,0 +1,105 @@
+"""
+GET /products/ latency on a large catalogue.
+
+Seeds --rows products with generated names, then fires each query shape
+(name prefix, full-text, price range, in-stock, following a cursor) through
+the ASGI app and reports p50/p99 per shape. The query plan of the prefix
+filter is printed to show it is served by ix_products_name.
+
+Usage:
+    python -m benchmarks.product_search --rows 500000 --requests 300
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.common import asgi_request, load_app, summarize, use_temp_database
+
+ADJECTIVES = ["blue", "red", "steel", "heavy", "compact", "wireless", "smart", "mini", "pro", "classic"]
+NOUNS = ["widget", "gadget", "bolt", "pallet", "crate", "scanner", "drill", "cable", "sensor", "label"]
+
+
+def _seed(engine, rows: int, rng: random.Random) -> None:
+    from app.models import Product
+
+    batch = 50000
+    with engine.begin() as conn:
+        for start in range(1, rows + 1, batch):
+            conn.execute(
+                Product.__table__.insert(),
+                [
+                    {
+                        "id": i,
+                        "name": f"{rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS)} {i}",
+                        "price": round(rng.uniform(1, 1000), 2),
+                        "stock": rng.randint(0, 50),
+                    }
+                    for i in range(start, min(start + batch, rows + 1))
+                ],
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--requests", type=int, default=300, help="requests per query shape")
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    use_temp_database()
+    from sqlalchemy import text
+    app = load_app()
+    from app.db.session import engine
+    from app.services.product import list_products_stmt
+    from app.utils import create_access_token
+
+    rng = random.Random(42)
+    started = time.perf_counter()
+    _seed(engine, args.rows, rng)
+    print(f"seeded {args.rows} products in {time.perf_counter() - started:.1f}s")
+
+    stmt, _ = list_products_stmt("sqlite", name_prefix="Steel w", sort="name", limit=args.limit)
+    with engine.connect() as conn:
+        plan = conn.execute(text(
+            "EXPLAIN QUERY PLAN " + str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+        )).all()
+    print("prefix plan:", "; ".join(row[-1] for row in plan))
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': '1'})}"}
+    shapes = {
+        "prefix": lambda: {"name_prefix": f"{rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS)}", "sort": "name"},
+        "fulltext": lambda: {"q": f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"},
+        "price_range": lambda: {"min_price": (low := rng.randint(1, 900)), "max_price": low + 50, "sort": "price"},
+        "in_stock": lambda: {"in_stock": "true", "sort": "-price"},
+    }
+
+    async def run_shape(params_fn, follow: bool = False):
+        latencies = []
+        cursor = None
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            params = params_fn()
+            params["limit"] = str(args.limit)
+            if follow and cursor:
+                params["cursor"] = cursor
+            query = "&".join(f"{key}={value}" for key, value in params.items()).replace(" ", "%20")
+            t = time.perf_counter()
+            status_code, response_headers, _ = await asgi_request(app, "GET", f"/products/?{query}", headers=headers)
+            latencies.append(time.perf_counter() - t)
+            assert status_code == 200, status_code
+            cursor = dict(response_headers).get(b"x-next-cursor", b"").decode() or None
+        return summarize(latencies, time.perf_counter() - started)
+
+    async def run_all():
+        for name, params_fn in shapes.items():
+            stats = await run_shape(params_fn)
+            print(f"{name:12} p50={stats['p50_ms']}ms p99={stats['p99_ms']}ms")
+        stats = await run_shape(lambda: {"sort": "price"}, follow=True)
+        print(f"{'cursor_walk':12} p50={stats['p50_ms']}ms p99={stats['p99_ms']}ms")
+
+    asyncio.run(run_all())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Per-product sales summary: product_stats lookup against recounting orders.
+
+Grows the orders table through --sizes (spread over --products products)
+and at each size times GET /products/{id}/stats and its lookup query
+against the query it replaces, a recount of one product's orders. Also
+times POST /orders/ with and without the product_stats triggers, and a
+full rebuild and verify at the largest size.
+
+Usage:
+    python -m benchmarks.product_stats --sizes 10000,100000,1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from benchmarks.common import asgi_request, load_app, percentile, use_temp_database
+
+STATUSES = ["CREATED", "SHIPPED", "DELIVERED", "CANCELLED"]
+
+
+def median_ms(samples) -> float:
+    return percentile(samples, 50) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    use_temp_database()
+    # the bulk loads are slow statements by design
+    os.environ["SLOW_QUERY_MS"] = "0"
+    app = load_app()
+    from sqlalchemy import insert
+    from app.db.init_db import PRODUCT_STATS_DDL
+    from app.db.session import SessionLocal, engine
+    from app.models import Order, Product, User
+    from app.models.product_stats import product_stats_aggregate
+    from app.services.product_stats import product_stats_stmt, rebuild_product_stats, verify_product_stats
+    from app.utils import create_access_token
+
+    with SessionLocal() as db:
+        db.add(User(id=1, username="bench", email="bench@example.com", password="x"))
+        db.add_all(Product(id=i, name=f"product-{i}", price=1.5, stock=10 ** 9) for i in range(1, args.products + 1))
+        db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': '1'})}"}
+
+    async def timed(method, path, **kwargs):
+        started = time.perf_counter()
+        await asgi_request(app, method, path, headers=headers, **kwargs)
+        return time.perf_counter() - started
+
+    async def create_orders(n: int) -> float:
+        body = {"user_id": 1, "product_id": 1, "quantity": 1}
+        return median_ms([await timed("POST", "/orders/", json_body=body) for _ in range(n)])
+
+    async def run():
+        print("POST /orders/ median:")
+        print(f"  with stats triggers    {await create_orders(args.requests):6.2f}ms")
+        with engine.begin() as conn:
+            for name in ("orders_stats_ai", "orders_stats_ad", "orders_stats_au"):
+                conn.exec_driver_sql(f"DROP TRIGGER {name}")
+        print(f"  without stats triggers {await create_orders(args.requests):6.2f}ms")
+        with engine.begin() as conn:
+            for ddl in PRODUCT_STATS_DDL:
+                conn.exec_driver_sql(ddl)
+        with SessionLocal() as db:
+            rebuild_product_stats(db)
+
+        print(f"{'orders':>9} {'load/s':>9} {'stats endpoint':>15} {'stats query':>12} {'recount query':>14}")
+        loaded = 0
+        for size in sizes:
+            rows = [
+                {"user_id": 1, "product_id": random.randint(1, args.products),
+                 "quantity": random.randint(1, 5), "status": random.choice(STATUSES)}
+                for _ in range(size - loaded)
+            ]
+            started = time.perf_counter()
+            with engine.begin() as conn:
+                conn.execute(insert(Order), rows)
+            load_rate = len(rows) / (time.perf_counter() - started)
+            loaded = size
+
+            ids = [random.randint(1, args.products) for _ in range(args.requests)]
+            endpoint = [await timed("GET", f"/products/{i}/stats") for i in ids]
+            lookup, recount = [], []
+            with engine.connect() as conn:
+                for i in ids[:100]:
+                    started = time.perf_counter()
+                    conn.execute(product_stats_stmt(i, conn.dialect.name)).all()
+                    lookup.append(time.perf_counter() - started)
+                    started = time.perf_counter()
+                    conn.execute(product_stats_aggregate(i - 1, i)).all()
+                    recount.append(time.perf_counter() - started)
+            print(f"{size:9} {load_rate:9.0f} {median_ms(endpoint):13.2f}ms {median_ms(lookup):10.3f}ms "
+                  f"{median_ms(recount):12.3f}ms")
+
+        with SessionLocal() as db:
+            started = time.perf_counter()
+            rebuild_product_stats(db)
+            rebuilt = time.perf_counter() - started
+            started = time.perf_counter()
+            mismatched = verify_product_stats(db)
+            verified = time.perf_counter() - started
+        print(f"rebuild {rebuilt:.2f}s, verify {verified:.2f}s at {loaded} orders: {len(mismatched)} mismatches")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Read throughput as read engines are added (app.db.routing).
+
+Seeds --orders orders, then for each count in --engines starts a fresh
+process with SQLITE_READ_ENGINES set to it, where --readers threads read
+through read sessions (a page of list_orders_service, then
+get_order_service on a random order) while --writers threads create
+orders through create_order_service on the primary, for --seconds. Every
+engine gets its own pool of --pool-size connections, as a replica would,
+so without read engines the readers queue behind the writers' connections
+(held while they wait for SQLite's write lock); each read engine brings
+its own. Prints reads/s, read latency and writes/s per engine count.
+Reads only scale while there are cores (or replica hosts) to spare: on one
+core the engines mostly keep readers and writers from starving each
+other's pools, and the read tail is threads waiting for a connection.
+
+Usage:
+    python -m benchmarks.read_routing --engines 0,1,2,4 --readers 16 --writers 8
+"""
+import argparse
+import multiprocessing as mp
+import os
+import random
+import threading
+import time
+
+from benchmarks.common import load_app, percentile, use_temp_database
+
+
+def _run(args, results) -> None:
+    from fastapi import HTTPException
+    from sqlalchemy.exc import OperationalError
+    from app.db.session import SessionLocal, read_engines
+    from app.schemas.order import OrderCreate
+    from app.services.order import create_order_service, get_order_service, list_orders_service
+
+    stop = threading.Event()
+    reads, writes, errors = [], [0], [0]
+
+    def reader(seed):
+        rng = random.Random(seed)
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                with SessionLocal(for_reading=True) as db:
+                    list_orders_service(db, limit=50, user_id=rng.randint(1, args.users))
+                    get_order_service(rng.randint(1, args.orders), db)
+                reads.append(time.perf_counter() - started)
+            except (HTTPException, OperationalError):
+                errors[0] += 1
+
+    def writer(seed):
+        rng = random.Random(seed)
+        while not stop.is_set():
+            order_in = OrderCreate(user_id=rng.randint(1, args.users), product_id=rng.randint(1, args.products), quantity=1)
+            try:
+                with SessionLocal() as db:
+                    create_order_service(order_in, db)
+                writes[0] += 1
+            except (HTTPException, OperationalError):
+                errors[0] += 1
+
+    threads = [threading.Thread(target=reader, args=(seed,)) for seed in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(1000 + seed,)) for seed in range(args.writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    ms = [r * 1000 for r in reads]
+    results.put({
+        "engines": len(read_engines),
+        "reads_per_s": len(reads) / elapsed,
+        "p50_ms": percentile(ms, 50),
+        "p99_ms": percentile(ms, 99),
+        "writes_per_s": writes[0] / elapsed,
+        "errors": errors[0],
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--engines", default="0,1,2,4", help="read engine counts to compare")
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--pool-size", type=int, default=4, help="connections per engine")
+    parser.add_argument("--orders", type=int, default=50000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--products", type=int, default=100)
+    args = parser.parse_args()
+
+    use_temp_database()
+    os.environ["SLOW_QUERY_MS"] = "0"
+    os.environ.update(DB_POOL_SIZE=str(args.pool_size), DB_MAX_OVERFLOW="0", DB_POOL_PREWARM="0")
+    load_app()
+    from sqlalchemy import insert
+    from app.db.session import engine
+    from app.models import Order, Product, User
+
+    rng = random.Random(1)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "username": f"user-{i}", "email": f"user-{i}@example.com", "password": "x"}
+            for i in range(1, args.users + 1)
+        ])
+        conn.execute(insert(Product), [
+            {"id": i, "name": f"product-{i}", "price": 1.0, "stock": 10 ** 9} for i in range(1, args.products + 1)
+        ])
+        conn.execute(insert(Order), [
+            {"user_id": rng.randint(1, args.users), "product_id": rng.randint(1, args.products),
+             "quantity": 1, "status": "CREATED"}
+            for _ in range(args.orders)
+        ])
+    engine.dispose()
+
+    # a fresh interpreter per run, since the read engines are made at import
+    spawn = mp.get_context("spawn")
+    print(f"cpus={os.cpu_count()} readers={args.readers} writers={args.writers} pool_size={args.pool_size}")
+    print(f"{'engines':>7} {'reads/s':>8} {'p50 ms':>7} {'p99 ms':>8} {'writes/s':>9} {'errors':>7}")
+    for count in (int(n) for n in args.engines.split(",")):
+        os.environ["SQLITE_READ_ENGINES"] = str(count)
+        results = spawn.Queue()
+        proc = spawn.Process(target=_run, args=(args, results))
+        proc.start()
+        row = results.get()
+        proc.join()
+        print(f"{row['engines']:>7} {row['reads_per_s']:8.0f} {row['p50_ms']:7.2f} {row['p99_ms']:8.2f} "
+              f"{row['writes_per_s']:9.0f} {row['errors']:7}")
+
+
+if __name__ == "__main__":
+    main()
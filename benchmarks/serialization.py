@@ -0,0 +1,132 @@
+"""
+Serialization cost per 1,000 rows, default path vs FAST_SERIALIZATION.
+
+For products, users and orders (with their product) it times, per 1,000
+rows:
+  default     FastAPI's response_model path: validate the ORM instances,
+              dump to dicts, json.dumps (JSONResponse)
+  orjson      the same validation, rendered by ORJSONResponse
+  fast        the ListSerializer the routers use with FAST_SERIALIZATION:
+              row tuples through orjson for flat models, one TypeAdapter
+              validate + dump_json for orders with a nested product
+and the same again including the query (tracked ORM instances for the
+default path, plain rows for the fast one).
+
+Usage:
+    python -m benchmarks.serialization --rows 1000 --repeat 50
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from benchmarks.common import use_temp_database
+
+
+def _seed(engine, rows: int) -> None:
+    from app.models import Order, Product, User
+
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "password": "x"}
+            for i in range(1, rows + 1)
+        ])
+        conn.execute(Product.__table__.insert(), [
+            {"id": i, "name": f"product-{i}", "price": i / 100 + 1, "stock": i % 50}
+            for i in range(1, rows + 1)
+        ])
+        conn.execute(Order.__table__.insert(), [
+            {"id": i, "user_id": i, "product_id": i, "quantity": 1 + i % 5, "status": "CREATED"}
+            for i in range(1, rows + 1)
+        ])
+
+
+def per_1000(fn, rows: int, repeat: int) -> float:
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000 * 1000 / rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    use_temp_database()
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_model_field
+    from sqlalchemy import select
+    from sqlalchemy.orm import joinedload
+    from app.db.init_db import init_db
+    from app.db.session import SessionLocal, engine
+    from app.models import Order, Product, User
+    from app.schemas.order import OrderWithProductResponse, order_list_serializer
+    from app.schemas.product import ProductResponse, product_list_serializer
+    from app.schemas.user import UserResponse, user_list_serializer
+
+    init_db(engine)
+    _seed(engine, args.rows)
+    loop = asyncio.new_event_loop()
+    db = SessionLocal()
+
+    def default_path(model, response_class):
+        field = create_model_field(name="response", type_=List[model], mode="serialization")
+
+        def render(objects):
+            content = loop.run_until_complete(
+                serialize_response(field=field, response_content=objects, is_coroutine=True)
+            )
+            return response_class(content).body
+        return render
+
+    def load_objects(stmt):
+        def load():
+            db.expunge_all()
+            return db.scalars(stmt).all()
+        return load
+
+    def load_rows(stmt):
+        return lambda: db.execute(stmt).all()
+
+    cases = [
+        ("products", ProductResponse, product_list_serializer,
+         load_objects(select(Product).limit(args.rows)),
+         load_rows(select(*product_list_serializer.columns(Product)).limit(args.rows))),
+        ("users", UserResponse, user_list_serializer,
+         load_objects(select(User).limit(args.rows)),
+         load_rows(select(*user_list_serializer.columns(User)).limit(args.rows))),
+        ("orders", OrderWithProductResponse, order_list_serializer,
+         load_objects(select(Order).options(joinedload(Order.product)).limit(args.rows)),
+         None),
+    ]
+
+    print(f"ms per 1,000 rows ({args.rows} rows x {args.repeat})")
+    print(f"{'':10}{'default':>10}{'orjson':>10}{'fast':>10}   {'default+query':>14}{'fast+query':>12}")
+    for name, model, serializer, load, load_fast in cases:
+        default, orjson_default = default_path(model, JSONResponse), default_path(model, ORJSONResponse)
+        objects = load()
+        if load_fast is not None:
+            rows = load_fast()
+            fast = lambda: serializer.dump_rows(rows)
+            fast_query = lambda: serializer.dump_rows(load_fast())
+        else:
+            fast = lambda: serializer.dump_objects(objects)
+            fast_query = lambda: serializer.dump_objects(load())
+        timings = [
+            per_1000(lambda: default(objects), args.rows, args.repeat),
+            per_1000(lambda: orjson_default(objects), args.rows, args.repeat),
+            per_1000(fast, args.rows, args.repeat),
+            per_1000(lambda: default(load()), args.rows, args.repeat),
+            per_1000(fast_query, args.rows, args.repeat),
+        ]
+        print(f"{name:10}" + "".join(f"{t:10.2f}" for t in timings[:3])
+              + f"   {timings[3]:14.2f}{timings[4]:12.2f}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
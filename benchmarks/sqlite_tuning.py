@@ -0,0 +1,134 @@
+"""
+Mixed read/write throughput with and without the SQLite engine settings.
+
+Several processes (standing in for uvicorn workers), each with a few
+threads, run a mix of get_product_service and create_order_service calls
+against one SQLite file for a fixed duration. Three setups are compared:
+
+    default     create_engine(url) with stock settings
+    tuned       WAL, synchronous=NORMAL, busy_timeout, cache/mmap, foreign keys
+    serialized  tuned + in-process write serialization
+
+Usage:
+    python -m benchmarks.sqlite_tuning --processes 4 --threads 8 --seconds 5
+"""
+import argparse
+import multiprocessing as mp
+import os
+import random
+import tempfile
+import threading
+import time
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.db.session import create_db_engine
+from app.db.writer import serialize_writes
+from app.models import Product, User
+from app.schemas.order import OrderCreate
+from app.services.order import create_order_service
+from app.services.product import get_product_service
+
+SETUPS = ("default", "tuned", "serialized")
+PRODUCTS = 1000
+
+
+def _seed(url: str) -> None:
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add(User(id=1, username="bench", email="bench@example.com", password="x"))
+        db.add_all(
+            Product(id=i, name=f"product-{i}", price=1.0, stock=10**9)
+            for i in range(1, PRODUCTS + 1)
+        )
+        db.commit()
+    engine.dispose()
+
+
+def _worker(url: str, setup: str, threads: int, seconds: float, write_ratio: float, results) -> None:
+    if setup == "default":
+        engine = create_engine(url)
+    else:
+        engine = create_db_engine(url, sqlite_pragmas=True)
+    Session = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    if setup == "serialized":
+        serialize_writes(Session)
+
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def loop(seed: int):
+        rng = random.Random(seed)
+        reads = writes = errors = 0
+        while time.perf_counter() < deadline:
+            product_id = rng.randint(1, PRODUCTS)
+            with Session() as db:
+                try:
+                    if rng.random() < write_ratio:
+                        create_order_service(OrderCreate(user_id=1, product_id=product_id, quantity=1), db)
+                        writes += 1
+                    else:
+                        get_product_service(product_id, db)
+                        reads += 1
+                except (HTTPException, OperationalError):
+                    errors += 1
+        with lock:
+            counts["reads"] += reads
+            counts["writes"] += writes
+            counts["errors"] += errors
+
+    pool = [threading.Thread(target=loop, args=(os.getpid() * 100 + n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    engine.dispose()
+    results.put(counts)
+
+
+def run(setup: str, processes: int, threads: int, seconds: float, write_ratio: float, tmp: str) -> dict:
+    url = f"sqlite:///{os.path.join(tmp, setup + '.db')}"
+    _seed(url)
+    results = mp.Queue()
+    procs = [
+        mp.Process(target=_worker, args=(url, setup, threads, seconds, write_ratio, results))
+        for _ in range(processes)
+    ]
+    for proc in procs:
+        proc.start()
+    totals = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+
+    reads = sum(t["reads"] for t in totals)
+    writes = sum(t["writes"] for t in totals)
+    return {
+        "setup": setup,
+        "reads_per_sec": round(reads / seconds, 1),
+        "writes_per_sec": round(writes / seconds, 1),
+        "errors": sum(t["errors"] for t in totals),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--setup", choices=SETUPS, nargs="+", default=list(SETUPS))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for setup in args.setup:
+            print(run(setup, args.processes, args.threads, args.seconds, args.write_ratio, tmp))
+
+
+if __name__ == "__main__":
+    main()
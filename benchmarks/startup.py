@@ -0,0 +1,123 @@
+"""
+Worker cold start and import time of app.main.
+
+Each measurement runs in a fresh interpreter:
+  import        `import app.main` (what a test module pays)
+  build         `from app.main import app`, i.e. import plus building the app
+  cold start    from spawning a one-worker uvicorn until it answers GET /,
+                on a new database and on one that already has the schema
+  first query   the first GET /products/{id} after that, which needs a
+                pooled connection
+Reports the median of --runs.
+
+Usage:
+    python -m benchmarks.startup --runs 5
+"""
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.common import use_temp_database
+
+TIMED_IMPORT = """
+import time
+started = time.perf_counter()
+{statement}
+print(time.perf_counter() - started)
+"""
+
+
+def time_import(statement: str) -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", TIMED_IMPORT.format(statement=statement)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return float(out.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get(port: int, path: str, headers: dict = None) -> int:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        conn.request("GET", path, headers=headers or {})
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def cold_start(headers: dict) -> tuple:
+    """
+    Seconds from spawning uvicorn until GET / answers, and for the first
+    GET /products/1 after that.
+    """
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+    )
+    try:
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError("uvicorn exited during startup")
+            try:
+                if _get(port, "/") == 200:
+                    break
+            except OSError:
+                time.sleep(0.005)
+        ready = time.perf_counter() - started
+        started = time.perf_counter()
+        _get(port, "/products/1", headers)
+        return ready, time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = use_temp_database()
+    from app.utils import create_access_token
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': '1'})}"}
+    database = os.path.join(tmp, "bench.db")
+
+    def fresh_database():
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(database + suffix):
+                os.remove(database + suffix)
+
+    results = {
+        "import": [time_import("import app.main") for _ in range(args.runs)],
+        "build": [time_import("from app.main import app") for _ in range(args.runs)],
+    }
+    for name in ("cold start, new database", "cold start, existing schema"):
+        results[name], results[f"first query ({name.split(', ')[1]})"] = [], []
+        for _ in range(args.runs):
+            if name.endswith("new database"):
+                fresh_database()
+            ready, first = cold_start(headers)
+            results[name].append(ready)
+            results[f"first query ({name.split(', ')[1]})"].append(first)
+
+    for name, samples in results.items():
+        print(f"{name:36} {statistics.median(samples) * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
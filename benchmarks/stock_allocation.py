@@ -0,0 +1,183 @@
+"""
+Multi-location stock: allocation under concurrency, and its throughput.
+
+Seeds --products products stocked at each of --locations locations (--stock
+units apiece, random coordinates) and as many products with the same
+stock in products.stock alone. Then, for each allocation policy and for
+the single-stock products, --workers processes create --orders orders each
+through create_order_service: random quantities up to --max-quantity,
+shipped to random points, until the stock runs out. Afterwards no location
+may be below zero, each location must have lost exactly the units
+allocated from it, products.stock must be the sum of the product's
+locations, and every order's allocations must add up to its quantity.
+Prints orders/s, the share of split orders and SQL statements per order.
+
+Usage:
+    python -m benchmarks.stock_allocation --workers 4 --orders 2000 --locations 20
+"""
+import argparse
+import multiprocessing as mp
+import os
+import random
+import time
+
+from benchmarks.common import load_app, use_temp_database
+
+
+def _worker(policy: str, product_ids: list, attempts: int, max_quantity: int, seed: int, results) -> None:
+    from fastapi import HTTPException
+    from sqlalchemy import event
+    from sqlalchemy.exc import OperationalError
+    from app import config
+    from app.db.session import SessionLocal, engine
+    from app.schemas.order import OrderCreate, ShipTo
+    from app.services.order import create_order_service
+
+    engine.dispose(close=False)  # the parent's pooled connections stay its own
+    if policy != "single":
+        config.ALLOCATION_POLICY = policy
+    statements = [0]
+
+    def count(*_):
+        statements[0] += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    rng = random.Random(seed)
+    created = rejected = errors = created_statements = 0
+    for _ in range(attempts):
+        order_in = OrderCreate(
+            user_id=1,
+            product_id=rng.choice(product_ids),
+            quantity=rng.randint(1, max_quantity),
+            ship_to=ShipTo(latitude=rng.uniform(36, 60), longitude=rng.uniform(-9, 30))
+        )
+        before = statements[0]
+        with SessionLocal() as db:
+            try:
+                create_order_service(order_in, db)
+                created += 1
+                created_statements += statements[0] - before
+            except HTTPException as exc:
+                if exc.detail == "Insufficient stock":
+                    rejected += 1
+                else:
+                    errors += 1
+            except OperationalError:
+                errors += 1
+    results.put((created, rejected, errors, created_statements))
+
+
+def check(conn, located: list, single: list, stock: int, locations: int) -> dict:
+    """
+    Invariant violations after a run; all zero when allocation is sound.
+    """
+    from sqlalchemy import func, select
+    from app.models import Order, OrderAllocation, Product, StockLocation
+
+    allocated = (
+        select(func.coalesce(func.sum(OrderAllocation.quantity), 0))
+        .join(Order, Order.id == OrderAllocation.order_id)
+        .where(Order.product_id == StockLocation.product_id, OrderAllocation.location_id == StockLocation.location_id)
+        .scalar_subquery()
+    )
+    location_sum = (
+        select(func.sum(StockLocation.quantity)).where(StockLocation.product_id == Product.id).scalar_subquery()
+    )
+    order_allocated = (
+        select(func.coalesce(func.sum(OrderAllocation.quantity), 0))
+        .where(OrderAllocation.order_id == Order.id)
+        .scalar_subquery()
+    )
+    ordered = (
+        select(func.coalesce(func.sum(Order.quantity), 0)).where(Order.product_id == Product.id).scalar_subquery()
+    )
+    count = lambda stmt: conn.scalar(select(func.count()).select_from(stmt.subquery()))
+    return {
+        "negative_locations": count(select(StockLocation).where(StockLocation.quantity < 0)),
+        "location_mismatch": count(select(StockLocation).where(stock - StockLocation.quantity != allocated)),
+        "product_stock_mismatch": count(select(Product).where(Product.id.in_(located), Product.stock != location_sum)),
+        "order_allocation_mismatch": count(select(Order).where(Order.product_id.in_(located), Order.quantity != order_allocated)),
+        "single_stock_mismatch": count(
+            select(Product).where(Product.id.in_(single), stock * locations - Product.stock != ordered)
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--orders", type=int, default=2000, help="attempts per worker")
+    parser.add_argument("--products", type=int, default=10)
+    parser.add_argument("--locations", type=int, default=20)
+    parser.add_argument("--stock", type=int, default=200, help="units per product per location")
+    parser.add_argument("--max-quantity", type=int, default=10)
+    parser.add_argument("--policies", default="nearest,most_stock,fewest_splits")
+    args = parser.parse_args()
+
+    use_temp_database()
+    os.environ["SLOW_QUERY_MS"] = "0"
+    load_app()
+    from sqlalchemy import delete, func, insert, select, update
+    from app.db.session import engine
+    from app.models import Location, Order, OrderAllocation, Product, StockLocation, User
+
+    rng = random.Random(1)
+    located = list(range(1, args.products + 1))
+    single = list(range(args.products + 1, 2 * args.products + 1))
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "username": "bench", "email": "bench@example.com", "password": "x"}])
+        conn.execute(insert(Product), [
+            {"id": i, "name": f"product-{i}", "price": 1.0, "stock": args.stock * args.locations}
+            for i in located + single
+        ])
+        conn.execute(insert(Location), [
+            {"id": i, "name": f"warehouse-{i}", "latitude": rng.uniform(36, 60), "longitude": rng.uniform(-9, 30)}
+            for i in range(1, args.locations + 1)
+        ])
+        conn.execute(insert(StockLocation), [
+            {"product_id": p, "location_id": l, "quantity": args.stock}
+            for p in located for l in range(1, args.locations + 1)
+        ])
+
+    print(f"{'policy':>14} {'orders/s':>9} {'created':>8} {'rejected':>9} {'errors':>7} {'split':>6} "
+          f"{'stmts/order':>12}  invariants")
+    failures = []
+    for policy in args.policies.split(",") + ["single"]:
+        with engine.begin() as conn:
+            conn.execute(delete(OrderAllocation))
+            conn.execute(delete(Order))
+            conn.execute(update(StockLocation).values(quantity=args.stock))
+            conn.execute(update(Product).values(stock=args.stock * args.locations))
+        engine.dispose()
+
+        results = mp.Queue()
+        product_ids = single if policy == "single" else located
+        procs = [
+            mp.Process(target=_worker, args=(policy, product_ids, args.orders, args.max_quantity, seed, results))
+            for seed in range(args.workers)
+        ]
+        started = time.perf_counter()
+        for proc in procs:
+            proc.start()
+        totals = [results.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+        elapsed = time.perf_counter() - started
+
+        created, rejected, errors, statements = (sum(t[i] for t in totals) for i in range(4))
+        with engine.connect() as conn:
+            splits = conn.scalar(select(func.count()).select_from(
+                select(OrderAllocation.order_id).group_by(OrderAllocation.order_id)
+                .having(func.count() > 1).subquery()
+            ))
+            violations = check(conn, located, single, args.stock, args.locations)
+        ok = not any(violations.values())
+        if not ok:
+            failures.append((policy, violations))
+        print(f"{policy:>14} {created / elapsed:9.0f} {created:8} {rejected:9} {errors:7} "
+              f"{splits / max(created, 1):6.1%} {statements / max(created, 1):12.2f}  {'ok' if ok else violations}")
+    assert not failures, failures
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+"""
+Load/benchmark suite covering every endpoint in app/routers.
+
+Seeds a fresh SQLite database with --users, --products and --orders rows,
+then runs one scenario per endpoint: --warmup uncounted requests, then
+--requests requests from --concurrency clients, either straight into the
+ASGI app (--target asgi, the default) or over HTTP against uvicorn with
+--workers processes (--target uvicorn). Prints a JSON report with
+throughput and p50/p95/p99 per scenario.
+
+With --baseline FILE the run is compared to an earlier report: scenarios
+whose p99 grew or whose throughput dropped by more than --tolerance, or
+that returned more errors, are listed on stderr and the exit code is 1.
+--save FILE writes the report, e.g. to record a new baseline.
+
+Usage:
+    python -m benchmarks.suite --save baseline.json
+    python -m benchmarks.suite --baseline baseline.json --tolerance 0.25
+    python -m benchmarks.suite --target uvicorn --workers 4 --scenarios orders.create auth.login
+"""
+import argparse
+import asyncio
+import http.client
+import itertools
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from benchmarks.common import asgi_request, load_app, summarize, use_temp_database
+
+ADJECTIVES = ["blue", "red", "steel", "heavy", "compact", "wireless", "smart", "mini", "pro", "classic"]
+NOUNS = ["widget", "gadget", "bolt", "pallet", "crate", "scanner", "drill", "cable", "sensor", "label"]
+LOGIN_EMAIL = "user1@example.com"
+LOGIN_PASSWORD = "bench-password"
+LOCATIONS = 5
+
+
+class Scenario:
+    """
+    One endpoint under load. `path` and `body` are called with the request
+    number (0-based); `body` returns a JSON-able object, or bytes sent as-is
+    with `content_type`.
+    """
+
+    def __init__(self, name, method, path, body=None, expect=(200,), max_requests=None, content_type=None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.body = body
+        self.expect = expect
+        # cap for scenarios that are slow by design (bcrypt)
+        self.max_requests = max_requests
+        self.content_type = content_type
+
+    def request(self, n: int):
+        """
+        (method, path, body bytes, extra headers) of request n.
+        """
+        headers = {}
+        body = self.body(n) if self.body else None
+        if body is not None and not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        elif body is not None:
+            headers["Content-Type"] = self.content_type
+        return self.method, self.path(n), body, headers
+
+
+def _product_csv(n: int) -> bytes:
+    lines = ["name,price,stock"] + [f"imported {n}-{i},{i % 90 + 1}.5,{i % 40}" for i in range(100)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def build_scenarios(users: int, products: int, orders: int, disposable: int):
+    """
+    Every endpoint, reads first. Rows above users/products/orders up to
+    `disposable` more are seeded for the DELETE scenarios only.
+    """
+    statuses = ["SHIPPED", "DELIVERED"]
+    searches = [
+        lambda n: f"name_prefix={ADJECTIVES[n % 10].title()}%20{NOUNS[n // 10 % 10]}&sort=name",
+        lambda n: f"q={ADJECTIVES[n % 10]}%20{NOUNS[n // 10 % 10]}",
+        lambda n: f"min_price={n % 900 + 1}&max_price={n % 900 + 51}&sort=price",
+        lambda n: "in_stock=true&sort=-price",
+    ]
+    return [
+        Scenario("health", "GET", lambda n: "/"),
+        Scenario("auth.login", "POST", lambda n: "/auth/login",
+                 lambda n: {"email": LOGIN_EMAIL, "password": LOGIN_PASSWORD}, max_requests=50),
+
+        Scenario("users.get", "GET", lambda n: f"/users/{n % users + 1}"),
+        Scenario("users.list", "GET", lambda n: f"/users/?limit=50&skip={n % 10 * 50}"),
+        # the suite's token is user 1's, and users only list their own orders
+        Scenario("users.orders", "GET", lambda n: "/users/1/orders?limit=20"),
+        Scenario("users.export", "GET", lambda n: "/users/export", max_requests=20),
+
+        Scenario("products.get", "GET", lambda n: f"/products/{n % products + 1}"),
+        Scenario("products.list", "GET", lambda n: f"/products/?limit=50&{searches[n % len(searches)](n)}"),
+        Scenario("products.locations", "GET", lambda n: f"/products/{n % products + 1}/locations"),
+        Scenario("locations.list", "GET", lambda n: "/locations/"),
+
+        Scenario("orders.get", "GET", lambda n: f"/orders/{n % orders + 1}"),
+        Scenario("orders.list", "GET", lambda n: f"/orders/?limit=50&status={statuses[n % 2]}"),
+        Scenario("orders.export", "GET", lambda n: "/orders/export?format=csv&until_id=1000", max_requests=20),
+
+        Scenario("analytics.top_products", "GET", lambda n: f"/analytics/top-products?limit=10&days={(7, 30, 365)[n % 3]}"),
+        Scenario("analytics.daily_volume", "GET", lambda n: f"/analytics/daily-volume?days={(7, 30, 365)[n % 3]}"),
+        Scenario("analytics.status_mix", "GET", lambda n: "/analytics/status-mix"),
+
+        Scenario("users.create", "POST", lambda n: "/users/",
+                 lambda n: {"username": f"new{n}", "email": f"new{n}@example.com", "password": "secret"},
+                 expect=(201,), max_requests=50),
+        Scenario("users.update", "PUT", lambda n: f"/users/{n % users + 1}",
+                 lambda n: {"username": f"user{n % users + 1}-{n}"}),
+        Scenario("products.create", "POST", lambda n: "/products/",
+                 lambda n: {"name": f"created {n}", "price": 9.5, "stock": 10}, expect=(201,)),
+        Scenario("products.update", "PUT", lambda n: f"/products/{n % products + 1}",
+                 lambda n: {"price": n % 500 + 1.25}),
+        Scenario("products.import", "POST", lambda n: "/products/import", _product_csv,
+                 content_type="text/csv", max_requests=50),
+        Scenario("locations.set_stock", "PUT",
+                 lambda n: f"/locations/{n % LOCATIONS + 1}/stock/{products + n % disposable + 1}",
+                 lambda n: {"quantity": n % 100}),
+        Scenario("orders.create", "POST", lambda n: "/orders/",
+                 lambda n: {"user_id": n % users + 1, "product_id": n % products + 1, "quantity": 1},
+                 expect=(201,)),
+        Scenario("orders.batch", "POST", lambda n: "/orders/batch",
+                 lambda n: {"mode": "best_effort", "orders": [
+                     {"user_id": (n + i) % users + 1, "product_id": (n * 10 + i) % products + 1, "quantity": 1}
+                     for i in range(10)
+                 ]}, expect=(201,)),
+        Scenario("orders.update", "PUT", lambda n: f"/orders/{n % orders + 1}",
+                 lambda n: {"status": statuses[n % 2]}),
+        Scenario("orders.bulk_status", "POST", lambda n: "/orders/batch/status",
+                 lambda n: {"status": statuses[n % 2],
+                            "ids": [(n * 100 + i) % orders + 1 for i in range(100)]}),
+
+        Scenario("orders.delete", "DELETE", lambda n: f"/orders/{orders + n % disposable + 1}"),
+        Scenario("products.delete", "DELETE", lambda n: f"/products/{products + n % disposable + 1}"),
+        Scenario("users.delete", "DELETE", lambda n: f"/users/{users + n % disposable + 1}"),
+    ]
+
+
+def seed(engine, users: int, products: int, orders: int, disposable: int, rng: random.Random) -> None:
+    from app.models import Location, Order, Product, User
+    from app.utils import get_password_hash
+
+    batch = 50000
+    now = time.time()
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {
+                "id": i,
+                "username": f"user{i}",
+                "email": f"user{i}@example.com",
+                "password": get_password_hash(LOGIN_PASSWORD) if i == 1 else "x",
+            }
+            for i in range(1, users + disposable + 1)
+        ])
+        for start in range(1, products + disposable + 1, batch):
+            conn.execute(Product.__table__.insert(), [
+                {
+                    "id": i,
+                    "name": f"{rng.choice(ADJECTIVES).title()} {rng.choice(NOUNS)} {i}",
+                    "price": round(rng.uniform(1, 1000), 2),
+                    "stock": 10 ** 9,
+                }
+                for i in range(start, min(start + batch, products + disposable + 1))
+            ])
+        # stocked per location only by locations.set_stock, on disposable products
+        conn.execute(Location.__table__.insert(), [
+            {"id": i, "name": f"warehouse-{i}", "latitude": rng.uniform(36, 60), "longitude": rng.uniform(-9, 30)}
+            for i in range(1, LOCATIONS + 1)
+        ])
+        # orders spread over the last year for the analytics windows;
+        # disposable orders belong to regular users and products, so deleting
+        # the disposable users and products never cascades into them
+        for start in range(1, orders + disposable + 1, batch):
+            conn.execute(Order.__table__.insert(), [
+                {
+                    "id": i,
+                    "user_id": rng.randint(1, users),
+                    "product_id": rng.randint(1, products),
+                    "quantity": rng.randint(1, 5),
+                    "status": rng.choice(["CREATED", "SHIPPED", "DELIVERED", "CANCELLED"]),
+                    "created_at": now - rng.random() * 365 * 86400,
+                }
+                for i in range(start, min(start + batch, orders + disposable + 1))
+            ])
+
+
+async def run_asgi(app, scenario: Scenario, requests: int, concurrency: int, auth: dict, warmup: int = 0) -> dict:
+    # warmup requests are numbered after the measured ones, so every request
+    # still gets its own number (and its own disposable row)
+    for n in range(requests, requests + warmup):
+        method, path, body, headers = scenario.request(n)
+        await asgi_request(app, method, path, headers={**auth, **headers}, body=body)
+
+    counter = itertools.count()
+    latencies, codes = [], {}
+
+    async def client():
+        while (n := next(counter)) < requests:
+            method, path, body, headers = scenario.request(n)
+            started = time.perf_counter()
+            status_code, _, _ = await asgi_request(app, method, path, headers={**auth, **headers}, body=body)
+            latencies.append(time.perf_counter() - started)
+            codes[status_code] = codes.get(status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return _stats(scenario, latencies, codes, time.perf_counter() - started)
+
+
+def run_http(port: int, scenario: Scenario, requests: int, concurrency: int, auth: dict, warmup: int = 0) -> dict:
+    counter = itertools.count()
+    latencies, codes = [], {}
+
+    def send(conn, n: int):
+        method, path, body, headers = scenario.request(n)
+        conn.request(method, path, body=body, headers={**auth, **headers})
+        response = conn.getresponse()
+        response.read()
+        return response.status
+
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    for n in range(requests, requests + warmup):
+        send(conn, n)
+    conn.close()
+
+    def client():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        try:
+            while (n := next(counter)) < requests:
+                started = time.perf_counter()
+                status_code = send(conn, n)
+                latencies.append(time.perf_counter() - started)
+                codes[status_code] = codes.get(status_code, 0) + 1
+        finally:
+            conn.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(client) for _ in range(concurrency)]:
+            future.result()
+    return _stats(scenario, latencies, codes, time.perf_counter() - started)
+
+
+def _stats(scenario: Scenario, latencies, codes: dict, elapsed: float) -> dict:
+    stats = summarize(latencies, elapsed)
+    stats["errors"] = sum(count for code, count in codes.items() if code not in scenario.expect)
+    stats["status_codes"] = {str(code): count for code, count in sorted(codes.items())}
+    return stats
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_uvicorn(workers: int, port: int) -> subprocess.Popen:
+    """
+    Serve app.main:app from a uvicorn subprocess on the seeded database
+    (the environment is inherited) and wait until it answers.
+    """
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/")
+            if conn.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("uvicorn did not start within 60s")
+
+
+def compare(report: dict, baseline: dict, tolerance: float, min_delta_ms: float):
+    """
+    Regressions of `report` against `baseline`, one line each. p99 only
+    counts when it also grew by more than min_delta_ms, so sub-millisecond
+    noise on fast endpoints is not flagged.
+    """
+    regressions = []
+    for name, stats in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        p99, base_p99 = stats["p99_ms"], base["p99_ms"]
+        if p99 > base_p99 * (1 + tolerance) and p99 - base_p99 > min_delta_ms:
+            regressions.append(f"{name}: p99 {base_p99}ms -> {p99}ms")
+        rps, base_rps = stats["throughput_rps"], base["throughput_rps"]
+        if rps < base_rps * (1 - tolerance):
+            regressions.append(f"{name}: throughput {base_rps} -> {rps} req/s")
+        if stats["errors"] > base.get("errors", 0):
+            regressions.append(f"{name}: errors {base.get('errors', 0)} -> {stats['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--warmup", type=int, default=5, help="uncounted requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--target", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (--target uvicorn)")
+    parser.add_argument("--db-mode", choices=["sync", "async"], default=os.getenv("DB_MODE", "sync"))
+    parser.add_argument("--scenarios", nargs="+", help="only these scenarios (default: all)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="compare against this earlier report")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    use_temp_database()
+    os.environ["DB_MODE"] = args.db_mode
+    from app.db.init_db import init_db
+    from app.db.session import engine
+    from app.utils import create_access_token
+
+    disposable = args.requests + args.warmup
+    init_db(engine)
+    seed(engine, args.users, args.products, args.orders, disposable, random.Random(args.seed))
+    scenarios = build_scenarios(args.users, args.products, args.orders, disposable)
+    if args.scenarios:
+        unknown = set(args.scenarios) - {scenario.name for scenario in scenarios}
+        if unknown:
+            parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+        scenarios = [scenario for scenario in scenarios if scenario.name in args.scenarios]
+    auth = {"Authorization": f"Bearer {create_access_token({'sub': '1'})}"}
+
+    def requests_for(scenario: Scenario) -> int:
+        return min(args.requests, scenario.max_requests or args.requests)
+
+    results = {}
+    if args.target == "asgi":
+        app = load_app()
+
+        async def run_all():
+            # one event loop for every scenario, the async pool is bound to it
+            for scenario in scenarios:
+                results[scenario.name] = await run_asgi(
+                    app, scenario, requests_for(scenario), args.concurrency, auth, args.warmup
+                )
+
+        asyncio.run(run_all())
+    else:
+        engine.dispose()
+        port = _free_port()
+        server = start_uvicorn(args.workers, port)
+        try:
+            for scenario in scenarios:
+                results[scenario.name] = run_http(
+                    port, scenario, requests_for(scenario), args.concurrency, auth, args.warmup
+                )
+        finally:
+            server.terminate()
+            server.wait()
+
+    report = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "target": args.target,
+            "workers": args.workers if args.target == "uvicorn" else None,
+            "db_mode": args.db_mode,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "volumes": {"users": args.users, "products": args.products, "orders": args.orders},
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance, args.min_delta_ms)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions against {args.baseline}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
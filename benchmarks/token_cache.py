@@ -0,0 +1,67 @@
+"""
+Authenticated request overhead with the verified-token cache on and off.
+
+Measures verify_jwt_token on its own, then GET /products/{id} through the
+ASGI app with the same bearer token, first with JWT_CACHE_ENABLED off and
+then on.
+
+Usage:
+    python -m benchmarks.token_cache --calls 20000 --requests 2000
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import asgi_request, load_app, summarize, use_temp_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    use_temp_database()
+    from app import config
+    app = load_app()
+    from app.db.session import SessionLocal
+    from app.models import Product
+    from app.utils import create_access_token, verify_jwt_token, token_cache
+
+    with SessionLocal() as db:
+        db.add(Product(id=1, name="product-1", price=1.0, stock=1))
+        db.commit()
+    token = create_access_token({"sub": "1"})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def requests():
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            t = time.perf_counter()
+            status_code, _, _ = await asgi_request(app, "GET", "/products/1", headers=headers)
+            latencies.append(time.perf_counter() - t)
+            assert status_code == 200, status_code
+        return summarize(latencies, time.perf_counter() - started)
+
+    for enabled in (False, True):
+        config.JWT_CACHE_ENABLED = enabled
+        token_cache.clear()
+
+        started = time.perf_counter()
+        for _ in range(args.calls):
+            verify_jwt_token(token)
+        per_call_us = (time.perf_counter() - started) / args.calls * 1e6
+
+        stats = asyncio.run(requests())
+        print({
+            "cache": "on" if enabled else "off",
+            "verify_us_per_call": round(per_call_us, 2),
+            "request_mean_ms": stats["mean_ms"],
+            "request_p99_ms": stats["p99_ms"],
+            "hit_rate": token_cache.stats()["hit_rate"],
+        })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Offset vs keyset paging latency on a large users table.
+
+Seeds --rows users (1M by default) and times get_all_users_service for the
+same page fetched with skip= (offset) and with a cursor (keyset), plus a
+full NDJSON export through export_users_service.
+
+Usage:
+    python -m benchmarks.user_paging --rows 1000000 --limit 100 --pages 1 100 1000 5000
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.common import use_temp_database
+
+
+def _seed(engine, rows: int) -> None:
+    from app.models import User
+
+    batch = 50000
+    with engine.begin() as conn:
+        for start in range(1, rows + 1, batch):
+            conn.execute(
+                User.__table__.insert(),
+                [
+                    {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "password": "x"}
+                    for i in range(start, min(start + batch, rows + 1))
+                ],
+            )
+
+
+def _time(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    use_temp_database()
+    from app.db.base import Base
+    from app.db.session import SessionLocal, engine
+    from app.pagination import encode_cursor
+    from app.services.user import export_users_service, get_all_users_service
+
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    _seed(engine, args.rows)
+    print(f"seeded {args.rows} users in {time.perf_counter() - started:.1f}s")
+
+    with SessionLocal() as db:
+        for page in args.pages:
+            skip = (page - 1) * args.limit
+            if skip >= args.rows:
+                continue
+            # ids are dense, so the cursor of page N points after id (N-1)*limit
+            cursor = encode_cursor(skip) if skip else None
+            offset_page, _ = get_all_users_service(db, skip=skip, limit=args.limit)
+            keyset_page, _ = get_all_users_service(db, limit=args.limit, cursor=cursor)
+            assert [u.id for u in offset_page] == [u.id for u in keyset_page]
+
+            offset_ms = _time(lambda: get_all_users_service(db, skip=skip, limit=args.limit), args.repeat)
+            keyset_ms = _time(lambda: get_all_users_service(db, limit=args.limit, cursor=cursor), args.repeat)
+            db.expunge_all()
+            print(f"page={page:>5} offset={offset_ms}ms keyset={keyset_ms}ms")
+
+    started = time.perf_counter()
+    lines = sum(chunk.count("\n") for chunk in export_users_service(5000))
+    print(f"export {lines} users as NDJSON in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
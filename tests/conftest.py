@@ -0,0 +1,60 @@
+"""
+The app on a fresh SQLite file per test session. app.config reads the
+environment at import time, so it is set before anything from app is
+imported. Tests share the database; each one creates the rows it needs.
+"""
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="wms-test")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'test.db')}"
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+os.environ.setdefault("DB_MODE", "sync")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import itertools  # noqa: E402
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+_ids = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def db(client):
+    from app.db.session import SessionLocal
+
+    with SessionLocal() as session:
+        yield session
+
+
+@pytest.fixture
+def unique_name():
+    """
+    Names for rows with unique columns, distinct across the session.
+    """
+    return lambda prefix: f"{prefix}-{next(_ids)}"
+
+
+@pytest.fixture
+def make_user(client):
+    """
+    Registers a user and returns (user_id, Authorization headers).
+    """
+    def make():
+        n = next(_ids)
+        email = f"user{n}@example.com"
+        response = client.post("/users/", json={"username": f"user{n}", "email": email, "password": "pw"})
+        assert response.status_code == 201, response.text
+        token = client.post("/auth/login", json={"email": email, "password": "pw"}).json()["access_token"]
+        return response.json()["id"], {"Authorization": f"Bearer {token}"}
+
+    return make
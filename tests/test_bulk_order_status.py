@@ -0,0 +1,63 @@
+"""
+POST /orders/batch/status: cancelled orders stay cancelled.
+"""
+import pytest
+
+
+@pytest.fixture
+def orders(client, make_user, unique_name):
+    user_id, headers = make_user()
+    product = client.post(
+        "/products/", json={"name": unique_name("bulk"), "price": 1.0, "stock": 10}, headers=headers
+    ).json()
+    order_ids = []
+    for _ in range(3):
+        created = client.post(
+            "/orders/", json={"user_id": user_id, "product_id": product["id"], "quantity": 1}, headers=headers
+        )
+        assert created.status_code == 201, created.text
+        order_ids.append(created.json()["id"])
+    cancelled = client.post("/orders/batch/status", json={"status": "CANCELLED", "ids": order_ids[:1]}, headers=headers)
+    assert cancelled.json()["updated"] == order_ids[:1]
+    return user_id, product["id"], order_ids, headers
+
+
+def stock(client, product_id, headers):
+    return client.get(f"/products/{product_id}", headers=headers).json()["stock"]
+
+
+@pytest.mark.parametrize("target", ["SHIPPED", "DELIVERED", "CREATED"])
+def test_cancelled_orders_are_rejected_by_id(client, orders, target):
+    _, product_id, order_ids, headers = orders
+    before = stock(client, product_id, headers)
+
+    response = client.post("/orders/batch/status", json={"status": target, "ids": order_ids + [0]}, headers=headers)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    expected_updated = [] if target == "CREATED" else order_ids[1:]
+    assert body["updated"] == expected_updated
+    assert body["rejected"] == [
+        {"id": 0, "detail": "Order not found"},
+        {"id": order_ids[0], "detail": "Order is cancelled"},
+    ]
+    assert client.get(f"/orders/{order_ids[0]}", headers=headers).json()["status"] == "CANCELLED"
+    assert stock(client, product_id, headers) == before
+
+
+def test_cancelled_orders_are_rejected_by_filter(client, orders):
+    _, product_id, order_ids, headers = orders
+
+    response = client.post(
+        "/orders/batch/status", json={"status": "SHIPPED", "filter": {"product_id": product_id}}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["updated"] == order_ids[1:]
+    assert body["rejected"] == [{"id": order_ids[0], "detail": "Order is cancelled"}]
+
+
+def test_cancelling_again_leaves_them_unchanged(client, orders):
+    _, _, order_ids, headers = orders
+
+    body = client.post("/orders/batch/status", json={"status": "CANCELLED", "ids": order_ids[:1]}, headers=headers).json()
+    assert body == {"updated": [], "unchanged": order_ids[:1], "rejected": []}
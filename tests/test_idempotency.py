@@ -0,0 +1,98 @@
+"""
+Idempotency-Key on POST /orders/ (app/services/idempotency.py).
+"""
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import insert, select
+
+from app import config
+from app.models import IdempotencyKey, Order, Product
+from app.services import idempotency
+from app.services.idempotency import REPLAYED_HEADER, claim_idempotency_key
+
+
+@pytest.fixture
+def order_target(client, make_user, unique_name):
+    user_id, headers = make_user()
+    product = client.post(
+        "/products/", json={"name": unique_name("idempotent"), "price": 1.0, "stock": 10}, headers=headers
+    )
+    assert product.status_code == 201, product.text
+    return user_id, product.json()["id"], headers
+
+
+def _post(client, headers, key: str, **order):
+    return client.post("/orders/", json=order, headers={**headers, "Idempotency-Key": key})
+
+
+def test_replay_returns_the_stored_response(client, db, order_target):
+    user_id, product_id, headers = order_target
+    first = _post(client, headers, "replay", user_id=user_id, product_id=product_id, quantity=2)
+    second = _post(client, headers, "replay", user_id=user_id, product_id=product_id, quantity=2)
+
+    assert first.status_code == second.status_code == 201
+    assert second.json() == first.json()
+    assert REPLAYED_HEADER not in first.headers
+    assert second.headers[REPLAYED_HEADER] == "true"
+    assert db.scalars(select(Order.id).where(Order.product_id == product_id)).all() == [first.json()["id"]]
+    assert db.get(Product, product_id).stock == 8
+
+
+def test_same_key_with_another_request_is_rejected(client, order_target):
+    user_id, product_id, headers = order_target
+    assert _post(client, headers, "mismatch", user_id=user_id, product_id=product_id, quantity=1).status_code == 201
+
+    response = _post(client, headers, "mismatch", user_id=user_id, product_id=product_id, quantity=3)
+    assert response.status_code == 422
+    assert "different request" in response.json()["detail"]
+
+
+def test_failed_request_releases_its_key(client, db, order_target):
+    user_id, product_id, headers = order_target
+    failed = _post(client, headers, "release", user_id=user_id, product_id=product_id, quantity=50)
+    assert failed.status_code == 400
+    assert db.scalar(select(IdempotencyKey).where(IdempotencyKey.key.endswith(":release"))) is None
+
+    # the retry runs for real instead of replaying the failure
+    retried = _post(client, headers, "release", user_id=user_id, product_id=product_id, quantity=5)
+    assert retried.status_code == 201
+    assert REPLAYED_HEADER not in retried.headers
+
+
+def test_duplicate_of_a_running_request_in_another_worker_gets_409(db, monkeypatch):
+    monkeypatch.setattr(config, "IDEMPOTENCY_LOCK_TIMEOUT", 0.2)
+    # the row another worker claimed and has not completed yet
+    db.execute(insert(IdempotencyKey).values(key="other-worker", request_hash="h", created_at=time.time()))
+    db.commit()
+
+    with pytest.raises(HTTPException) as exc:
+        claim_idempotency_key("other-worker", "h", db)
+    assert exc.value.status_code == 409
+    assert "still in progress" in exc.value.detail
+
+
+def test_duplicate_of_a_running_request_in_this_worker_gets_409(db, monkeypatch):
+    monkeypatch.setattr(config, "IDEMPOTENCY_LOCK_TIMEOUT", 0.2)
+    assert claim_idempotency_key("same-worker", "h", db) is None
+    try:
+        with pytest.raises(HTTPException) as exc:
+            claim_idempotency_key("same-worker", "h", db)
+        assert exc.value.status_code == 409
+    finally:
+        idempotency.finish_idempotency_key("same-worker", db, failed=True)
+
+
+def test_local_duplicate_waits_for_the_first_response(db):
+    assert claim_idempotency_key("waiting", "h", db) is None
+    replays = []
+    duplicate = threading.Thread(target=lambda: replays.append(claim_idempotency_key("waiting", "h", db)))
+    duplicate.start()
+
+    idempotency.record_response("waiting", 201, '{"id": 1}')
+    idempotency.end_claim("waiting", failed=False)
+    duplicate.join()
+    assert replays[0].status_code == 201
+    assert replays[0].body == b'{"id": 1}'
@@ -0,0 +1,62 @@
+"""
+Order listings: one statement per page, and /users/{user_id}/orders
+only for that user's own token.
+"""
+import pytest
+from sqlalchemy import event
+
+from app.db.session import engine
+from app.services.order import list_orders_service
+
+
+@pytest.fixture
+def user_with_orders(client, make_user, unique_name):
+    user_id, headers = make_user()
+    for i in range(3):
+        product = client.post(
+            "/products/", json={"name": unique_name("listed"), "price": 1.0 + i, "stock": 10}, headers=headers
+        ).json()
+        for _ in range(2):
+            created = client.post(
+                "/orders/", json={"user_id": user_id, "product_id": product["id"], "quantity": 1}, headers=headers
+            )
+            assert created.status_code == 201, created.text
+    return user_id, headers
+
+
+@pytest.fixture
+def statements():
+    executed = []
+
+    def count(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    yield executed
+    event.remove(engine, "before_cursor_execute", count)
+
+
+def test_list_orders_stmt_reads_a_page_with_its_products_in_one_statement(db, user_with_orders, statements):
+    user_id, _ = user_with_orders
+    for limit in (2, 6):
+        statements.clear()
+        page, _ = list_orders_service(db, limit=limit, user_id=user_id)
+        # reading the products must not load them one by one
+        assert all(order.product.name for order in page)
+        assert len(page) == limit
+        assert len(statements) == 1, statements
+
+
+def test_user_orders_for_the_callers_own_token(client, user_with_orders):
+    user_id, headers = user_with_orders
+    response = client.get(f"/users/{user_id}/orders", params={"limit": 10}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == 6
+    assert {order["user_id"] for order in response.json()} == {user_id}
+
+
+def test_user_orders_with_another_users_token(client, user_with_orders, make_user):
+    user_id, _ = user_with_orders
+    _, other_headers = make_user()
+    assert client.get(f"/users/{user_id}/orders", headers=other_headers).status_code == 403
+    assert client.get(f"/users/{user_id}/orders").status_code == 401
@@ -0,0 +1,56 @@
+"""
+POST /products/import and the streaming parser behind it.
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.product_import import IMPORT_MAX_LINE_LENGTH, ImportRejected, import_products
+
+
+async def _body(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+def test_import_reports_errors_in_line_order():
+    async def write_chunk(rows):
+        if any(name == "rejected" for _, name, _, _ in rows):
+            raise ImportRejected("rejected by the test")
+
+    body = b"name,price,stock\nrejected,1,1\nok,1,1\nok,1,1\nbad,x,1\n"
+    report = asyncio.run(import_products(_body(body), "csv", write_chunk, chunk_size=2))
+
+    # line 2 fails on the row-by-row retry of the first chunk, after line 5
+    # failed validation in the second
+    assert [error.line for error in report.errors] == [2, 5]
+    assert (report.received, report.imported, report.failed) == (4, 2, 2)
+
+
+def test_line_longer_than_the_limit_fails_the_import(client, make_user):
+    _, headers = make_user()
+    body = b"name,price,stock\n" + b"x" * (IMPORT_MAX_LINE_LENGTH + 1)
+    response = client.post(
+        "/products/import", content=body, headers={**headers, "Content-Type": "text/csv"}
+    )
+    assert response.status_code == 413
+    assert response.json()["detail"].startswith("Line 2 ")
+
+
+def test_long_line_without_newline_is_refused_as_it_streams():
+    async def write_chunk(rows):
+        raise AssertionError("nothing to write")
+
+    # no newline ever arrives: the parser must not keep buffering
+    chunks = (b"y" * 1024 for _ in range(10 * IMPORT_MAX_LINE_LENGTH // 1024))
+
+    async def body():
+        for chunk in chunks:
+            yield chunk
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(import_products(body(), "ndjson", write_chunk))
+    assert exc.value.status_code == 413
+    # it stopped one chunk past the limit
+    assert sum(1 for _ in chunks) == 9 * IMPORT_MAX_LINE_LENGTH // 1024 - 1
@@ -0,0 +1,27 @@
+"""
+GET /products/ name prefix search.
+"""
+import pytest
+from sqlalchemy import text
+
+from app.db.session import engine
+from app.services.product import list_products_stmt
+
+
+@pytest.mark.parametrize("sort", ["name", "id", "-price"])
+def test_name_prefix_is_a_range_on_the_name_index(client, sort):
+    stmt, _ = list_products_stmt("sqlite", name_prefix="sku-1", sort=sort)
+    compiled = stmt.compile(engine, compile_kwargs={"literal_binds": True})
+    with engine.connect() as conn:
+        plan = " ".join(row.detail for row in conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}")))
+    assert "USING INDEX ix_products_name (name>? AND name<?)" in plan
+
+
+def test_name_prefix_ending_before_the_surrogates(client, make_user):
+    _, headers = make_user()
+    name = "prefix-퟿-search"
+    assert client.post("/products/", json={"name": name, "price": 1.0, "stock": 1}, headers=headers).status_code == 201
+
+    response = client.get("/products/", params={"name_prefix": "prefix-퟿", "limit": 5}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert [product["name"] for product in response.json()] == [name]
@@ -0,0 +1,78 @@
+"""
+Sampled cProfile traces (PROFILE_SAMPLE_RATE) in app/profiling.py.
+"""
+import asyncio
+import contextvars
+import threading
+
+import pytest
+
+from app import config
+from app.profiling import finish_request, profile_endpoint, start_request
+
+
+@pytest.fixture
+def sample_every_request(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "PROFILE_SAMPLE_RATE", 1)
+    monkeypatch.setattr(config, "PROFILE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _in_threadpool(func):
+    # like run_in_threadpool: another thread, the request's context
+    result = []
+    context = contextvars.copy_context()
+    thread = threading.Thread(target=lambda: result.append(context.run(func)))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_sync_endpoint_is_profiled_in_its_own_thread(sample_every_request):
+    endpoint = profile_endpoint(lambda: sum(range(1000)))
+    profile, token = start_request("GET", "/products/{product_id}")
+    assert _in_threadpool(endpoint) == 499500
+    finish_request(profile, token)
+
+    traces = list(sample_every_request.iterdir())
+    assert len(traces) == 1 and traces[0].name.endswith("-GET-products_product_id.prof")
+
+
+def test_async_endpoint_is_profiled(sample_every_request):
+    async def endpoint():
+        await asyncio.sleep(0)
+        return "ok"
+
+    async def request():
+        profile, token = start_request("GET", "/")
+        try:
+            return await profile_endpoint(endpoint)()
+        finally:
+            finish_request(profile, token)
+
+    assert asyncio.run(request()) == "ok"
+    assert len(list(sample_every_request.iterdir())) == 1
+
+
+def test_sample_due_while_another_runs_is_skipped(sample_every_request):
+    endpoint = profile_endpoint(lambda: None)
+    first, first_token = start_request("GET", "/first")
+    second, _ = _in_threadpool(lambda: start_request("GET", "/second"))
+    assert first.sampled and not second.sampled
+
+    _in_threadpool(endpoint)
+    finish_request(first, first_token)
+    # the sampling slot is free again
+    third, third_token = start_request("GET", "/third")
+    assert third.sampled
+    finish_request(third, third_token)
+    assert len(list(sample_every_request.iterdir())) == 1
+
+
+def test_sampled_request_that_never_reaches_its_endpoint_frees_the_slot(sample_every_request):
+    profile, token = start_request("POST", "/orders/")
+    finish_request(profile, token)
+    again, again_token = start_request("POST", "/orders/")
+    assert again.sampled
+    finish_request(again, again_token)
+    assert list(sample_every_request.iterdir()) == []
@@ -0,0 +1,152 @@
+"""
+Orders on products kept per location, placed from several threads at
+once, and the invariants the stock must keep afterwards (see
+benchmarks/stock_allocation.py for the same run at scale).
+"""
+import random
+import threading
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, insert, select
+
+from app import config
+from app.db.session import SessionLocal
+from app.models import Location, Order, OrderAllocation, Product, StockLocation
+from app.schemas.order import OrderCreate, ShipTo
+from app.services.order import create_order_service
+
+LOCATIONS = 3
+STOCK = 20  # units per product per location
+
+
+def violations(db, product_ids: list) -> dict:
+    """
+    Invariant violations among the products' rows; all zero when
+    allocation is sound.
+    """
+    allocated = (
+        select(func.coalesce(func.sum(OrderAllocation.quantity), 0))
+        .join(Order, Order.id == OrderAllocation.order_id)
+        .where(Order.product_id == StockLocation.product_id, OrderAllocation.location_id == StockLocation.location_id)
+        .scalar_subquery()
+    )
+    location_sum = (
+        select(func.sum(StockLocation.quantity)).where(StockLocation.product_id == Product.id).scalar_subquery()
+    )
+    order_allocated = (
+        select(func.coalesce(func.sum(OrderAllocation.quantity), 0))
+        .where(OrderAllocation.order_id == Order.id)
+        .scalar_subquery()
+    )
+    located = StockLocation.product_id.in_(product_ids)
+    count = lambda stmt: db.scalar(select(func.count()).select_from(stmt.subquery()))
+    return {
+        "negative_locations": count(select(StockLocation).where(located, StockLocation.quantity < 0)),
+        "location_mismatch": count(select(StockLocation).where(located, STOCK - StockLocation.quantity != allocated)),
+        "product_stock_mismatch": count(
+            select(Product).where(Product.id.in_(product_ids), Product.stock != location_sum)
+        ),
+        "order_allocation_mismatch": count(
+            select(Order).where(Order.product_id.in_(product_ids), Order.quantity != order_allocated)
+        ),
+    }
+
+
+@pytest.fixture
+def located_products(db, make_user, unique_name):
+    user_id, _ = make_user()
+    rng = random.Random(1)
+    location_ids = [
+        db.scalar(insert(Location).values(
+            name=unique_name("warehouse"), latitude=rng.uniform(36, 60), longitude=rng.uniform(-9, 30)
+        ).returning(Location.id))
+        for _ in range(LOCATIONS)
+    ]
+    product_ids = [
+        db.scalar(insert(Product).values(name=unique_name("located"), price=1.0, stock=STOCK * LOCATIONS)
+                  .returning(Product.id))
+        for _ in range(2)
+    ]
+    db.execute(insert(StockLocation), [
+        {"product_id": product_id, "location_id": location_id, "quantity": STOCK}
+        for product_id in product_ids for location_id in location_ids
+    ])
+    db.commit()
+    return user_id, product_ids
+
+
+def _place_orders(user_id: int, product_ids: list, attempts: int, seed: int, outcomes: list) -> None:
+    rng = random.Random(seed)
+    for _ in range(attempts):
+        order_in = OrderCreate(
+            user_id=user_id,
+            product_id=rng.choice(product_ids),
+            quantity=rng.randint(1, 8),
+            ship_to=ShipTo(latitude=rng.uniform(36, 60), longitude=rng.uniform(-9, 30))
+        )
+        with SessionLocal() as db:
+            try:
+                create_order_service(order_in, db)
+                outcomes.append("created")
+            except HTTPException as exc:
+                outcomes.append(exc.detail)
+
+
+@pytest.mark.parametrize("policy", ["nearest", "most_stock", "fewest_splits"])
+def test_concurrent_orders_keep_stock_invariants(db, located_products, monkeypatch, policy):
+    monkeypatch.setattr(config, "ALLOCATION_POLICY", policy)
+    user_id, product_ids = located_products
+    outcomes = []
+    threads = [
+        threading.Thread(target=_place_orders, args=(user_id, product_ids, 15, seed, outcomes))
+        for seed in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 60 orders of 4.5 units on average: the 120 units run out
+    assert "created" in outcomes and "Insufficient stock" in outcomes
+    assert violations(db, product_ids) == {
+        "negative_locations": 0,
+        "location_mismatch": 0,
+        "product_stock_mismatch": 0,
+        "order_allocation_mismatch": 0,
+    }
+
+
+def test_cancelled_order_gives_back_its_allocations(client, db, located_products, make_user):
+    user_id, product_ids = located_products
+    _, headers = make_user()
+    created = client.post(
+        "/orders/", json={"user_id": user_id, "product_id": product_ids[0], "quantity": STOCK + 5}, headers=headers
+    )
+    assert created.status_code == 201, created.text
+    assert sum(row["quantity"] for row in created.json()["allocations"]) == STOCK + 5
+
+    response = client.put(f"/orders/{created.json()['id']}", json={"status": "CANCELLED"}, headers=headers)
+    assert response.status_code == 200, response.text
+    quantities = db.scalars(select(StockLocation.quantity).where(StockLocation.product_id == product_ids[0])).all()
+    assert quantities == [STOCK] * LOCATIONS
+    assert db.get(Product, product_ids[0]).stock == STOCK * LOCATIONS
+
+
+def test_set_location_stock_stores_exactly_the_quantity(client, db, make_user, unique_name):
+    _, headers = make_user()
+    product = client.post(
+        "/products/", json={"name": unique_name("unlocated"), "price": 1.0, "stock": 10}, headers=headers
+    ).json()
+    location = client.post(
+        "/locations/", json={"name": unique_name("first"), "latitude": 50, "longitude": 8}, headers=headers
+    )
+    assert location.status_code == 201, location.text
+
+    response = client.put(
+        f"/locations/{location.json()['id']}/stock/{product['id']}", json={"quantity": 3}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["quantity"] == 3
+    assert db.scalar(select(StockLocation.quantity).where(StockLocation.product_id == product["id"])) == 3
+    assert db.get(Product, product["id"]).stock == 3
@@ -0,0 +1,16 @@
+"""
+GET /users/export streams every user, so only to an authenticated caller.
+"""
+import json
+
+
+def test_export_needs_a_token(client):
+    assert client.get("/users/export").status_code == 401
+    assert client.get("/users/export", headers={"Authorization": "Bearer not-a-token"}).status_code == 401
+
+
+def test_export_with_a_token(client, make_user):
+    user_id, headers = make_user()
+    response = client.get("/users/export", headers=headers)
+    assert response.status_code == 200, response.text
+    assert user_id in [json.loads(line)["id"] for line in response.text.splitlines()]